@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from symposion.models import QueuedEmail
+
+
+class QueuedEmailAdmin(admin.ModelAdmin):
+    list_display = ["subject", "to", "batch", "status", "attempts", "next_attempt", "sent"]
+    list_filter = ["status", "batch"]
+    search_fields = ["subject", "to"]
+
+admin.site.register(QueuedEmail, QueuedEmailAdmin)
@@ -6,3 +6,54 @@ from appconf import AppConf
 class SymposionAppConf(AppConf):
 
     VOTE_THRESHOLD = 3
+
+    # dotted path of the queue outbound email is handed to, e.g.
+    # "symposion.utils.mailqueue.DatabaseQueue", or None to send it during
+    # the request; speaker communiques are queued in the database either
+    # way and need the send_queued_email worker
+    EMAIL_QUEUE = None
+
+    # a queued message is retried after EMAIL_QUEUE_RETRY_DELAY seconds,
+    # doubling each time, and abandoned after EMAIL_QUEUE_MAX_ATTEMPTS
+    EMAIL_QUEUE_RETRY_DELAY = 60
+    EMAIL_QUEUE_MAX_ATTEMPTS = 5
+
+    # BCC recipients per message of a speaker communique
+    COMMUNIQUE_CHUNK_SIZE = 50
+
+    # name of the sponsor benefit whose text is exported as the sponsor's
+    # description
+    SPONSOR_DESCRIPTION_BENEFIT = "Company Description"
+
+    # web-sized copies made of sponsor logo and file uploads: bounding box
+    # by alias, and the formats each is stored in
+    SPONSOR_DERIVATIVE_SIZES = {
+        "web": (400, 400),
+    }
+    SPONSOR_DERIVATIVE_FORMATS = ["png", "webp"]
+
+    # processes the copies are made in after an upload is saved; 0 makes
+    # them in the saving process once the upload is committed. A pool is
+    # forked from the web process, so only use one with process-based
+    # servers
+    SPONSOR_DERIVATIVE_PROCESSES = 0
+
+    # seconds to keep the rendered schedule event list around; it is also
+    # invalidated whenever the schedule changes
+    SCHEDULE_CACHE_TIMEOUT = 60 * 60
+
+    # seconds each process trusts its own copy of the current conference
+    # and section lookups before checking the shared cache for changes
+    CONFERENCE_CACHE_TTL = 5
+
+    # number of rendered markdown fragments kept in process memory by
+    # symposion.markdown_parser.parse; 0 disables the in-process cache
+    MARKDOWN_CACHE_SIZE = 1024
+
+    # alias of a Django cache shared between processes for rendered
+    # markdown, or None to only cache in process memory
+    MARKDOWN_CACHE = None
+
+    # estimated Jaccard similarity of title and abstract above which two
+    # proposals are reported as possible duplicates
+    DUPLICATE_THRESHOLD = 0.5
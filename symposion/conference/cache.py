@@ -0,0 +1,55 @@
+"""
+Two-level cache for conference configuration.
+
+The conference, its sections and their proposal sections are read on nearly
+every request and change rarely.  Lookups are kept in Django's cache under a
+generation counter shared by every process, which is bumped whenever one of
+those objects is saved or deleted, with a small per-process copy in front of
+it that is trusted for ``SYMPOSION_CONFERENCE_CACHE_TTL`` seconds.
+"""
+from __future__ import unicode_literals
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from symposion.conf import settings
+from symposion.utils.cache import bump_version, versioned_key
+
+
+CONFERENCE_CACHE_VERSION = "conference"
+
+_local = {}
+
+
+def cached(name, loader):
+    """
+    Return the value cached under ``name``, calling ``loader`` to produce
+    it if neither cache has it.  ``None`` is cached like any other value.
+    """
+    now = time.time()
+    entry = _local.get(name)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    key = versioned_key(CONFERENCE_CACHE_VERSION, name)
+    # wrapped so that a cached None can be told from a miss
+    wrapped = cache.get(key)
+    if wrapped is None:
+        wrapped = (loader(),)
+        cache.set(key, wrapped, None)
+    _local[name] = (now + settings.SYMPOSION_CONFERENCE_CACHE_TTL, wrapped[0])
+    return wrapped[0]
+
+
+def _invalidate():
+    _local.clear()
+    bump_version(CONFERENCE_CACHE_VERSION)
+
+
+def invalidate(sender=None, **kwargs):
+    """
+    Drop every cached lookup once the current transaction commits;
+    connected to the save and delete signals of the cached models.
+    """
+    transaction.on_commit(_invalidate)
@@ -1,12 +1,12 @@
 from __future__ import unicode_literals
 from django.db import models
+from django.db.models.signals import post_delete, post_save
 from django.utils.translation import ugettext_lazy as _
 from django.utils.encoding import python_2_unicode_compatible
 
 from timezone_field import TimeZoneField
 
-
-CONFERENCE_CACHE = {}
+from symposion.conference.cache import cached, invalidate
 
 
 @python_2_unicode_compatible
@@ -27,19 +27,6 @@ class Conference(models.Model):
     def __str__(self):
         return self.title
 
-    def save(self, *args, **kwargs):
-        super(Conference, self).save(*args, **kwargs)
-        if self.id in CONFERENCE_CACHE:
-            del CONFERENCE_CACHE[self.id]
-
-    def delete(self):
-        pk = self.pk
-        super(Conference, self).delete()
-        try:
-            del CONFERENCE_CACHE[pk]
-        except KeyError:
-            pass
-
     class Meta(object):
         verbose_name = _("conference")
         verbose_name_plural = _("conferences")
@@ -78,9 +65,25 @@ def current_conference():
     except AttributeError:
         from django.core.exceptions import ImproperlyConfigured
         raise ImproperlyConfigured("You must set the CONFERENCE_ID setting.")
-    try:
-        current_conf = CONFERENCE_CACHE[conf_id]
-    except KeyError:
-        current_conf = Conference.objects.get(pk=conf_id)
-        CONFERENCE_CACHE[conf_id] = current_conf
-    return current_conf
+    # a missing conference raises DoesNotExist and is not cached
+    return cached("conference:%s" % conf_id, lambda: Conference.objects.get(pk=conf_id))
+
+
+def get_section(slug):
+    """
+    Return the section with the given slug, or raise
+    ``Section.DoesNotExist``.
+    """
+    section = cached(
+        "section:%s" % slug,
+        lambda: Section.objects.select_related("conference").filter(slug=slug).first(),
+    )
+    if section is None:
+        raise Section.DoesNotExist("Section %r does not exist." % slug)
+    return section
+
+
+post_save.connect(invalidate, sender=Conference)
+post_delete.connect(invalidate, sender=Conference)
+post_save.connect(invalidate, sender=Section)
+post_delete.connect(invalidate, sender=Section)
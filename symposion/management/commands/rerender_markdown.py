@@ -0,0 +1,154 @@
+from __future__ import unicode_literals
+
+import json
+import multiprocessing
+import os
+
+import django
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Case, TextField, Value, When
+
+from symposion.markdown_parser import MarkdownFieldsMixin, render
+
+
+def _init_worker():
+    django.setup()
+
+
+def _render_row(row):
+    """
+    Render one ``(pk, text, text, ...)`` row into ``(pk, [html, html, ...])``.
+
+    The render caches are bypassed: they may hold HTML from the renderer
+    this command is run to replace.
+    """
+    return row[0], [render(text) for text in row[1:]]
+
+
+def markdown_models():
+    """
+    Return the models whose own table stores markdown fields, e.g.
+    ProposalBase but not its subclasses.
+    """
+    found = []
+    for model in apps.get_models():
+        if not issubclass(model, MarkdownFieldsMixin) or not model.markdown_fields:
+            continue
+        local = set(field.name for field in model._meta.local_fields)
+        if set(model.markdown_fields) <= local:
+            found.append(model)
+    return found
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-render the stored HTML of every markdown field, e.g. after "
+        "BLEACH_ALLOWED_TAGS changes. Only the *_html columns are written; "
+        "save() and model signals are not run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "models", nargs="*", metavar="app_label.Model",
+            help="Limit to these models (default: all with markdown fields).")
+        parser.add_argument(
+            "--chunk-size", type=int, default=500,
+            help="Rows read and written per batch.")
+        parser.add_argument(
+            "--processes", type=int, default=multiprocessing.cpu_count(),
+            help="Worker processes used for rendering.")
+        parser.add_argument(
+            "--state-file", default="rerender_markdown.json",
+            help="File recording progress so an interrupted run can resume.")
+        parser.add_argument(
+            "--restart", action="store_true",
+            help="Ignore any saved progress and start from the beginning.")
+
+    def handle(self, *args, **options):
+        models = markdown_models()
+        if options["models"]:
+            by_label = dict((model._meta.label_lower, model) for model in models)
+            try:
+                models = [by_label[label.lower()] for label in options["models"]]
+            except KeyError as e:
+                raise CommandError("%s has no markdown fields" % e.args[0])
+
+        self.state_file = options["state_file"]
+        self.state = {}
+        if not options["restart"] and os.path.exists(self.state_file):
+            with open(self.state_file) as f:
+                self.state = json.load(f)
+
+        pool = None
+        if options["processes"] > 1:
+            # forked workers must not share the parent's database sockets
+            connections.close_all()
+            pool = multiprocessing.Pool(options["processes"], _init_worker)
+        try:
+            for model in models:
+                self.rerender(model, options["chunk_size"], pool)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        if os.path.exists(self.state_file):
+            os.remove(self.state_file)
+
+    def save_state(self):
+        with open(self.state_file, "w") as f:
+            json.dump(self.state, f)
+
+    def rerender(self, model, chunk_size, pool):
+        label = model._meta.label_lower
+        fields = list(model.markdown_fields)
+        html_fields = ["%s_html" % field for field in fields]
+        queryset = model._default_manager.order_by("pk")
+        total = queryset.count()
+        last_pk = self.state.get(label)
+        if last_pk is not None:
+            done = queryset.filter(pk__lte=last_pk).count()
+        else:
+            done = 0
+        updated = 0
+
+        while True:
+            chunk = queryset
+            if last_pk is not None:
+                chunk = chunk.filter(pk__gt=last_pk)
+            rows = list(chunk.values_list("pk", *(fields + html_fields))[:chunk_size])
+            if not rows:
+                break
+
+            sources = [row[:len(fields) + 1] for row in rows]
+            stored = dict((row[0], row[len(fields) + 1:]) for row in rows)
+            rendered = pool.map(_render_row, sources) if pool else map(_render_row, sources)
+
+            changes = dict((html_field, []) for html_field in html_fields)
+            for pk, htmls in rendered:
+                for html_field, old, new in zip(html_fields, stored[pk], htmls):
+                    if old != new:
+                        changes[html_field].append((pk, new))
+
+            with transaction.atomic():
+                for html_field, values in changes.items():
+                    if not values:
+                        continue
+                    model._default_manager.filter(
+                        pk__in=[pk for pk, _ in values]
+                    ).update(**{html_field: Case(
+                        *[When(pk=pk, then=Value(html)) for pk, html in values],
+                        output_field=TextField()
+                    )})
+            updated += len(set(pk for values in changes.values() for pk, _ in values))
+
+            last_pk = rows[-1][0]
+            done += len(rows)
+            self.state[label] = last_pk
+            self.save_state()
+            self.stdout.write("%s: %d/%d rows, %d updated" % (label, done, total, updated))
+
+        self.stdout.write("%s: done, %d of %d rows updated" % (label, updated, total))
@@ -0,0 +1,45 @@
+from __future__ import unicode_literals
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from symposion.utils.mailqueue import DatabaseQueue, get_queue, send_queued
+
+
+class Command(BaseCommand):
+    help = "Send the email waiting in the outbound queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit", type=int, default=None,
+            help="Send at most this many messages per pass.")
+        parser.add_argument(
+            "--rate", type=float, default=None,
+            help="Send at most this many messages a second.")
+        parser.add_argument(
+            "--batch-size", type=int, default=100,
+            help="Messages claimed from the queue at a time.")
+        parser.add_argument(
+            "--loop", action="store_true",
+            help="Keep running, checking the queue every --interval seconds.")
+        parser.add_argument(
+            "--interval", type=float, default=30,
+            help="Seconds to wait between passes with --loop.")
+
+    def handle(self, *args, **options):
+        # messages may be waiting in the database even if new ones are
+        # currently sent straight away
+        queue = get_queue() or DatabaseQueue()
+        while True:
+            sent, failed = send_queued(
+                queue,
+                limit=options["limit"],
+                rate=options["rate"],
+                batch_size=options["batch_size"],
+            )
+            if sent or failed or options["verbosity"] > 1:
+                self.stdout.write("Sent %d messages, %d failed" % (sent, failed))
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
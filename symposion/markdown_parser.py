@@ -1,13 +1,204 @@
 from __future__ import unicode_literals
 
+import collections
+import hashlib
+import threading
+
 import bleach
 import markdown
 
-from django.conf import settings
+from django.core.cache import caches
+
+from symposion.conf import settings
+
+try:
+    from bleach.sanitizer import Cleaner
+except ImportError:  # bleach < 2.0
+    Cleaner = None
+
+
+# Markdown extensions used for every render
+EXTENSIONS = ["extra"]
+
+# Part of the render cache key along with the library versions, extensions
+# and allowed tags; bump whenever render changes its output in some other
+# way so that HTML cached by older code is not served.
+RENDER_FORMAT = 1
+
+CacheInfo = collections.namedtuple(
+    "CacheInfo", ["hits", "shared_hits", "misses", "maxsize", "currsize"])
+
+_local = threading.local()
+_lock = threading.Lock()
+_renders = collections.OrderedDict()
+_stats = {"hits": 0, "shared_hits": 0, "misses": 0}
+
+
+def _allowed_tags():
+    return tuple(settings.BLEACH_ALLOWED_TAGS)
+
+
+def _converter():
+    # Markdown instances keep state between conversions and are not thread
+    # safe, so each thread keeps its own and resets it before every use.
+    converter = getattr(_local, "converter", None)
+    if converter is None:
+        converter = _local.converter = markdown.Markdown(
+            extensions=EXTENSIONS, safe_mode=False)
+    return converter.reset()
+
+
+def _clean(html):
+    tags = _allowed_tags()
+    if Cleaner is None:
+        return bleach.clean(html, tags=list(tags))
+    cleaner = getattr(_local, "cleaner", None)
+    if cleaner is None or _local.cleaner_tags != tags:
+        cleaner = _local.cleaner = Cleaner(tags=list(tags))
+        _local.cleaner_tags = tags
+    return cleaner.clean(html)
+
+
+def render(text):
+    """
+    Convert markdown text to sanitized HTML without consulting or filling
+    the render caches.
+    """
+    return _clean(_converter().convert(text))
+
+
+def _renderer_config():
+    return "%s %s %s %s %s" % (
+        RENDER_FORMAT,
+        getattr(markdown, "__version__", getattr(markdown, "version", "")),
+        getattr(bleach, "__version__", ""),
+        ",".join(EXTENSIONS),
+        " ".join(_allowed_tags()),
+    )
+
+
+def _key(text):
+    digest = hashlib.sha1()
+    digest.update(text.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(_renderer_config().encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _shared_cache():
+    alias = settings.SYMPOSION_MARKDOWN_CACHE
+    return caches[alias] if alias else None
 
 
 def parse(text):
     """Convert markdown text to sanitized HTML."""
-    text = markdown.markdown(text, extensions=["extra"], safe_mode=False)
-    text = bleach.clean(text, tags=settings.BLEACH_ALLOWED_TAGS)
-    return text
+    key = _key(text)
+    with _lock:
+        html = _renders.get(key)
+        if html is not None:
+            # move to the most recently used end
+            del _renders[key]
+            _renders[key] = html
+            _stats["hits"] += 1
+            return html
+
+    shared = _shared_cache()
+    shared_key = "symposion:markdown:%s" % key
+    html = shared.get(shared_key) if shared is not None else None
+    if html is None:
+        html = render(text)
+        if shared is not None:
+            shared.set(shared_key, html, None)
+        stat = "misses"
+    else:
+        stat = "shared_hits"
+
+    maxsize = settings.SYMPOSION_MARKDOWN_CACHE_SIZE
+    with _lock:
+        _stats[stat] += 1
+        if maxsize:
+            _renders[key] = html
+            while len(_renders) > maxsize:
+                _renders.popitem(last=False)
+    return html
+
+
+def cache_info():
+    """
+    Return hit and miss counts for ``parse``. ``shared_hits`` counts
+    renders found in the shared ``SYMPOSION_MARKDOWN_CACHE`` cache.
+    """
+    with _lock:
+        return CacheInfo(
+            _stats["hits"], _stats["shared_hits"], _stats["misses"],
+            settings.SYMPOSION_MARKDOWN_CACHE_SIZE, len(_renders))
+
+
+def cache_clear():
+    """Empty the in-process render cache and reset its counters."""
+    with _lock:
+        _renders.clear()
+        for stat in _stats:
+            _stats[stat] = 0
+
+
+class MarkdownFieldsMixin(object):
+    """
+    Model mixin that keeps ``<field>_html`` in step with each markdown
+    ``<field>`` named in ``markdown_fields``.
+
+    The source text loaded from the database is remembered when the instance
+    is created, and a field is only run through ``parse`` on save when it is
+    new, has changed, or has no rendered HTML yet. Saves that only touch
+    other fields (cancelling a proposal, assigning a slot) skip rendering
+    entirely.
+    """
+
+    markdown_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super(MarkdownFieldsMixin, self).__init__(*args, **kwargs)
+        self._remember_markdown_fields()
+
+    def _remember_markdown_fields(self):
+        # Read from __dict__ so that deferred fields are not loaded here; a
+        # field that was never loaded is treated as changed.
+        self._markdown_originals = dict(
+            (field, self.__dict__.get(field)) for field in self.markdown_fields
+        )
+
+    def markdown_field_changed(self, field):
+        """Return True if ``field`` needs rendering on the next save."""
+        if self._state.adding or self.pk is None:
+            return True
+        text = getattr(self, field)
+        original = self._markdown_originals.get(field)
+        if original is None or original != text:
+            return True
+        return bool(text) and not getattr(self, "%s_html" % field)
+
+    def render_markdown_fields(self, fields=None):
+        """
+        Re-render the changed fields among ``fields`` (default: all of
+        ``markdown_fields``) and return the names of the updated HTML fields.
+        """
+        rendered = []
+        for field in self.markdown_fields:
+            if fields is not None and field not in fields:
+                continue
+            if self.markdown_field_changed(field):
+                html_field = "%s_html" % field
+                setattr(self, html_field, parse(getattr(self, field)))
+                rendered.append(html_field)
+        return rendered
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        rendered = self.render_markdown_fields(update_fields)
+        if update_fields is not None:
+            kwargs["update_fields"] = list(update_fields) + [
+                html_field for html_field in rendered if html_field not in update_fields
+            ]
+        result = super(MarkdownFieldsMixin, self).save(*args, **kwargs)
+        self._remember_markdown_fields()
+        return result
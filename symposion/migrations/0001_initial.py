@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedEmail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch', models.CharField(blank=True, db_index=True, max_length=100, verbose_name='Batch')),
+                ('from_email', models.CharField(max_length=254, verbose_name='From')),
+                ('to', models.TextField(blank=True, verbose_name='To')),
+                ('bcc', models.TextField(blank=True, verbose_name='Bcc')),
+                ('subject', models.TextField(verbose_name='Subject')),
+                ('body', models.TextField(verbose_name='Body')),
+                ('html', models.TextField(blank=True, verbose_name='HTML body')),
+                ('status', models.CharField(choices=[('queued', 'queued'), ('sent', 'sent'), ('failed', 'failed')], default='queued', max_length=10, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Attempts')),
+                ('next_attempt', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Next attempt')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='Locked until')),
+                ('last_error', models.TextField(blank=True, verbose_name='Last error')),
+                ('created', models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Created')),
+                ('sent', models.DateTimeField(blank=True, null=True, verbose_name='Sent')),
+            ],
+            options={
+                'ordering': ['next_attempt', 'pk'],
+                'verbose_name': 'queued email',
+                'verbose_name_plural': 'queued emails',
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='queuedemail',
+            index_together=set([('status', 'next_attempt')]),
+        ),
+    ]
@@ -0,0 +1,88 @@
+from __future__ import unicode_literals
+
+from django.core.mail import EmailMultiAlternatives
+from django.db import models
+from django.utils import timezone
+from django.utils.encoding import python_2_unicode_compatible
+from django.utils.translation import ugettext_lazy as _
+
+
+@python_2_unicode_compatible
+class QueuedEmail(models.Model):
+    """
+    A rendered email waiting to be sent by the ``send_queued_email``
+    command.
+    """
+
+    STATUS_QUEUED = "queued"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, _("queued")),
+        (STATUS_SENT, _("sent")),
+        (STATUS_FAILED, _("failed")),
+    ]
+
+    # free-form label grouping the messages of one mailing
+    batch = models.CharField(max_length=100, blank=True, db_index=True, verbose_name=_("Batch"))
+    from_email = models.CharField(max_length=254, verbose_name=_("From"))
+    # addresses, one per line
+    to = models.TextField(blank=True, verbose_name=_("To"))
+    bcc = models.TextField(blank=True, verbose_name=_("Bcc"))
+    subject = models.TextField(verbose_name=_("Subject"))
+    body = models.TextField(verbose_name=_("Body"))
+    html = models.TextField(blank=True, verbose_name=_("HTML body"))
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED,
+                              verbose_name=_("Status"))
+    attempts = models.PositiveIntegerField(default=0, verbose_name=_("Attempts"))
+    next_attempt = models.DateTimeField(default=timezone.now, verbose_name=_("Next attempt"))
+    # set while a worker is sending the message so that others skip it
+    locked_until = models.DateTimeField(null=True, blank=True, verbose_name=_("Locked until"))
+    last_error = models.TextField(blank=True, verbose_name=_("Last error"))
+    created = models.DateTimeField(default=timezone.now, editable=False, verbose_name=_("Created"))
+    sent = models.DateTimeField(null=True, blank=True, verbose_name=_("Sent"))
+
+    class Meta:
+        ordering = ["next_attempt", "pk"]
+        index_together = [("status", "next_attempt")]
+        verbose_name = _("queued email")
+        verbose_name_plural = _("queued emails")
+
+    def __str__(self):
+        return "%s (%s)" % (self.subject, self.status)
+
+    @classmethod
+    def for_message(cls, message, batch=""):
+        """
+        Return an unsaved row holding ``message``, an
+        ``EmailMultiAlternatives``.
+        """
+        html = ""
+        for content, mimetype in getattr(message, "alternatives", []):
+            if mimetype == "text/html":
+                html = content
+        return cls(
+            batch=batch,
+            from_email=message.from_email,
+            to="\n".join(message.to),
+            bcc="\n".join(message.bcc),
+            subject=message.subject,
+            body=message.body,
+            html=html,
+        )
+
+    def message(self, connection=None):
+        """
+        Return the stored message as an ``EmailMultiAlternatives``.
+        """
+        email = EmailMultiAlternatives(
+            self.subject, self.body, self.from_email,
+            to=self.to.split("\n") if self.to else [],
+            bcc=self.bcc.split("\n") if self.bcc else [],
+            connection=connection,
+        )
+        if self.html:
+            email.attach_alternative(self.html, "text/html")
+        return email
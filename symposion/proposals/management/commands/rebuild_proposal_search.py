@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from symposion.proposals.search import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recreate the full-text search entries for every proposal."
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write("Indexed %d proposals" % count)
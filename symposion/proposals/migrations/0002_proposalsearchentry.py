@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.utils import OperationalError
+import django.db.models.deletion
+
+
+ENTRY_TABLE = "symposion_proposals_proposalsearchentry"
+FTS_TABLE = "symposion_proposals_proposalsearchentry_fts"
+
+SQLITE_FORWARDS = [
+    "CREATE VIRTUAL TABLE {fts} USING fts5("
+    "title, body, content='{entry}', content_rowid='proposal_id')",
+    "CREATE TRIGGER {entry}_ai AFTER INSERT ON {entry} BEGIN "
+    "INSERT INTO {fts}(rowid, title, body) VALUES (new.proposal_id, new.title, new.body); "
+    "END",
+    "CREATE TRIGGER {entry}_ad AFTER DELETE ON {entry} BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, title, body) VALUES ('delete', old.proposal_id, old.title, old.body); "
+    "END",
+    "CREATE TRIGGER {entry}_au AFTER UPDATE ON {entry} BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, title, body) VALUES ('delete', old.proposal_id, old.title, old.body); "
+    "INSERT INTO {fts}(rowid, title, body) VALUES (new.proposal_id, new.title, new.body); "
+    "END",
+]
+
+SQLITE_BACKWARDS = [
+    "DROP TRIGGER IF EXISTS {entry}_ai",
+    "DROP TRIGGER IF EXISTS {entry}_ad",
+    "DROP TRIGGER IF EXISTS {entry}_au",
+    "DROP TABLE IF EXISTS {fts}",
+]
+
+# must match symposion.proposals.search.POSTGRESQL_VECTOR for the index to
+# be used
+POSTGRESQL_FORWARDS = [
+    "CREATE INDEX {entry}_search ON {entry} USING gin(("
+    "setweight(to_tsvector('english', title), 'A') || "
+    "setweight(to_tsvector('english', body), 'B')))",
+]
+
+POSTGRESQL_BACKWARDS = [
+    "DROP INDEX IF EXISTS {entry}_search",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement.format(entry=ENTRY_TABLE, fts=FTS_TABLE))
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _run(schema_editor, POSTGRESQL_FORWARDS)
+    elif vendor == "sqlite":
+        try:
+            _run(schema_editor, SQLITE_FORWARDS[:1])
+        except OperationalError:
+            # SQLite built without FTS5; searches fall back to LIKE
+            return
+        _run(schema_editor, SQLITE_FORWARDS[1:])
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _run(schema_editor, POSTGRESQL_BACKWARDS)
+    elif vendor == "sqlite":
+        _run(schema_editor, SQLITE_BACKWARDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('symposion_proposals', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProposalSearchEntry',
+            fields=[
+                ('proposal', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_entry', serialize=False, to='symposion_proposals.ProposalBase', verbose_name='Proposal')),
+                ('title', models.TextField(verbose_name='Title')),
+                ('body', models.TextField(verbose_name='Body')),
+            ],
+            options={
+                'verbose_name': 'proposal search entry',
+                'verbose_name_plural': 'proposal search entries',
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -3,8 +3,9 @@ import os
 import uuid
 
 from django.core.urlresolvers import reverse
-from django.db import models
-from django.db.models import Q
+from django.db import models, transaction
+from django.db.models import Prefetch, Q
+from django.db.models.signals import post_delete, post_save
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 from django.utils.timezone import now
@@ -16,7 +17,8 @@ from django.core.exceptions import ValidationError
 from model_utils.managers import InheritanceManager
 from reversion import revisions as reversion
 
-from symposion.markdown_parser import parse
+from symposion.markdown_parser import MarkdownFieldsMixin
+from symposion.conference.cache import cached, invalidate
 from symposion.conference.models import Section
 from symposion.speakers.models import Speaker
 
@@ -60,6 +62,22 @@ class ProposalSection(models.Model):
         return self.section.name
 
 
+def get_proposal_section(slug):
+    """
+    Return the proposal section of the section with the given slug, with
+    the section joined in, or raise ``ProposalSection.DoesNotExist``.
+    """
+    proposal_section = cached(
+        "proposal_section:%s" % slug,
+        lambda: ProposalSection.objects.select_related(
+            "section__conference"
+        ).filter(section__slug=slug).first(),
+    )
+    if proposal_section is None:
+        raise ProposalSection.DoesNotExist("Proposal section %r does not exist." % slug)
+    return proposal_section
+
+
 @python_2_unicode_compatible
 class ProposalKind(models.Model):
     """
@@ -79,9 +97,10 @@ class ProposalKind(models.Model):
 
 
 @python_2_unicode_compatible
-class ProposalBase(models.Model):
+class ProposalBase(MarkdownFieldsMixin, models.Model):
 
     objects = InheritanceManager()
+    markdown_fields = ("abstract", "private_abstract", "technical_requirements")
 
     kind = models.ForeignKey(ProposalKind, verbose_name=_("Kind"))
 
@@ -169,11 +188,10 @@ class ProposalBase(models.Model):
                                                  blank=True, verbose_name=_("Addtional speakers"))
     cancelled = models.BooleanField(default=False, verbose_name=_("Cancelled"))
 
-    def save(self, *args, **kwargs):
-        self.abstract_html = parse(self.abstract)
-        self.private_abstract_html = parse(self.private_abstract)
-        self.technical_requirements_html = parse(self.technical_requirements)
-        return super(ProposalBase, self).save(*args, **kwargs)
+    def __init__(self, *args, **kwargs):
+        super(ProposalBase, self).__init__(*args, **kwargs)
+        # lets the reviews app tell speaker changes from other saves
+        self._initial_speaker_id = self.__dict__.get("speaker_id")
 
     def can_edit(self):
         return True
@@ -199,6 +217,12 @@ class ProposalBase(models.Model):
 
     def speakers(self):
         yield self.speaker
+        if "additionalspeaker_set" in getattr(self, "_prefetched_objects_cache", {}):
+            # loaded by symposion.proposals.utils.proposal_queryset
+            for additional in self.additionalspeaker_set.all():
+                if additional.status != AdditionalSpeaker.SPEAKING_STATUS_DECLINED:
+                    yield additional.speaker
+            return
         speakers = self.additional_speakers.exclude(
             additionalspeaker__status=AdditionalSpeaker.SPEAKING_STATUS_DECLINED)
         for speaker in speakers:
@@ -270,3 +294,88 @@ class SupportingDocument(models.Model):
     def download_url(self):
         return reverse("proposal_document_download",
                        args=[self.pk, os.path.basename(self.file.name).lower()])
+
+
+class ProposalSearchEntry(models.Model):
+    """
+    The searchable text of a proposal and its speakers, indexed for full-text
+    search by ``symposion.proposals.search``.
+
+    Entries are kept up to date from signals whenever a proposal, speaker or
+    additional speaker changes; ``manage.py rebuild_proposal_search``
+    recreates them all.
+    """
+
+    proposal = models.OneToOneField(ProposalBase, primary_key=True, related_name="search_entry",
+                                    verbose_name=_("Proposal"))
+    title = models.TextField(verbose_name=_("Title"))
+    body = models.TextField(verbose_name=_("Body"))
+
+    class Meta:
+        verbose_name = _("proposal search entry")
+        verbose_name_plural = _("proposal search entries")
+
+    @staticmethod
+    def text_for(proposal):
+        """Return the ``(title, body)`` to index for ``proposal``."""
+        parts = [proposal.abstract, proposal.private_abstract, proposal.project]
+        for speaker in proposal.speakers():
+            parts.extend([speaker.name, speaker.biography])
+        return proposal.title, "\n".join(part for part in parts if part)
+
+    @classmethod
+    def update_for(cls, proposal):
+        title, body = cls.text_for(proposal)
+        updated = cls._default_manager.filter(proposal=proposal).exclude(
+            title=title, body=body
+        ).update(title=title, body=body)
+        if not updated:
+            cls._default_manager.get_or_create(
+                proposal=proposal, defaults={"title": title, "body": body})
+
+    @classmethod
+    def update_for_ids(cls, proposal_ids):
+        proposals = ProposalBase.objects.filter(pk__in=proposal_ids).select_related(
+            "speaker"
+        ).prefetch_related(
+            Prefetch(
+                "additionalspeaker_set",
+                queryset=AdditionalSpeaker.objects.select_related("speaker").order_by("speaker__name"),
+            )
+        )
+        for proposal in proposals:
+            cls.update_for(proposal)
+
+
+def _schedule_search_update(proposal_ids):
+    # Deferred until commit so that the text is read once the whole change
+    # (and any cascading delete of the proposal itself) has landed.
+    proposal_ids = set(proposal_ids)
+    transaction.on_commit(lambda: ProposalSearchEntry.update_for_ids(proposal_ids))
+
+
+def _proposal_saved(sender, instance, raw=False, **kwargs):
+    # connected without a sender so that every ProposalBase subclass is seen
+    if isinstance(instance, ProposalBase) and not raw:
+        _schedule_search_update([instance.pk])
+
+
+def _speaker_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _schedule_search_update(ProposalBase.objects.filter(
+        Q(speaker=instance) | Q(additional_speakers=instance)
+    ).values_list("pk", flat=True))
+
+
+def _additional_speaker_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _schedule_search_update([instance.proposalbase_id])
+
+
+post_save.connect(_proposal_saved)
+post_save.connect(_speaker_saved, sender=Speaker)
+post_save.connect(_additional_speaker_changed, sender=AdditionalSpeaker)
+post_delete.connect(_additional_speaker_changed, sender=AdditionalSpeaker)
+post_save.connect(invalidate, sender=ProposalSection)
+post_delete.connect(invalidate, sender=ProposalSection)
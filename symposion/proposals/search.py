@@ -0,0 +1,102 @@
+"""
+Full-text search over proposals.
+
+Searches run against ``ProposalSearchEntry`` rows. PostgreSQL matches them
+with a GIN-indexed ``tsvector`` and SQLite with an FTS5 table kept in sync
+by triggers; both are created by migration ``0002_proposalsearchentry``.
+Other databases, or SQLite builds without FTS5, fall back to unranked
+``icontains`` matching.
+"""
+from __future__ import unicode_literals
+
+from django.db import connections
+from django.db.models import Q
+
+from symposion.proposals.models import ProposalBase, ProposalSearchEntry
+
+
+ENTRY_TABLE = ProposalSearchEntry._meta.db_table
+FTS_TABLE = "%s_fts" % ENTRY_TABLE
+
+# must match the expression indexed by migration 0002_proposalsearchentry
+POSTGRESQL_VECTOR = (
+    "setweight(to_tsvector('english', {table}.title), 'A') || "
+    "setweight(to_tsvector('english', {table}.body), 'B')"
+).format(table=ENTRY_TABLE)
+
+# proposals re-indexed per query by rebuild(); keeps the IN list under
+# SQLite's parameter limit
+REBUILD_CHUNK_SIZE = 500
+
+_fts_tables = {}
+
+
+def _connection():
+    return connections[ProposalSearchEntry._default_manager.db]
+
+
+def has_fts(connection):
+    """Return True if ``connection`` is SQLite with the FTS5 table."""
+    if connection.vendor != "sqlite":
+        return False
+    if connection.alias not in _fts_tables:
+        _fts_tables[connection.alias] = FTS_TABLE in connection.introspection.table_names()
+    return _fts_tables[connection.alias]
+
+
+def _fts_query(terms):
+    # quote every term so that user input is never read as FTS5 syntax
+    return " ".join('"%s"' % term.replace('"', '""') for term in terms)
+
+
+def search(query, sections):
+    """
+    Return ``ProposalSearchEntry`` rows for proposals in ``sections``
+    matching ``query``, best match first. Each row has a ``rank``.
+    """
+    terms = query.split()
+    entries = ProposalSearchEntry.objects.filter(proposal__kind__section__in=sections)
+    if not terms:
+        return entries.none()
+
+    connection = _connection()
+    if connection.vendor == "postgresql":
+        tsquery = "plainto_tsquery('english', %s)"
+        return entries.extra(
+            select={"rank": "ts_rank(%s, %s)" % (POSTGRESQL_VECTOR, tsquery)},
+            select_params=[query],
+            where=["(%s) @@ %s" % (POSTGRESQL_VECTOR, tsquery)],
+            params=[query],
+            order_by=["-rank"],
+        )
+    if has_fts(connection):
+        return entries.extra(
+            select={"rank": "-bm25(%s, 10.0, 1.0)" % FTS_TABLE},
+            tables=[FTS_TABLE],
+            where=[
+                "%s.rowid = %s.proposal_id" % (FTS_TABLE, ENTRY_TABLE),
+                "%s MATCH %%s" % FTS_TABLE,
+            ],
+            params=[_fts_query(terms)],
+            order_by=["-rank"],
+        )
+
+    for term in terms:
+        entries = entries.filter(Q(title__icontains=term) | Q(body__icontains=term))
+    return entries.extra(select={"rank": "0"}).order_by("-proposal__submitted")
+
+
+def rebuild():
+    """
+    Recreate the search entry of every proposal. Returns the number of
+    proposals indexed.
+    """
+    ProposalSearchEntry.objects.all().delete()
+    proposal_ids = list(ProposalBase.objects.order_by("pk").values_list("pk", flat=True))
+    for start in range(0, len(proposal_ids), REBUILD_CHUNK_SIZE):
+        ProposalSearchEntry.update_for_ids(proposal_ids[start:start + REBUILD_CHUNK_SIZE])
+    connection = _connection()
+    if has_fts(connection):
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO {0}({0}) VALUES ('rebuild')".format(FTS_TABLE))
+    return len(proposal_ids)
@@ -0,0 +1,87 @@
+from __future__ import unicode_literals
+
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+
+from symposion.conference.models import Conference, Section
+from symposion.proposals import search
+from symposion.proposals.models import (
+    AdditionalSpeaker, ProposalBase, ProposalKind, ProposalSearchEntry, ProposalSection
+)
+from symposion.speakers.models import Speaker
+
+
+# TransactionTestCase so that the on_commit index updates run
+class TestSearch(TransactionTestCase):
+
+    def setUp(self):
+        conference = Conference.objects.create(title="Conference")
+        self.talks = Section.objects.create(conference=conference, name="Talks", slug="talks")
+        self.tutorials = Section.objects.create(
+            conference=conference, name="Tutorials", slug="tutorials")
+        for section in [self.talks, self.tutorials]:
+            ProposalSection.objects.create(section=section)
+        self.speaker = Speaker.objects.create(name="Ada Lovelace")
+        self.django = ProposalBase.objects.create(
+            kind=ProposalKind.objects.create(section=self.talks, name="Talk", slug="talk"),
+            title="Scaling Django", abstract="Caching and task queues", speaker=self.speaker)
+        self.numpy = ProposalBase.objects.create(
+            kind=ProposalKind.objects.create(section=self.tutorials, name="Tutorial", slug="tutorial"),
+            title="Array programming", abstract="Vectorised numpy, no Django required",
+            speaker=Speaker.objects.create(name="Grace Hopper"))
+
+    def search(self, query, sections=None):
+        if sections is None:
+            sections = [self.talks, self.tutorials]
+        return [entry.proposal_id for entry in search.search(query, sections)]
+
+    def test_fts(self):
+        self.assertTrue(search.has_fts(connection))
+        # title matches outrank abstract matches
+        self.assertEqual(self.search("django"), [self.django.pk, self.numpy.pk])
+        self.assertEqual(self.search("numpy"), [self.numpy.pk])
+        # every term must match
+        self.assertEqual(self.search("caching django"), [self.django.pk])
+        self.assertEqual(self.search("lovelace"), [self.django.pk])
+        # user input is not read as FTS5 syntax
+        self.assertEqual(self.search('"django AND OR'), [])
+        self.assertEqual(self.search("  "), [])
+
+    def test_icontains_fallback(self):
+        search._fts_tables[connection.alias] = False
+        self.addCleanup(search._fts_tables.pop, connection.alias)
+        self.assertEqual(set(self.search("django")), set([self.django.pk, self.numpy.pk]))
+        self.assertEqual(self.search("cach djan"), [self.django.pk])
+        self.assertEqual(self.search("hopper"), [self.numpy.pk])
+        self.assertEqual(self.search(""), [])
+
+    def test_section_filter(self):
+        self.assertEqual(self.search("django", [self.talks]), [self.django.pk])
+        self.assertEqual(self.search("numpy", [self.talks]), [])
+        self.assertEqual(self.search("django", []), [])
+
+    def test_index_updates(self):
+        with transaction.atomic():
+            self.django.title = "Async Django"
+            self.django.save()
+            # the entry is rewritten once the change commits
+            self.assertEqual(ProposalSearchEntry.objects.get(pk=self.django.pk).title, "Scaling Django")
+        self.assertEqual(ProposalSearchEntry.objects.get(pk=self.django.pk).title, "Async Django")
+        self.assertEqual(self.search("async"), [self.django.pk])
+
+        self.speaker.name = "Ada King"
+        self.speaker.save()
+        self.assertEqual(self.search("king"), [self.django.pk])
+        self.assertEqual(self.search("lovelace"), [])
+
+        additional = AdditionalSpeaker.objects.create(
+            speaker=Speaker.objects.create(name="Charles Babbage"), proposalbase=self.django)
+        self.assertEqual(self.search("babbage"), [self.django.pk])
+        additional.delete()
+        self.assertEqual(self.search("babbage"), [])
+
+    def test_rebuild(self):
+        ProposalSearchEntry.objects.all().delete()
+        self.assertEqual(self.search("django"), [])
+        self.assertEqual(search.rebuild(), 2)
+        self.assertEqual(self.search("django"), [self.django.pk, self.numpy.pk])
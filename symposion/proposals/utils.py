@@ -0,0 +1,71 @@
+from __future__ import unicode_literals
+
+from django.apps import apps
+from django.db.models import Prefetch
+from django.http import Http404
+
+from symposion.proposals.models import (
+    AdditionalSpeaker, ProposalBase, ProposalSection, get_proposal_section
+)
+
+
+# relations joined onto ProposalBase whose caches are copied onto the
+# concrete subclass instance returned by select_subclasses()
+_BASE_RELATIONS = ["speaker", "kind", "result"]
+
+
+def proposal_queryset():
+    """
+    Return a queryset of concrete proposals with the speaker, the speaker's
+    user, the kind and its section (and the review result, where the
+    reviews app is installed) joined in, and the additional speakers
+    prefetched in one extra query.
+    """
+    related = ["speaker__user", "kind__section"]
+    if apps.is_installed("symposion.reviews"):
+        related.append("result")
+    return ProposalBase.objects.select_related(*related).prefetch_related(
+        Prefetch(
+            "additionalspeaker_set",
+            queryset=AdditionalSpeaker.objects.select_related(
+                "speaker__user"
+            ).order_by("speaker__name"),
+        )
+    ).select_subclasses()
+
+
+def _copy_base_caches(proposal):
+    # The joined relations are cached on the ProposalBase row, not on the
+    # subclass instance built from it, so hand them across to avoid a lazy
+    # query per relation.
+    base = proposal.__dict__.get("_proposalbase_ptr_cache")
+    if base is None:
+        return
+    for name in _BASE_RELATIONS:
+        cache_name = "_%s_cache" % name
+        if cache_name in base.__dict__ and cache_name not in proposal.__dict__:
+            setattr(proposal, cache_name, getattr(base, cache_name))
+
+
+def get_proposal_or_404(pk):
+    """
+    Return the concrete proposal ``pk`` loaded with ``proposal_queryset``,
+    or raise Http404.
+    """
+    try:
+        proposal = proposal_queryset().get(pk=pk)
+    except ProposalBase.DoesNotExist:
+        raise Http404()
+    _copy_base_caches(proposal)
+    return proposal
+
+
+def get_proposal_section_or_404(slug):
+    """
+    Return the cached proposal section of the section ``slug``, or raise
+    Http404.
+    """
+    try:
+        return get_proposal_section(slug)
+    except ProposalSection.DoesNotExist:
+        raise Http404()
@@ -23,6 +23,7 @@ from symposion.proposals.models import (
     ProposalBase, ProposalSection, ProposalKind
 )
 from symposion.proposals.models import SupportingDocument, AdditionalSpeaker
+from symposion.proposals.utils import get_proposal_or_404
 from symposion.speakers.models import Speaker
 from symposion.utils.mail import send_email
 
@@ -104,9 +105,7 @@ def proposal_submit_kind(request, kind_slug):
 
 @login_required
 def proposal_speaker_manage(request, pk):
-    queryset = ProposalBase.objects.select_related("speaker")
-    proposal = get_object_or_404(queryset, pk=pk)
-    proposal = ProposalBase.objects.get_subclass(pk=proposal.pk)
+    proposal = get_proposal_or_404(pk)
 
     if proposal.speaker != request.user.speaker_profile:
         raise Http404()
@@ -184,9 +183,7 @@ def proposal_speaker_manage(request, pk):
 
 @login_required
 def proposal_edit(request, pk):
-    queryset = ProposalBase.objects.select_related("speaker")
-    proposal = get_object_or_404(queryset, pk=pk)
-    proposal = ProposalBase.objects.get_subclass(pk=proposal.pk)
+    proposal = get_proposal_or_404(pk)
 
     if request.user != proposal.speaker.user:
         raise Http404()
@@ -236,9 +233,7 @@ def proposal_edit(request, pk):
 
 @login_required
 def proposal_detail(request, pk):
-    queryset = ProposalBase.objects.select_related("speaker", "speaker__user")
-    proposal = get_object_or_404(queryset, pk=pk)
-    proposal = ProposalBase.objects.get_subclass(pk=proposal.pk)
+    proposal = get_proposal_or_404(pk)
 
     if request.user not in [p.user for p in proposal.speakers()]:
         raise Http404()
@@ -289,9 +284,7 @@ def proposal_detail(request, pk):
 
 @login_required
 def proposal_cancel(request, pk):
-    queryset = ProposalBase.objects.select_related("speaker")
-    proposal = get_object_or_404(queryset, pk=pk)
-    proposal = ProposalBase.objects.get_subclass(pk=proposal.pk)
+    proposal = get_proposal_or_404(pk)
 
     if proposal.speaker.user != request.user:
         return HttpResponseForbidden()
@@ -310,16 +303,15 @@ def proposal_cancel(request, pk):
 
 @login_required
 def proposal_leave(request, pk):
-    queryset = ProposalBase.objects.select_related("speaker")
-    proposal = get_object_or_404(queryset, pk=pk)
-    proposal = ProposalBase.objects.get_subclass(pk=proposal.pk)
+    proposal = get_proposal_or_404(pk)
 
-    try:
-        speaker = proposal.additional_speakers.get(user=request.user)
-    except ObjectDoesNotExist:
+    for additional in proposal.additionalspeaker_set.all():
+        if additional.speaker.user_id == request.user.pk:
+            break
+    else:
         return HttpResponseForbidden()
     if request.method == "POST":
-        proposal.additional_speakers.remove(speaker)
+        additional.delete()
         # @@@ fire off email to submitter and other speakers
         messages.success(request, "You are no longer speaking on %s" % proposal.title)
         return redirect("dashboard")
@@ -359,9 +351,7 @@ def proposal_pending_decline(request, pk):
 
 @login_required
 def document_create(request, proposal_pk):
-    queryset = ProposalBase.objects.select_related("speaker")
-    proposal = get_object_or_404(queryset, pk=proposal_pk)
-    proposal = ProposalBase.objects.get_subclass(pk=proposal.pk)
+    proposal = get_proposal_or_404(proposal_pk)
 
     if proposal.cancelled:
         return HttpResponseForbidden()
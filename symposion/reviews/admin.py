@@ -1,6 +1,8 @@
 from django.contrib import admin
 
-from symposion.reviews.models import NotificationTemplate, ProposalResult, ResultNotification
+from symposion.reviews.models import (
+    DeclaredConflict, NotificationTemplate, ProposalResult, ResultNotification
+)
 
 
 admin.site.register(
@@ -17,4 +19,9 @@ admin.site.register(
     list_display=['proposal', 'status', 'score', 'vote_count', 'accepted']
 )
 
-admin.site.register(ResultNotification)
\ No newline at end of file
+admin.site.register(ResultNotification)
+
+admin.site.register(
+    DeclaredConflict,
+    list_display=['user', 'speaker', 'reason']
+)
@@ -0,0 +1,145 @@
+"""
+Conflict-of-interest index for reviewers.
+
+A reviewer has a conflict with a proposal when one of its (non-declined)
+speakers is the reviewer, has co-presented a scheduled presentation with
+the reviewer, or is named in one of the reviewer's ``DeclaredConflict``
+rows. The index is built for every user at once with a handful of queries
+and cached until speakers, presentations or declarations change, so that
+checks are set lookups rather than per-proposal queries.
+"""
+from __future__ import unicode_literals
+
+from collections import defaultdict
+
+from django.apps import apps
+from django.core.cache import cache
+
+from django.contrib.auth.models import User
+
+from symposion.proposals.models import AdditionalSpeaker, ProposalBase
+from symposion.schedule.models import Presentation
+from symposion.speakers.models import Speaker
+from symposion.utils.cache import get_version, versioned_key
+
+
+CONFLICTS_CACHE_VERSION = "review_conflicts"
+
+REVIEWERS_GROUP = "reviewers"
+
+
+def build_index():
+    """
+    Return the conflict index as a dict of:
+
+    ``speaking``
+        user id -> ids of the proposals the user speaks on
+    ``conflicts``
+        user id -> ids of the proposals the user must not review
+    ``conflicted_users``
+        proposal id -> ids of the users in conflict with it
+    ``reviewers``
+        ids of the members of the reviewers group
+    """
+    speaker_users = dict(Speaker.objects.exclude(user=None).values_list("pk", "user"))
+
+    speaker_proposals = defaultdict(set)
+    for proposal_id, speaker_id in ProposalBase.objects.values_list("pk", "speaker"):
+        speaker_proposals[speaker_id].add(proposal_id)
+    for proposal_id, speaker_id in AdditionalSpeaker.objects.exclude(
+        status=AdditionalSpeaker.SPEAKING_STATUS_DECLINED
+    ).values_list("proposalbase", "speaker"):
+        speaker_proposals[speaker_id].add(proposal_id)
+
+    # speakers each user is too close to: themselves, past co-presenters and
+    # declared conflicts
+    related = defaultdict(set)
+    for speaker_id, user_id in speaker_users.items():
+        related[user_id].add(speaker_id)
+
+    presenters = defaultdict(set)
+    for presentation_id, speaker_id in Presentation.objects.values_list("pk", "speaker"):
+        presenters[presentation_id].add(speaker_id)
+    through = Presentation.additional_speakers.through
+    for presentation_id, speaker_id in through.objects.values_list("presentation", "speaker"):
+        presenters[presentation_id].add(speaker_id)
+    for speakers in presenters.values():
+        if len(speakers) < 2:
+            continue
+        for speaker_id in speakers:
+            if speaker_id in speaker_users:
+                related[speaker_users[speaker_id]].update(speakers)
+
+    DeclaredConflict = apps.get_model("symposion_reviews", "DeclaredConflict")
+    for user_id, speaker_id in DeclaredConflict.objects.values_list("user", "speaker"):
+        related[user_id].add(speaker_id)
+
+    speaking = {}
+    for speaker_id, user_id in speaker_users.items():
+        if speaker_proposals.get(speaker_id):
+            speaking.setdefault(user_id, set()).update(speaker_proposals[speaker_id])
+
+    conflicts = {}
+    conflicted_users = defaultdict(set)
+    for user_id, speaker_ids in related.items():
+        proposal_ids = set()
+        for speaker_id in speaker_ids:
+            proposal_ids.update(speaker_proposals.get(speaker_id, ()))
+        if proposal_ids:
+            conflicts[user_id] = proposal_ids
+            for proposal_id in proposal_ids:
+                conflicted_users[proposal_id].add(user_id)
+
+    return {
+        "speaking": speaking,
+        "conflicts": conflicts,
+        "conflicted_users": dict(conflicted_users),
+        "reviewers": set(User.objects.filter(
+            groups__name=REVIEWERS_GROUP).values_list("pk", flat=True)),
+    }
+
+
+# the last index this process loaded, reused while its version is current
+_loaded = {}
+
+
+def conflict_index():
+    """Return the cached conflict index, building it if necessary."""
+    version = get_version(CONFLICTS_CACHE_VERSION)
+    if _loaded.get("version") == version:
+        return _loaded["index"]
+    key = versioned_key(CONFLICTS_CACHE_VERSION, "index")
+    index = cache.get(key)
+    if index is None:
+        index = build_index()
+        cache.set(key, index)
+    _loaded.update(version=version, index=index)
+    return index
+
+
+def _user_id(user):
+    return getattr(user, "pk", user)
+
+
+def conflicts_for(user):
+    """Return the ids of the proposals ``user`` (a user or user id) must not review."""
+    return conflict_index()["conflicts"].get(_user_id(user), frozenset())
+
+
+def speaking_for(user):
+    """Return the ids of the proposals ``user`` (a user or user id) speaks on."""
+    return conflict_index()["speaking"].get(_user_id(user), frozenset())
+
+
+def conflicted_users(proposal):
+    """Return the ids of the users in conflict with ``proposal`` (or its id)."""
+    return conflict_index()["conflicted_users"].get(getattr(proposal, "pk", proposal), frozenset())
+
+
+def has_conflict(user, proposal):
+    return getattr(proposal, "pk", proposal) in conflicts_for(user)
+
+
+def is_reviewer(user):
+    """Return True if ``user`` is in the reviewers group."""
+    return _user_id(user) in conflict_index()["reviewers"]
@@ -1,11 +1,10 @@
-from symposion.proposals.models import ProposalSection
+from django.utils.functional import SimpleLazyObject
+
+from symposion.reviews.utils import review_sections
 
 
 def reviews(request):
-    sections = []
-    for section in ProposalSection.objects.all():
-        if request.user.has_perm("reviews.can_review_%s" % section.section.slug):
-            sections.append(section)
+    # only worked out if a template actually uses it
     return {
-        "review_sections": sections,
+        "review_sections": SimpleLazyObject(lambda: review_sections(request.user)),
     }
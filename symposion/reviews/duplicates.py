@@ -0,0 +1,243 @@
+"""
+Near-duplicate proposal detection.
+
+Each proposal's title and abstract are broken into overlapping word
+shingles and summarised by a MinHash signature, stored in
+``ProposalSignature``. The signature of a proposal is recomputed after a
+save that changes its text commits, and ``find_duplicate_proposals``
+refreshes any that are missing or stale; pages only read them. Banded
+locality-sensitive hashing then finds candidate pairs without comparing
+every proposal against every other, and candidates whose estimated Jaccard
+similarity reaches ``SYMPOSION_DUPLICATE_THRESHOLD`` are reported.
+"""
+from __future__ import unicode_literals
+
+import hashlib
+import re
+import zlib
+
+from collections import defaultdict
+
+import numpy
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from symposion.conf import settings
+from symposion.proposals.models import ProposalBase
+from symposion.reviews.models import DUPLICATES_CACHE_VERSION, ProposalSignature
+from symposion.utils.cache import bump_version_on_commit, versioned_key
+
+
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 128
+BANDS = 32
+ROWS = NUM_PERMUTATIONS // BANDS
+SEED = 20170101
+
+# hash permutations are (a * x + b) mod PRIME with x a 32 bit shingle hash
+# and a, b < 2 ** 31, so the products fit in 64 bits
+PRIME = (1 << 61) - 1
+
+# part of every digest so that changing the parameters above invalidates
+# the stored signatures
+PARAMETERS = "%d:%d:%d" % (SHINGLE_SIZE, NUM_PERMUTATIONS, SEED)
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+_permutations = []
+
+
+def _get_permutations():
+    if not _permutations:
+        state = numpy.random.RandomState(SEED)
+        a = state.randint(1, 1 << 31, size=NUM_PERMUTATIONS).astype(numpy.uint64)
+        b = state.randint(0, 1 << 31, size=NUM_PERMUTATIONS).astype(numpy.uint64)
+        _permutations.extend([a, b])
+    return _permutations
+
+
+def text_for(title, abstract):
+    return "%s\n%s" % (title, abstract)
+
+
+def digest(text):
+    return hashlib.sha1(("%s\0%s" % (PARAMETERS, text)).encode("utf-8")).hexdigest()
+
+
+def shingles(text):
+    """Return the set of 32 bit hashes of the word shingles in ``text``."""
+    words = WORD_RE.findall(text.lower())
+    if not words:
+        return set()
+    count = max(len(words) - SHINGLE_SIZE + 1, 1)
+    return set(
+        zlib.crc32(" ".join(words[i:i + SHINGLE_SIZE]).encode("utf-8")) & 0xffffffff
+        for i in range(count)
+    )
+
+
+def minhash(text):
+    """
+    Return the MinHash signature of ``text`` as an array of
+    ``NUM_PERMUTATIONS`` uint64s, or None if it has no words.
+    """
+    hashes = shingles(text)
+    if not hashes:
+        return None
+    a, b = _get_permutations()
+    x = numpy.fromiter(hashes, dtype=numpy.uint64, count=len(hashes))[:, numpy.newaxis]
+    return ((x * a + b) % numpy.uint64(PRIME)).min(axis=0)
+
+
+def _signature_bytes(signature):
+    return signature.astype("<u8").tobytes() if signature is not None else b""
+
+
+def signatures(queryset=None):
+    """
+    Return ``{proposal pk: signature}`` from the stored signatures of the
+    proposals in ``queryset`` (default: all). Nothing is computed or
+    written; proposals without a signature are left out.
+    """
+    stored = ProposalSignature.objects.exclude(signature=b"")
+    if queryset is not None:
+        stored = stored.filter(proposal__in=queryset.order_by().values("pk"))
+    return dict(
+        (pk, numpy.frombuffer(bytes(value), dtype="<u8"))
+        for pk, value in stored.values_list("proposal", "signature")
+    )
+
+
+def update_signature(proposal_id):
+    """
+    Recompute the stored signature of one proposal if its title or abstract
+    no longer match it. Returns True if the signature was written.
+    """
+    rows = ProposalBase.objects.filter(pk=proposal_id).values_list("title", "abstract")
+    if not rows:
+        return False
+    text = text_for(*rows[0])
+    text_digest = digest(text)
+    stored = ProposalSignature.objects.filter(proposal=proposal_id)
+    if stored.filter(digest=text_digest).exists():
+        return False
+    value = _signature_bytes(minhash(text))
+    if not stored.update(digest=text_digest, signature=value):
+        try:
+            with transaction.atomic():
+                ProposalSignature.objects.create(
+                    proposal_id=proposal_id, digest=text_digest, signature=value)
+        except IntegrityError:
+            # created by a concurrent save of the same proposal
+            return False
+    bump_version_on_commit(DUPLICATES_CACHE_VERSION)
+    return True
+
+
+def update_signatures(queryset=None):
+    """
+    Compute and store the missing or stale signatures of the proposals in
+    ``queryset`` (default: all). Returns the number written.
+    """
+    if queryset is None:
+        queryset = ProposalBase.objects.all()
+    rows = queryset.order_by().values_list("pk", "title", "abstract")
+    stored = dict(ProposalSignature.objects.filter(
+        proposal__in=queryset.order_by().values("pk")
+    ).values_list("proposal", "digest"))
+
+    fresh = []
+    for pk, title, abstract in rows:
+        text = text_for(title, abstract)
+        text_digest = digest(text)
+        if stored.get(pk) != text_digest:
+            fresh.append(ProposalSignature(
+                proposal_id=pk, digest=text_digest, signature=_signature_bytes(minhash(text))))
+
+    if fresh:
+        with transaction.atomic():
+            ProposalSignature.objects.filter(
+                proposal__in=[signature.proposal_id for signature in fresh]
+            ).delete()
+            ProposalSignature.objects.bulk_create(fresh)
+        bump_version_on_commit(DUPLICATES_CACHE_VERSION)
+    return len(fresh)
+
+
+def _find(parents, pk):
+    while parents[pk] != pk:
+        parents[pk] = parents[parents[pk]]
+        pk = parents[pk]
+    return pk
+
+
+def similar_pairs(signatures, threshold=None):
+    """
+    Return ``{(pk, other_pk): similarity}`` for the pairs of ``signatures``
+    that share an LSH band and whose estimated Jaccard similarity is at
+    least ``threshold``.
+    """
+    if threshold is None:
+        threshold = settings.SYMPOSION_DUPLICATE_THRESHOLD
+    buckets = defaultdict(list)
+    for pk, signature in signatures.items():
+        for band in range(BANDS):
+            buckets[(band, signature[band * ROWS:(band + 1) * ROWS].tobytes())].append(pk)
+
+    pairs = {}
+    for pks in buckets.values():
+        if len(pks) < 2:
+            continue
+        pks.sort()
+        for i, pk in enumerate(pks):
+            for other in pks[i + 1:]:
+                if (pk, other) in pairs:
+                    continue
+                similarity = float(numpy.mean(signatures[pk] == signatures[other]))
+                if similarity >= threshold:
+                    pairs[(pk, other)] = similarity
+    return pairs
+
+
+def clusters(pairs):
+    """
+    Group the proposals in ``pairs`` into clusters of possible duplicates,
+    largest first; each cluster is a sorted list of proposal pks.
+    """
+    parents = {}
+    for pk, other in pairs:
+        parents.setdefault(pk, pk)
+        parents.setdefault(other, other)
+        parents[_find(parents, pk)] = _find(parents, other)
+    groups = defaultdict(list)
+    for pk in parents:
+        groups[_find(parents, pk)].append(pk)
+    return sorted((sorted(group) for group in groups.values()), key=lambda group: (-len(group), group))
+
+
+def find_duplicates(queryset=None, threshold=None):
+    """
+    Return ``(clusters, pairs)`` for the proposals in ``queryset``, from
+    their stored signatures.
+    """
+    pairs = similar_pairs(signatures(queryset), threshold)
+    return clusters(pairs), pairs
+
+
+def duplicate_candidates(proposal):
+    """
+    Return ``[(other pk, similarity)]`` for the proposals that look like
+    duplicates of ``proposal``, most similar first. The pairs for all
+    proposals are cached until a signature changes.
+    """
+    key = versioned_key(DUPLICATES_CACHE_VERSION, "pairs", settings.SYMPOSION_DUPLICATE_THRESHOLD)
+    neighbours = cache.get(key)
+    if neighbours is None:
+        neighbours = defaultdict(list)
+        for (pk, other), similarity in similar_pairs(signatures()).items():
+            neighbours[pk].append((other, similarity))
+            neighbours[other].append((pk, similarity))
+        neighbours = dict(neighbours)
+        cache.set(key, neighbours)
+    return sorted(neighbours.get(proposal.pk, []), key=lambda item: -item[1])
@@ -2,7 +2,7 @@ from __future__ import unicode_literals
 from django import forms
 from django.utils.translation import ugettext_lazy as _
 
-from symposion.reviews.models import Review, Comment, ProposalMessage, VOTES
+from symposion.reviews.models import Review, Comment, ProposalMessage, ProposalResult, VOTES
 
 
 class ReviewForm(forms.ModelForm):
@@ -34,5 +34,16 @@ class BulkPresentationForm(forms.Form):
     talk_ids = forms.CharField(
         label=_("Talk ids"),
         max_length=500,
-        help_text=_("Provide a comma seperated list of talk ids to accept.")
+        help_text=_("Provide a comma seperated list of talk ids to update.")
     )
+    status = forms.ChoiceField(
+        label=_("Status"),
+        choices=ProposalResult._meta.get_field("status").choices,
+        initial="accepted",
+    )
+
+    def clean_talk_ids(self):
+        try:
+            return [int(pk) for pk in self.cleaned_data["talk_ids"].split(",") if pk.strip()]
+        except ValueError:
+            raise forms.ValidationError(_("Talk ids must be numbers separated by commas."))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from symposion.proposals.models import ProposalBase
+from symposion.reviews.duplicates import find_duplicates, update_signatures
+
+
+class Command(BaseCommand):
+    help = "List clusters of proposals whose title and abstract look like near duplicates."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--section", help="Only compare proposals in the section with this slug.")
+        parser.add_argument(
+            "--threshold", type=float,
+            help="Minimum estimated similarity (default SYMPOSION_DUPLICATE_THRESHOLD).")
+
+    def handle(self, *args, **options):
+        queryset = ProposalBase.objects.all()
+        if options["section"]:
+            queryset = queryset.filter(kind__section__slug=options["section"])
+
+        updated = update_signatures(queryset)
+        if updated:
+            self.stdout.write("Updated %d proposal signatures" % updated)
+        clusters, pairs = find_duplicates(queryset, options["threshold"])
+
+        proposals = ProposalBase.objects.select_related("kind__section").in_bulk(
+            [pk for cluster in clusters for pk in cluster])
+        for cluster in clusters:
+            self.stdout.write("")
+            for pk in cluster:
+                proposal = proposals[pk]
+                scores = [
+                    similarity for pair, similarity in pairs.items() if pk in pair
+                ]
+                self.stdout.write("  #%s %s [%s / %s] (max similarity %.2f)" % (
+                    proposal.number, proposal.title, proposal.kind.section.slug,
+                    proposal.kind.slug, max(scores)))
+        self.stdout.write("%d possible duplicate clusters" % len(clusters))
@@ -1,16 +1,29 @@
+import time
+
 from django.core.management.base import BaseCommand
-from django.db import connections
+from django.core.management.color import no_style
+from django.db import connection
 
-from symposion.reviews.models import ProposalResult, promote_proposal
+from symposion.reviews.promotion import sync_presentations
+from symposion.schedule.models import Session
 
 
 class Command(BaseCommand):
 
+    help = "Create or refresh presentations for accepted proposals and remove the rest."
+
     def handle(self, *args, **options):
-        accepted_proposals = ProposalResult.objects.filter(status="accepted")
-        accepted_proposals = accepted_proposals.order_by("proposal")
+        started = time.time()
+        counts = sync_presentations()
+
+        # keep the session id sequence in step with rows loaded with
+        # explicit ids; a no-op on backends without sequences
+        statements = connection.ops.sequence_reset_sql(no_style(), [Session])
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
 
-        for result in accepted_proposals:
-            promote_proposal(result.proposal)
-        connections["default"].cursor().execute(
-            "SELECT setval('schedule_session_id_seq', (SELECT max(id) FROM schedule_session))")
+        self.stdout.write(
+            "Presentations created: %(created)d, updated: %(updated)d, deleted: %(deleted)d" % counts)
+        self.stdout.write("Finished in %.2fs" % (time.time() - started))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from symposion.reviews.models import ReviewQueueEntry
+
+
+class Command(BaseCommand):
+    help = "Recreate every reviewer's queue of proposals still to review."
+
+    def handle(self, *args, **options):
+        count = ReviewQueueEntry.rebuild()
+        self.stdout.write("Rebuilt the review queue for %d reviewers" % count)
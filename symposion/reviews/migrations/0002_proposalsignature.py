@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('symposion_proposals', '0001_initial'),
+        ('symposion_reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProposalSignature',
+            fields=[
+                ('proposal', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='symposion_proposals.ProposalBase', verbose_name='Proposal')),
+                ('digest', models.CharField(max_length=40, verbose_name='Digest')),
+                ('signature', models.BinaryField(verbose_name='Signature')),
+            ],
+            options={
+                'verbose_name': 'proposal signature',
+                'verbose_name_plural': 'proposal signatures',
+            },
+        ),
+    ]
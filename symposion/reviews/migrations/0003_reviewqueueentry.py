@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('symposion_conference', '0001_initial'),
+        ('symposion_proposals', '0001_initial'),
+        ('symposion_reviews', '0002_proposalsignature'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewQueueEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assigned', models.BooleanField(default=False, verbose_name='Assigned')),
+                ('proposal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_queue_entries', to='symposion_proposals.ProposalBase', verbose_name='Proposal')),
+                ('section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='symposion_conference.Section', verbose_name='Section')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_queue', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'review queue entry',
+                'verbose_name_plural': 'review queue entries',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='reviewqueueentry',
+            unique_together=set([('user', 'proposal')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='reviewqueueentry',
+            index_together=set([('user', 'section')]),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('symposion_speakers', '0002_auto_20161230_1900'),
+        ('symposion_reviews', '0003_reviewqueueentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeclaredConflict',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(blank=True, max_length=255, verbose_name='Reason')),
+                ('speaker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='declared_conflicts', to='symposion_speakers.Speaker', verbose_name='Speaker')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='declared_conflicts', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'declared conflict',
+                'verbose_name_plural': 'declared conflicts',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='declaredconflict',
+            unique_together=set([('user', 'speaker')]),
+        ),
+    ]
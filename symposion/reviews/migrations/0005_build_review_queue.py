@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations
+
+
+def build_review_queue(apps, schema_editor):
+    # The queue is derived from permissions, teams, reviews and conflicts;
+    # the real model is used so that it is built exactly as
+    # rebuild_review_queue would.
+    from symposion.reviews.models import ReviewQueueEntry
+    ReviewQueueEntry.rebuild()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('teams', '0001_initial'),
+        ('symposion_reviews', '0004_declaredconflict'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_review_queue, migrations.RunPython.noop),
+    ]
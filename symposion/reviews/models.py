@@ -5,18 +5,27 @@ from decimal import Decimal
 
 from django.core.exceptions import ValidationError
 
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Q, F
 from django.db.models import Case, When, Value
 from django.db.models import Count
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
 
-from django.contrib.auth.models import User
+from django.contrib.auth.models import Group, User
+from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 
-from symposion.markdown_parser import parse
-from symposion.proposals.models import ProposalBase
+from symposion.markdown_parser import MarkdownFieldsMixin
+from symposion.conference.models import Section
+from symposion.proposals.models import AdditionalSpeaker, ProposalBase, ProposalSection
+from symposion.reviews.conflicts import CONFLICTS_CACHE_VERSION, conflicted_users, conflicts_for
+from symposion.reviews.utils import (
+    PROPOSAL_SECTIONS_CACHE_VERSION, REVIEW_SECTIONS_CACHE_VERSION, section_reviewers
+)
 from symposion.schedule.models import Presentation
+from symposion.speakers.models import Speaker
+from symposion.teams.models import Membership, Team
+from symposion.utils.cache import bump_version_on_commit
 
 
 def score_expression():
@@ -73,13 +82,8 @@ class ReviewAssignment(models.Model):
 
     @classmethod
     def create_assignments(cls, proposal, origin=AUTO_ASSIGNED_INITIAL):
-        speakers = [proposal.speaker] + list(proposal.additional_speakers.all())
         reviewers = User.objects.exclude(
-            pk__in=[
-                speaker.user_id
-                for speaker in speakers
-                if speaker.user_id is not None
-            ] + [
+            pk__in=list(conflicted_users(proposal)) + [
                 assignment.user_id
                 for assignment in ReviewAssignment.objects.filter(
                     proposal_id=proposal.id)]
@@ -102,7 +106,9 @@ class ReviewAssignment(models.Model):
             )
 
 
-class ProposalMessage(models.Model):
+class ProposalMessage(MarkdownFieldsMixin, models.Model):
+    markdown_fields = ("message",)
+
     proposal = models.ForeignKey(ProposalBase, related_name="messages", verbose_name=_("Proposal"))
     user = models.ForeignKey(User, verbose_name=_("User"))
 
@@ -110,18 +116,15 @@ class ProposalMessage(models.Model):
     message_html = models.TextField(blank=True)
     submitted_at = models.DateTimeField(default=datetime.now, editable=False, verbose_name=_("Submitted at"))
 
-    def save(self, *args, **kwargs):
-        self.message_html = parse(self.message)
-        return super(ProposalMessage, self).save(*args, **kwargs)
-
     class Meta:
         ordering = ["submitted_at"]
         verbose_name = _("proposal message")
         verbose_name_plural = _("proposal messages")
 
 
-class Review(models.Model):
+class Review(MarkdownFieldsMixin, models.Model):
     VOTES = VOTES
+    markdown_fields = ("comment",)
 
     proposal = models.ForeignKey(ProposalBase, related_name="reviews", verbose_name=_("Proposal"))
     user = models.ForeignKey(User, verbose_name=_("User"))
@@ -145,7 +148,6 @@ class Review(models.Model):
             raise ValidationError(err)
 
     def save(self, **kwargs):
-        self.comment_html = parse(self.comment)
         if self.vote:
             vote, created = LatestVote.objects.get_or_create(
                 proposal=self.proposal,
@@ -308,7 +310,9 @@ class ProposalResult(models.Model):
         verbose_name_plural = _("proposal_results")
 
 
-class Comment(models.Model):
+class Comment(MarkdownFieldsMixin, models.Model):
+    markdown_fields = ("text",)
+
     proposal = models.ForeignKey(ProposalBase, related_name="comments", verbose_name=_("Proposal"))
     commenter = models.ForeignKey(User, verbose_name=_("Commenter"))
     text = models.TextField(verbose_name=_("Text"))
@@ -322,10 +326,6 @@ class Comment(models.Model):
         verbose_name = _("comment")
         verbose_name_plural = _("comments")
 
-    def save(self, *args, **kwargs):
-        self.text_html = parse(self.text)
-        return super(Comment, self).save(*args, **kwargs)
-
 
 class NotificationTemplate(models.Model):
 
@@ -362,6 +362,147 @@ class ResultNotification(models.Model):
         return (self.subject, self.body, self.from_address, self.recipients())
 
 
+@python_2_unicode_compatible
+class DeclaredConflict(models.Model):
+    """
+    A conflict of interest declared by a reviewer with a speaker, e.g. a
+    colleague, which keeps the speaker's proposals out of their reviews.
+    """
+
+    user = models.ForeignKey(User, related_name="declared_conflicts", verbose_name=_("User"))
+    speaker = models.ForeignKey(Speaker, related_name="declared_conflicts", verbose_name=_("Speaker"))
+    reason = models.CharField(max_length=255, blank=True, verbose_name=_("Reason"))
+
+    class Meta:
+        unique_together = [("user", "speaker")]
+        verbose_name = _("declared conflict")
+        verbose_name_plural = _("declared conflicts")
+
+    def __str__(self):
+        return "%s / %s" % (self.user, self.speaker)
+
+
+class ReviewQueueEntry(models.Model):
+    """
+    A proposal still waiting for a review from ``user``: it is in a section
+    they review, it is not cancelled, they have no conflict of interest with
+    it (see ``symposion.reviews.conflicts``) and they have not reviewed it
+    yet.
+
+    Maintained from signals on reviews, assignments, speakers, proposals,
+    team memberships, users and permission grants;
+    ``manage.py rebuild_review_queue`` recreates it.
+    """
+
+    user = models.ForeignKey(User, related_name="review_queue", verbose_name=_("User"))
+    proposal = models.ForeignKey(ProposalBase, related_name="review_queue_entries",
+                                 verbose_name=_("Proposal"))
+    section = models.ForeignKey(Section, related_name="+", verbose_name=_("Section"))
+    assigned = models.BooleanField(default=False, verbose_name=_("Assigned"))
+
+    class Meta:
+        unique_together = [("user", "proposal")]
+        index_together = [("user", "section")]
+        verbose_name = _("review queue entry")
+        verbose_name_plural = _("review queue entries")
+
+    @classmethod
+    def _sync(cls, entries, wanted, assigned):
+        """
+        Make ``entries`` match ``wanted``, a {(user id, proposal id): section
+        id} map, flagging the keys in ``assigned``.
+        """
+        existing = dict(
+            ((user_id, proposal_id), (pk, is_assigned))
+            for pk, user_id, proposal_id, is_assigned in entries.values_list(
+                "pk", "user", "proposal", "assigned")
+        )
+        stale = [pk for key, (pk, is_assigned) in existing.items() if key not in wanted]
+        if stale:
+            cls._default_manager.filter(pk__in=stale).delete()
+        cls._default_manager.bulk_create([
+            cls(user_id=key[0], proposal_id=key[1], section_id=section_id,
+                assigned=key in assigned)
+            for key, section_id in wanted.items() if key not in existing
+        ])
+        for flag in (True, False):
+            pks = [
+                pk for key, (pk, is_assigned) in existing.items()
+                if key in wanted and is_assigned != flag and (key in assigned) == flag
+            ]
+            if pks:
+                cls._default_manager.filter(pk__in=pks).update(assigned=flag)
+
+    @classmethod
+    def refresh_for_proposal(cls, proposal_id):
+        try:
+            proposal = ProposalBase.objects.select_related("kind__section").get(pk=proposal_id)
+        except ProposalBase.DoesNotExist:
+            return
+        wanted = {}
+        if not proposal.cancelled:
+            section = proposal.kind.section
+            excluded = set(Review.objects.filter(proposal=proposal_id).values_list("user", flat=True))
+            excluded.update(conflicted_users(proposal_id))
+            wanted = dict(
+                ((user_id, proposal_id), section.pk)
+                for user_id in section_reviewers(section) - excluded
+            )
+        assigned = set(
+            (user_id, proposal_id)
+            for user_id in ReviewAssignment.objects.filter(
+                proposal=proposal_id, opted_out=False).values_list("user", flat=True)
+        )
+        cls._sync(cls._default_manager.filter(proposal=proposal_id), wanted, assigned)
+
+    @classmethod
+    def refresh_for_user(cls, user_id):
+        sections = [
+            section for section in Section.objects.filter(proposalsection__isnull=False)
+            if user_id in section_reviewers(section)
+        ]
+        proposals = ProposalBase.objects.filter(
+            kind__section__in=sections, cancelled=False
+        ).exclude(
+            pk__in=conflicts_for(user_id)
+        ).exclude(
+            reviews__user=user_id
+        ).values_list("pk", "kind__section")
+        wanted = dict(((user_id, pk), section_id) for pk, section_id in proposals)
+        assigned = set(
+            (user_id, proposal_id)
+            for proposal_id in ReviewAssignment.objects.filter(
+                user=user_id, opted_out=False).values_list("proposal", flat=True)
+        )
+        cls._sync(cls._default_manager.filter(user=user_id), wanted, assigned)
+
+    @classmethod
+    def rebuild(cls):
+        user_ids = set(cls._default_manager.values_list("user", flat=True).distinct())
+        for section in Section.objects.filter(proposalsection__isnull=False):
+            user_ids.update(section_reviewers(section))
+        for user_id in user_ids:
+            cls.refresh_for_user(user_id)
+        return len(user_ids)
+
+
+class ProposalSignature(models.Model):
+    """
+    Cached MinHash signature of a proposal's title and abstract, used by
+    ``symposion.reviews.duplicates``. ``digest`` identifies the text and
+    parameters the signature was computed from.
+    """
+
+    proposal = models.OneToOneField(ProposalBase, primary_key=True, related_name="signature",
+                                    verbose_name=_("Proposal"))
+    digest = models.CharField(max_length=40, verbose_name=_("Digest"))
+    signature = models.BinaryField(verbose_name=_("Signature"))
+
+    class Meta:
+        verbose_name = _("proposal signature")
+        verbose_name_plural = _("proposal signatures")
+
+
 def promote_proposal(proposal):
     if hasattr(proposal, "presentation") and proposal.presentation:
         # already promoted
@@ -381,9 +522,7 @@ def promote_proposal(proposal):
             proposal_base=proposal,
         )
         presentation.save()
-    for speaker in proposal.additional_speakers.all():
-        presentation.additional_speakers.add(speaker)
-        presentation.save()
+    presentation.additional_speakers.add(*proposal.additional_speakers.all())
 
     return presentation
 
@@ -393,11 +532,271 @@ def unpromote_proposal(proposal):
         proposal.presentation.delete()
 
 
-def accepted_proposal(sender, instance=None, **kwargs):
-    if instance is None:
+def result_loaded(sender, instance=None, **kwargs):
+    # remember the stored status so that saves which leave it unchanged
+    # do not promote the proposal again
+    instance._initial_status = instance.__dict__.get("status")
+
+
+def accepted_proposal(sender, instance=None, created=False, raw=False, **kwargs):
+    if instance is None or raw:
         return
-    if instance.status == "accepted":
-        promote_proposal(instance.proposal)
-    else:
-        unpromote_proposal(instance.proposal)
+    if created or instance.status != instance._initial_status:
+        if instance.status == "accepted":
+            promote_proposal(instance.proposal)
+        elif instance._initial_status == "accepted" or created:
+            unpromote_proposal(instance.proposal)
+    instance._initial_status = instance.status
+post_init.connect(result_loaded, sender=ProposalResult)
 post_save.connect(accepted_proposal, sender=ProposalResult)
+
+
+DUPLICATES_CACHE_VERSION = "proposal_duplicates"
+
+
+def proposal_text_changed(sender, instance=None, raw=False, update_fields=None, **kwargs):
+    # connected without a sender so that every ProposalBase subclass is seen
+    if not isinstance(instance, ProposalBase) or raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(["title", "abstract"]):
+        return
+    # imported here as the duplicates module needs the models above
+    from symposion.reviews.duplicates import update_signature
+    pk = instance.pk
+    # the signature is only rewritten if the title or abstract changed
+    transaction.on_commit(lambda: update_signature(pk))
+
+
+def proposal_deleted(sender, instance=None, **kwargs):
+    if isinstance(instance, ProposalBase):
+        bump_version_on_commit(DUPLICATES_CACHE_VERSION)
+post_save.connect(proposal_text_changed)
+post_delete.connect(proposal_deleted)
+
+
+# The cache invalidation below is connected before the review queue
+# handlers so that, on commit, versions are bumped before the queue is
+# refreshed from the cached conflict index and reviewer lists.
+
+
+def conflicts_changed(sender, instance=None, **kwargs):
+    bump_version_on_commit(CONFLICTS_CACHE_VERSION)
+
+
+def proposal_conflicts_changed(sender, instance=None, created=False, **kwargs):
+    # connected without a sender so that every ProposalBase subclass is seen;
+    # of a proposal's own fields the index only uses its primary speaker
+    if not isinstance(instance, ProposalBase):
+        return
+    if created or instance.speaker_id != instance._initial_speaker_id:
+        bump_version_on_commit(CONFLICTS_CACHE_VERSION)
+    instance._initial_speaker_id = instance.speaker_id
+
+
+def proposal_conflicts_deleted(sender, instance=None, **kwargs):
+    if isinstance(instance, ProposalBase):
+        bump_version_on_commit(CONFLICTS_CACHE_VERSION)
+
+
+def declared_conflict_changed(sender, instance=None, raw=False, **kwargs):
+    bump_version_on_commit(CONFLICTS_CACHE_VERSION)
+    if not raw:
+        user_id = instance.user_id
+        transaction.on_commit(lambda: ReviewQueueEntry.refresh_for_user(user_id))
+post_save.connect(proposal_conflicts_changed)
+post_delete.connect(proposal_conflicts_deleted)
+post_save.connect(conflicts_changed, sender=Speaker)
+post_delete.connect(conflicts_changed, sender=Speaker)
+post_save.connect(conflicts_changed, sender=AdditionalSpeaker)
+post_delete.connect(conflicts_changed, sender=AdditionalSpeaker)
+post_save.connect(conflicts_changed, sender=Presentation)
+post_delete.connect(conflicts_changed, sender=Presentation)
+m2m_changed.connect(conflicts_changed, sender=Presentation.additional_speakers.through)
+m2m_changed.connect(conflicts_changed, sender=User.groups.through)
+post_save.connect(declared_conflict_changed, sender=DeclaredConflict)
+post_delete.connect(declared_conflict_changed, sender=DeclaredConflict)
+
+
+def proposal_sections_changed(sender, **kwargs):
+    bump_version_on_commit(PROPOSAL_SECTIONS_CACHE_VERSION)
+
+
+def auth_permissions_changed(sender, **kwargs):
+    bump_version_on_commit(REVIEW_SECTIONS_CACHE_VERSION)
+post_save.connect(proposal_sections_changed, sender=ProposalSection)
+post_delete.connect(proposal_sections_changed, sender=ProposalSection)
+post_save.connect(proposal_sections_changed, sender=Section)
+post_delete.connect(proposal_sections_changed, sender=Section)
+m2m_changed.connect(auth_permissions_changed, sender=User.user_permissions.through)
+m2m_changed.connect(auth_permissions_changed, sender=User.groups.through)
+m2m_changed.connect(auth_permissions_changed, sender=Group.permissions.through)
+
+
+def _refresh_queue_for_proposal(proposal_id):
+    transaction.on_commit(lambda: ReviewQueueEntry.refresh_for_proposal(proposal_id))
+
+
+def review_saved(sender, instance=None, raw=False, **kwargs):
+    if not raw:
+        ReviewQueueEntry.objects.filter(
+            user=instance.user_id, proposal=instance.proposal_id).delete()
+
+
+def review_deleted(sender, instance=None, **kwargs):
+    _refresh_queue_for_proposal(instance.proposal_id)
+
+
+def proposal_queue_changed(sender, instance=None, raw=False, **kwargs):
+    # connected without a sender so that every ProposalBase subclass is seen
+    if isinstance(instance, ProposalBase) and not raw:
+        _refresh_queue_for_proposal(instance.pk)
+
+
+def speaker_queue_changed(sender, instance=None, raw=False, **kwargs):
+    if not raw:
+        _refresh_queue_for_proposal(instance.proposalbase_id)
+
+
+def assignment_queue_changed(sender, instance=None, raw=False, **kwargs):
+    if not raw:
+        _refresh_queue_for_proposal(instance.proposal_id)
+
+
+def membership_queue_changed(sender, instance=None, raw=False, **kwargs):
+    if not raw:
+        user_id = instance.user_id
+        transaction.on_commit(lambda: ReviewQueueEntry.refresh_for_user(user_id))
+
+
+def _presentation_speakers(presentation_ids):
+    through = Presentation.additional_speakers.through
+    speaker_ids = set(Presentation.objects.filter(
+        pk__in=presentation_ids).values_list("speaker", flat=True))
+    speaker_ids.update(through.objects.filter(
+        presentation__in=presentation_ids).values_list("speaker", flat=True))
+    return speaker_ids
+
+
+def _refresh_queue_for_speakers(speaker_ids):
+    speaker_ids = list(speaker_ids)
+
+    def refresh():
+        proposal_ids = set(ProposalBase.objects.filter(
+            speaker__in=speaker_ids).values_list("pk", flat=True))
+        proposal_ids.update(AdditionalSpeaker.objects.filter(
+            speaker__in=speaker_ids).values_list("proposalbase", flat=True))
+        for proposal_id in proposal_ids:
+            ReviewQueueEntry.refresh_for_proposal(proposal_id)
+    transaction.on_commit(refresh)
+
+
+def speaker_loaded(sender, instance=None, **kwargs):
+    instance._initial_user_id = instance.__dict__.get("user_id")
+
+
+def speaker_user_queue_changed(sender, instance=None, created=False, raw=False, **kwargs):
+    # linking a speaker to a user gives that user conflicts with the
+    # proposals of the speaker and of everyone they have presented with
+    if raw:
+        return
+    if not created and instance.user_id != instance._initial_user_id:
+        presentation_ids = list(Presentation.objects.filter(
+            Q(speaker=instance) | Q(additional_speakers=instance)
+        ).values_list("pk", flat=True))
+        speaker_ids = _presentation_speakers(presentation_ids)
+        speaker_ids.add(instance.pk)
+        _refresh_queue_for_speakers(speaker_ids)
+    instance._initial_user_id = instance.user_id
+
+
+def presentation_speakers_queue_changed(sender, instance=None, action=None, reverse=False,
+                                        pk_set=None, **kwargs):
+    # presentation.additional_speakers or speaker.copresentations; the
+    # speakers are looked up before a removal and after an addition so
+    # that the ones leaving or joining are included
+    if action not in ("post_add", "pre_remove", "pre_clear"):
+        return
+    if not reverse:
+        presentation_ids = [instance.pk]
+    elif pk_set is not None:
+        presentation_ids = list(pk_set)
+    else:
+        presentation_ids = list(instance.copresentations.values_list("pk", flat=True))
+    speaker_ids = _presentation_speakers(presentation_ids)
+    if reverse:
+        speaker_ids.add(instance.pk)
+    elif pk_set is not None:
+        speaker_ids.update(pk_set)
+    _refresh_queue_for_speakers(speaker_ids)
+
+
+def _refresh_queue_for_users(user_ids):
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: [ReviewQueueEntry.refresh_for_user(pk) for pk in user_ids])
+
+
+def _rebuild_queue():
+    transaction.on_commit(ReviewQueueEntry.rebuild)
+
+
+def user_loaded(sender, instance=None, **kwargs):
+    # remember the flags section_reviewers looks at
+    instance._initial_reviewer_flags = (
+        instance.__dict__.get("is_superuser"), instance.__dict__.get("is_active"))
+
+
+def user_queue_changed(sender, instance=None, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    flags = (instance.is_superuser, instance.is_active)
+    if created or flags != instance._initial_reviewer_flags:
+        _refresh_queue_for_users([instance.pk])
+    instance._initial_reviewer_flags = flags
+
+
+def user_permissions_queue_changed(sender, instance=None, action=None, reverse=False,
+                                   pk_set=None, **kwargs):
+    # user.user_permissions or user.groups
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        _refresh_queue_for_users([instance.pk])
+    elif pk_set is not None:
+        _refresh_queue_for_users(pk_set)
+    else:
+        _rebuild_queue()
+
+
+def team_permissions_queue_changed(sender, instance=None, action=None, reverse=False, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if reverse:
+        _rebuild_queue()
+    else:
+        _refresh_queue_for_users(
+            Membership.objects.filter(team=instance).values_list("user", flat=True))
+
+
+def group_permissions_queue_changed(sender, action=None, **kwargs):
+    if action.startswith("post_"):
+        _rebuild_queue()
+post_save.connect(review_saved, sender=Review)
+post_delete.connect(review_deleted, sender=Review)
+post_save.connect(proposal_queue_changed)
+post_save.connect(speaker_queue_changed, sender=AdditionalSpeaker)
+post_delete.connect(speaker_queue_changed, sender=AdditionalSpeaker)
+post_save.connect(assignment_queue_changed, sender=ReviewAssignment)
+post_delete.connect(assignment_queue_changed, sender=ReviewAssignment)
+post_save.connect(membership_queue_changed, sender=Membership)
+post_delete.connect(membership_queue_changed, sender=Membership)
+post_init.connect(speaker_loaded, sender=Speaker)
+post_save.connect(speaker_user_queue_changed, sender=Speaker)
+m2m_changed.connect(presentation_speakers_queue_changed,
+                    sender=Presentation.additional_speakers.through)
+post_init.connect(user_loaded, sender=User)
+post_save.connect(user_queue_changed, sender=User)
+m2m_changed.connect(user_permissions_queue_changed, sender=User.user_permissions.through)
+m2m_changed.connect(user_permissions_queue_changed, sender=User.groups.through)
+m2m_changed.connect(group_permissions_queue_changed, sender=Group.permissions.through)
+m2m_changed.connect(team_permissions_queue_changed, sender=Team.permissions.through)
+m2m_changed.connect(team_permissions_queue_changed, sender=Team.manager_permissions.through)
@@ -0,0 +1,190 @@
+"""
+Bulk changes to proposal results.
+
+Saving a ``ProposalResult`` promotes (or unpromotes) its proposal through a
+``post_save`` signal, which costs several queries per proposal.  The
+functions here change the status of many proposals in a fixed number of
+statements and then promote or unpromote, in batch, only the proposals
+whose status actually changed.
+"""
+from __future__ import unicode_literals
+
+from django.db import transaction
+
+from symposion.markdown_parser import parse
+from symposion.proposals.models import AdditionalSpeaker, ProposalBase
+from symposion.reviews.conflicts import CONFLICTS_CACHE_VERSION
+from symposion.reviews.models import ProposalResult
+from symposion.schedule.models import SCHEDULE_CACHE_VERSION, Presentation
+from symposion.utils.cache import bump_version_on_commit
+
+
+STATUSES = [status for status, label in ProposalResult._meta.get_field("status").choices]
+
+
+def set_status(proposal_ids, status):
+    """
+    Set the result status of the proposals in ``proposal_ids`` to
+    ``status``, creating results where they are missing.
+
+    Proposals that become accepted are promoted to presentations and
+    proposals that leave the accepted state are unpromoted.  Returns the
+    list of ids whose status changed.
+    """
+    if status not in STATUSES:
+        raise ValueError("Unknown proposal status %r" % status)
+    proposal_ids = set(int(pk) for pk in proposal_ids)
+    proposal_ids = set(
+        ProposalBase.objects.filter(pk__in=proposal_ids).values_list("pk", flat=True)
+    )
+    if not proposal_ids:
+        return []
+
+    with transaction.atomic():
+        results = ProposalResult.objects.filter(proposal__in=proposal_ids)
+        existing = dict(results.values_list("proposal_id", "status"))
+        changed = set(pk for pk, current in existing.items() if current != status)
+        if changed:
+            ProposalResult.objects.filter(proposal__in=changed).update(status=status)
+
+        missing = proposal_ids - set(existing)
+        if missing:
+            ProposalResult.objects.bulk_create([
+                ProposalResult(proposal_id=pk, status=status) for pk in missing
+            ])
+            # a new result starts out undecided
+            if status != "undecided":
+                changed |= missing
+
+        if status == "accepted":
+            promote_proposals(changed)
+        else:
+            # only proposals that were accepted can have a presentation
+            unpromote_proposals(pk for pk in changed if existing.get(pk) == "accepted")
+    return sorted(changed)
+
+
+def promote_proposals(proposal_ids):
+    """
+    Create or refresh the presentations for the proposals in
+    ``proposal_ids``, copying their title, abstract and speakers.
+
+    Returns a ``(created, updated)`` pair of counts.
+    """
+    proposal_ids = list(proposal_ids)
+    if not proposal_ids:
+        return 0, 0
+    proposals = ProposalBase.objects.filter(pk__in=proposal_ids).select_related("kind")
+    presentations = dict(
+        (presentation.proposal_base_id, presentation)
+        for presentation in Presentation.objects.filter(proposal_base__in=proposal_ids)
+    )
+
+    new = []
+    updated = 0
+    for proposal in proposals:
+        presentation = presentations.get(proposal.pk)
+        if presentation is None:
+            new.append(Presentation(
+                title=proposal.title,
+                abstract=proposal.abstract,
+                abstract_html=parse(proposal.abstract),
+                speaker_id=proposal.speaker_id,
+                section_id=proposal.kind.section_id,
+                proposal_base=proposal,
+            ))
+        elif (presentation.title, presentation.abstract, presentation.speaker_id) != \
+                (proposal.title, proposal.abstract, proposal.speaker_id):
+            presentation.title = proposal.title
+            presentation.abstract = proposal.abstract
+            presentation.speaker_id = proposal.speaker_id
+            presentation.save()
+            updated += 1
+    if new:
+        Presentation.objects.bulk_create(new)
+        # bulk_create only sets primary keys on some backends
+        presentations = dict(
+            Presentation.objects.filter(
+                proposal_base__in=proposal_ids
+            ).values_list("proposal_base_id", "pk")
+        )
+    else:
+        presentations = dict(
+            (proposal_id, presentation.pk) for proposal_id, presentation in presentations.items()
+        )
+
+    sync_additional_speakers(presentations)
+
+    # bulk operations bypass the signals that normally invalidate these
+    bump_version_on_commit(SCHEDULE_CACHE_VERSION)
+    bump_version_on_commit(CONFLICTS_CACHE_VERSION)
+    return len(new), updated
+
+
+def sync_additional_speakers(presentations):
+    """
+    Make the additional speakers of each presentation match those of its
+    proposal, given a ``{proposal id: presentation id}`` map.
+
+    Stale rows are removed with one delete and missing rows added with one
+    bulk insert.
+    """
+    Through = Presentation.additional_speakers.through
+    wanted = set(
+        (presentations[proposal_id], speaker_id)
+        for proposal_id, speaker_id in AdditionalSpeaker.objects.filter(
+            proposalbase__in=list(presentations)
+        ).values_list("proposalbase_id", "speaker_id")
+    )
+    stale = []
+    for pk, presentation_id, speaker_id in Through.objects.filter(
+        presentation__in=list(presentations.values())
+    ).values_list("pk", "presentation_id", "speaker_id"):
+        if (presentation_id, speaker_id) in wanted:
+            wanted.discard((presentation_id, speaker_id))
+        else:
+            stale.append(pk)
+    if stale:
+        Through.objects.filter(pk__in=stale).delete()
+    if wanted:
+        Through.objects.bulk_create([
+            Through(presentation_id=presentation_id, speaker_id=speaker_id)
+            for presentation_id, speaker_id in wanted
+        ])
+
+
+def unpromote_proposals(proposal_ids):
+    """
+    Delete the presentations of the proposals in ``proposal_ids``.
+
+    Returns the number of presentations deleted.
+    """
+    proposal_ids = list(proposal_ids)
+    if not proposal_ids:
+        return 0
+    presentations = Presentation.objects.filter(proposal_base__in=proposal_ids)
+    count = presentations.count()
+    presentations.delete()
+    return count
+
+
+def sync_presentations():
+    """
+    Make the set of presentations match the set of accepted proposals:
+    create or refresh a presentation for every accepted proposal and
+    delete the presentations of proposals that are no longer accepted.
+
+    Returns a dict with the ``created``, ``updated`` and ``deleted``
+    counts.
+    """
+    with transaction.atomic():
+        accepted = ProposalResult.objects.filter(
+            status="accepted"
+        ).values_list("proposal_id", flat=True)
+        created, updated = promote_proposals(accepted)
+        deleted = unpromote_proposals(
+            Presentation.objects.exclude(
+                proposal_base__in=accepted
+            ).values_list("proposal_base_id", flat=True)
+        )
+    return {"created": created, "updated": updated, "deleted": deleted}
@@ -1,7 +1,7 @@
 from django import template
 from django.conf import settings
 
-from symposion.reviews.models import ReviewAssignment
+from symposion.reviews.models import ReviewAssignment, ReviewQueueEntry
 
 
 register = template.Library()
@@ -13,6 +13,19 @@ def review_assignments(context):
     assignments = ReviewAssignment.objects.filter(user=request.user)
     return assignments
 
+
+@register.assignment_tag(takes_context=True)
+def review_queue_count(context, section=None):
+    """
+    Number of proposals the current user still has to review, optionally
+    within ``section`` (a ``ProposalSection`` or conference ``Section``).
+    """
+    request = context["request"]
+    entries = ReviewQueueEntry.objects.filter(user=request.user)
+    if section is not None:
+        entries = entries.filter(section=getattr(section, "section", section))
+    return entries.count()
+
 import bleach
 
 @register.filter("bleach")
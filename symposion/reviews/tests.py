@@ -0,0 +1,358 @@
+import json
+
+from django.contrib.auth.models import Group, Permission, User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import TransactionTestCase
+from django.utils.six import StringIO
+
+from symposion.conference.models import Conference, Section
+from symposion.markdown_parser import parse
+from symposion.proposals.models import AdditionalSpeaker, ProposalBase, ProposalKind, ProposalSection
+from symposion.reviews import duplicates
+from symposion.reviews.conflicts import CONFLICTS_CACHE_VERSION
+from symposion.reviews.models import LatestVote, ProposalResult, ProposalSignature, ReviewQueueEntry
+from symposion.reviews.promotion import promote_proposals, set_status
+from symposion.reviews.utils import section_reviewers
+from symposion.schedule.models import Presentation
+from symposion.speakers.models import Speaker
+from symposion.utils.cache import get_version
+
+
+# TransactionTestCase so that on_commit callbacks run
+class ReviewTestCase(TransactionTestCase):
+
+    def setUp(self):
+        conference = Conference.objects.create(title="Conference")
+        self.section = Section.objects.create(conference=conference, name="Talks", slug="talks")
+        ProposalSection.objects.create(section=self.section)
+        kind = ProposalKind.objects.create(section=self.section, name="Talk", slug="talk")
+        self.kind = kind
+        self.speaker = Speaker.objects.create(name="Speaker")
+        self.proposal = ProposalBase.objects.create(
+            kind=kind, title="Title", abstract="Abstract", private_abstract="Private",
+            speaker=self.speaker)
+        content_type, created = ContentType.objects.get_or_create(app_label="reviews", model="")
+        self.permission = Permission.objects.create(
+            codename="can_review_talks", name="Can review talks", content_type=content_type)
+
+
+class TestReviewQueue(ReviewTestCase):
+
+    def queued(self, user):
+        return list(ReviewQueueEntry.objects.filter(user=user).values_list("proposal", flat=True))
+
+    def test_superuser(self):
+        user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.assertIn(user.pk, section_reviewers(self.section))
+        self.assertEqual(self.queued(user), [self.proposal.pk])
+
+        user.is_superuser = False
+        user.save()
+        self.assertEqual(self.queued(user), [])
+
+    def test_group_permission(self):
+        user = User.objects.create_user("reviewer", "reviewer@example.com", "pass")
+        group = Group.objects.create(name="Reviewers")
+        user.groups.add(group)
+        self.assertEqual(self.queued(user), [])
+
+        group.permissions.add(self.permission)
+        self.assertTrue(User.objects.get(pk=user.pk).has_perm("reviews.can_review_talks"))
+        self.assertEqual(self.queued(user), [self.proposal.pk])
+
+        group.permissions.remove(self.permission)
+        self.assertEqual(self.queued(user), [])
+
+    def test_invited_speaker_linked(self):
+        user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        invited = Speaker.objects.create(name="Invited", invite_email="invited@example.com")
+        AdditionalSpeaker.objects.create(speaker=invited, proposalbase=self.proposal)
+        self.assertEqual(self.queued(user), [self.proposal.pk])
+
+        # the reviewer accepts the invitation and now speaks on the proposal
+        invited.user = user
+        invited.save()
+        self.assertEqual(self.queued(user), [])
+
+    def test_copresenter(self):
+        user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        reviewer = Speaker.objects.create(name="Reviewer", user=user)
+        proposal = ProposalBase.objects.create(
+            kind=self.kind, title="Earlier talk", abstract="Abstract", speaker=reviewer)
+        presentation = Presentation.objects.create(
+            title="Earlier talk", abstract="Abstract", speaker=reviewer,
+            proposal_base=proposal, section=self.section)
+        self.assertEqual(self.queued(user), [self.proposal.pk])
+
+        presentation.additional_speakers.add(self.speaker)
+        self.assertEqual(self.queued(user), [])
+
+        presentation.additional_speakers.remove(self.speaker)
+        self.assertEqual(self.queued(user), [self.proposal.pk])
+
+
+class TestReviewSearch(ReviewTestCase):
+
+    def test_sections(self):
+        tutorials = Section.objects.create(
+            conference=self.section.conference, name="Tutorials", slug="tutorials")
+        ProposalSection.objects.create(section=tutorials)
+        ProposalBase.objects.create(
+            kind=ProposalKind.objects.create(section=tutorials, name="Tutorial", slug="tutorial"),
+            title="Title", abstract="Abstract", speaker=self.speaker)
+        user = User.objects.create_user("reviewer", "reviewer@example.com", "pass")
+        user.user_permissions.add(self.permission)
+
+        self.client.force_login(user)
+        response = self.client.get(reverse("review_search"), {"q": "title"})
+        self.assertEqual(response.context["sections"], [self.section])
+        self.assertEqual(response.context["proposals"], [self.proposal])
+
+    def test_not_permitted(self):
+        self.client.force_login(User.objects.create_user("user", "user@example.com", "pass"))
+        response = self.client.get(reverse("review_search"), {"q": "title"})
+        self.assertTemplateUsed(response, "symposion/reviews/access_not_permitted.html")
+
+
+class TestReviewSectionData(ReviewTestCase):
+
+    def setUp(self):
+        super(TestReviewSectionData, self).setUp()
+        lightning = ProposalKind.objects.create(section=self.section, name="Lightning", slug="lightning")
+        self.alpha, self.bravo, self.charlie = [
+            ProposalBase.objects.create(
+                kind=kind, title=title, abstract="Abstract",
+                speaker=Speaker.objects.create(name="%s speaker" % title))
+            for kind, title in [(self.kind, "Alpha"), (self.kind, "Bravo"), (lightning, "Charlie")]
+        ]
+        self.user = User.objects.create_user("reviewer", "reviewer@example.com", "pass")
+        self.user.user_permissions.add(self.permission)
+        self.client.force_login(self.user)
+        self.url = reverse("review_section_data", args=[self.section.slug])
+
+    def get(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response["Content-Type"], "application/json")
+        return json.loads(response.content.decode("utf-8"))
+
+    def titles(self, rows):
+        return [row["title"] for row in rows]
+
+    def test_legacy(self):
+        data = self.get(sEcho=3, iDisplayStart=1, iDisplayLength=2,
+                        iSortingCols=1, iSortCol_0=2, sSortDir_0="asc")
+        self.assertEqual(data["sEcho"], 3)
+        self.assertEqual(data["iTotalRecords"], 4)
+        self.assertEqual(data["iTotalDisplayRecords"], 4)
+        # column 2 is the title in the default column order
+        self.assertEqual(self.titles(data["aaData"]), ["Bravo", "Charlie"])
+
+        data = self.get(sEcho=4, sSearch="bravo", iSortingCols=1, iSortCol_0=0,
+                        mDataProp_0="title", sSortDir_0="desc")
+        self.assertEqual(data["iTotalDisplayRecords"], 1)
+        self.assertEqual(self.titles(data["aaData"]), ["Bravo"])
+
+        data = self.get(iSortingCols=1, iSortCol_0=0, mDataProp_0="title", sSortDir_0="desc")
+        self.assertEqual(self.titles(data["aaData"]), ["Title", "Charlie", "Bravo", "Alpha"])
+
+    def test_datatables_1_10(self):
+        data = self.get(**{
+            "draw": 5, "start": 0, "length": 3,
+            "columns[0][data]": "speaker", "order[0][column]": 0, "order[0][dir]": "desc",
+            "search[value]": "speaker",
+        })
+        self.assertEqual(data["draw"], 5)
+        self.assertEqual(data["recordsTotal"], 4)
+        self.assertEqual(data["recordsFiltered"], 4)
+        self.assertEqual(self.titles(data["data"]), ["Title", "Charlie", "Bravo"])
+        self.assertEqual(data["data"][0]["speaker"], "Speaker")
+
+        data = self.get(**{"draw": 6, "search[value]": "alpha speaker"})
+        self.assertEqual(data["recordsFiltered"], 1)
+        self.assertEqual(self.titles(data["data"]), ["Alpha"])
+
+    def test_filters(self):
+        set_status([self.alpha.pk], "accepted")
+        set_status([self.bravo.pk], "rejected")
+        LatestVote.objects.create(proposal=self.charlie, user=self.user, vote=LatestVote.VOTES.PLUS_ONE)
+        order = {"iSortingCols": 1, "iSortCol_0": 2, "sSortDir_0": "asc"}
+
+        data = self.get(status="accepted", **order)
+        self.assertEqual(data["iTotalRecords"], 4)
+        self.assertEqual(data["iTotalDisplayRecords"], 1)
+        self.assertEqual(self.titles(data["aaData"]), ["Alpha"])
+        # proposals without a result count as undecided
+        self.assertEqual(self.titles(self.get(status="undecided", **order)["aaData"]), ["Charlie", "Title"])
+        self.assertEqual(self.titles(self.get(kind="lightning", **order)["aaData"]), ["Charlie"])
+
+        data = self.get(vote="+1", **order)
+        self.assertEqual(self.titles(data["aaData"]), ["Charlie"])
+        self.assertEqual(data["aaData"][0]["user_vote"], "+1")
+        self.assertEqual(self.titles(self.get(vote="none", **order)["aaData"]), ["Alpha", "Bravo", "Title"])
+
+    def test_length_cap(self):
+        ProposalBase.objects.bulk_create([
+            ProposalBase(kind=self.kind, title="Talk %d" % i, abstract="Abstract", speaker=self.speaker)
+            for i in range(500)
+        ])
+        for length in [-1, 1000]:
+            data = self.get(draw=1, length=length)
+            self.assertEqual(data["recordsFiltered"], 504)
+            self.assertEqual(len(data["data"]), 500)
+        data = self.get(draw=1, start=500, length=1000)
+        self.assertEqual(len(data["data"]), 4)
+
+    def test_not_permitted(self):
+        self.client.force_login(User.objects.create_user("user", "user@example.com", "pass"))
+        response = self.client.get(self.url)
+        self.assertTemplateUsed(response, "symposion/reviews/access_not_permitted.html")
+
+
+class TestConflictIndex(ReviewTestCase):
+
+    def test_kept_on_unrelated_save(self):
+        version = get_version(CONFLICTS_CACHE_VERSION)
+        proposal = ProposalBase.objects.get(pk=self.proposal.pk)
+        proposal.cancelled = True
+        proposal.save()
+        self.assertEqual(get_version(CONFLICTS_CACHE_VERSION), version)
+
+        proposal.speaker = Speaker.objects.create(name="Other speaker")
+        proposal.save()
+        self.assertNotEqual(get_version(CONFLICTS_CACHE_VERSION), version)
+
+
+class TestPromotion(ReviewTestCase):
+
+    def setUp(self):
+        super(TestPromotion, self).setUp()
+        self.proposal.abstract = "An *abstract*"
+        self.proposal.save()
+        self.additional = Speaker.objects.create(name="Additional")
+        AdditionalSpeaker.objects.create(speaker=self.additional, proposalbase=self.proposal)
+
+    def presentations(self):
+        return Presentation.objects.filter(proposal_base=self.proposal.pk)
+
+    def test_accept(self):
+        self.assertEqual(set_status([self.proposal.pk], "accepted"), [self.proposal.pk])
+        self.assertEqual(ProposalResult.objects.get(proposal=self.proposal).status, "accepted")
+        presentation = self.presentations().get()
+        self.assertEqual(presentation.title, "Title")
+        self.assertEqual(presentation.abstract_html, parse("An *abstract*"))
+        self.assertEqual(presentation.speaker, self.speaker)
+        self.assertEqual(presentation.section, self.section)
+        self.assertEqual(list(presentation.additional_speakers.all()), [self.additional])
+
+    def test_accept_again(self):
+        set_status([self.proposal.pk], "accepted")
+        presentation = self.presentations().get()
+        self.assertEqual(set_status([self.proposal.pk], "accepted"), [])
+        self.assertEqual(promote_proposals([self.proposal.pk]), (0, 0))
+        self.assertEqual(self.presentations().get().pk, presentation.pk)
+        self.assertEqual(presentation.additional_speakers.count(), 1)
+
+    def test_unaccept(self):
+        for status in ["rejected", "standby", "undecided"]:
+            set_status([self.proposal.pk], "accepted")
+            self.assertTrue(self.presentations().exists())
+            self.assertEqual(set_status([self.proposal.pk], status), [self.proposal.pk])
+            self.assertFalse(self.presentations().exists())
+
+    def test_bulk_accept_view(self):
+        User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.login(username="admin", password="pass")
+        url = reverse("review_bulk_accept", args=[self.section.slug])
+
+        response = self.client.post(url, {"talk_ids": "%d," % self.proposal.pk, "status": "accepted"})
+        self.assertRedirects(response, reverse("review_section", args=[self.section.slug]),
+                             fetch_redirect_response=False)
+        self.assertTrue(self.presentations().exists())
+
+        self.client.post(url, {"talk_ids": str(self.proposal.pk), "status": "standby"})
+        self.assertEqual(ProposalResult.objects.get(proposal=self.proposal).status, "standby")
+        self.assertFalse(self.presentations().exists())
+
+    def test_command(self):
+        created, updated, standby = [
+            ProposalBase.objects.create(
+                kind=self.kind, title="Talk %d" % i, abstract="Abstract", speaker=self.speaker)
+            for i in range(3)
+        ]
+        set_status([updated.pk, standby.pk], "accepted")
+        ProposalBase.objects.filter(pk=updated.pk).update(title="New title")
+        # queryset changes bypass the signals that promote and unpromote
+        ProposalResult.objects.filter(proposal=standby).update(status="standby")
+        ProposalResult.objects.bulk_create([ProposalResult(proposal=created, status="accepted")])
+
+        out = StringIO()
+        call_command("promoteproposals", stdout=out)
+        self.assertIn("Presentations created: 1, updated: 1, deleted: 1", out.getvalue())
+        self.assertEqual(
+            set(Presentation.objects.values_list("proposal_base", "title")),
+            set([(created.pk, "Talk 0"), (updated.pk, "New title")]))
+
+        out = StringIO()
+        call_command("promoteproposals", stdout=out)
+        self.assertIn("Presentations created: 0, updated: 0, deleted: 0", out.getvalue())
+
+
+class TestDuplicates(ReviewTestCase):
+
+    abstract = (
+        "Deploying Django applications with containers, a caching layer and "
+        "background task queues, and what we learned running them for a "
+        "volunteer-run conference over three years."
+    )
+
+    def setUp(self):
+        super(TestDuplicates, self).setUp()
+        self.original = ProposalBase.objects.create(
+            kind=self.kind, title="Deploying Django", abstract=self.abstract, speaker=self.speaker)
+        self.copy = ProposalBase.objects.create(
+            kind=self.kind, title="Deploying Django apps", abstract=self.abstract + " Updated.",
+            speaker=self.speaker)
+        self.unrelated = ProposalBase.objects.create(
+            kind=self.kind, title="Array programming",
+            abstract="Vectorising numerical code with numpy broadcasting and ufuncs.",
+            speaker=self.speaker)
+
+    def test_minhash(self):
+        self.assertIsNone(duplicates.minhash(""))
+        signature = duplicates.minhash(self.abstract)
+        self.assertEqual(len(signature), duplicates.NUM_PERMUTATIONS)
+        self.assertTrue((signature == duplicates.minhash(self.abstract.upper())).all())
+
+    def test_signatures_stored(self):
+        # written when the saves commit
+        stored = duplicates.signatures()
+        self.assertEqual(
+            set(stored), set([self.proposal.pk, self.original.pk, self.copy.pk, self.unrelated.pk]))
+        digest = ProposalSignature.objects.get(proposal=self.unrelated).digest
+        self.unrelated.abstract = "Something else entirely."
+        self.unrelated.save()
+        self.assertNotEqual(ProposalSignature.objects.get(proposal=self.unrelated).digest, digest)
+        self.assertEqual(duplicates.update_signatures(), 0)
+
+    def test_candidate_pairs(self):
+        pairs = duplicates.similar_pairs(duplicates.signatures())
+        self.assertEqual(list(pairs), [(self.original.pk, self.copy.pk)])
+        self.assertGreater(pairs[(self.original.pk, self.copy.pk)], 0.8)
+        self.assertEqual(duplicates.similar_pairs(duplicates.signatures(), threshold=1.0), {})
+        self.assertEqual(
+            duplicates.duplicate_candidates(self.copy),
+            [(self.original.pk, pairs[(self.original.pk, self.copy.pk)])])
+        self.assertEqual(duplicates.duplicate_candidates(self.unrelated), [])
+
+    def test_command(self):
+        ProposalSignature.objects.all().delete()
+        out = StringIO()
+        call_command("find_duplicate_proposals", stdout=out)
+        output = out.getvalue()
+        self.assertIn("Updated 4 proposal signatures", output)
+        self.assertIn("Deploying Django [talks / talk]", output)
+        self.assertIn("Deploying Django apps [talks / talk]", output)
+        self.assertNotIn("Array programming", output)
+        self.assertIn("1 possible duplicate clusters", output)
@@ -2,6 +2,7 @@ from django.conf.urls import url
 
 from .views import (
     review_section,
+    review_section_data,
     review_status,
     review_list,
     review_admin,
@@ -15,6 +16,7 @@ from .views import (
     review_assignments,
     review_assignment_opt_out,
     review_all_proposals_csv,
+    review_search,
 )
 
 urlpatterns = [
@@ -22,6 +24,7 @@ urlpatterns = [
     url(r"^section/(?P<section_slug>[\w\-]+)/reviewed/$", review_section, {"reviewed": "reviewed"}, name="user_reviewed"),
     url(r"^section/(?P<section_slug>[\w\-]+)/not_reviewed/$", review_section, {"reviewed": "not_reviewed"}, name="user_not_reviewed"),
     url(r"^section/(?P<section_slug>[\w\-]+)/random/$", review_random_proposal, name="user_random"),
+    url(r"^section/(?P<section_slug>[\w\-]+)/data/$", review_section_data, name="review_section_data"),
     url(r"^section/(?P<section_slug>[\w\-]+)/assignments/$", review_section, {"assigned": True}, name="review_section_assignments"),
     url(r"^section/(?P<section_slug>[\w\-]+)/status/$", review_status, name="review_status"),
     url(r"^section/(?P<section_slug>[\w\-]+)/status/(?P<key>\w+)/$", review_status, name="review_status"),
@@ -34,6 +37,7 @@ urlpatterns = [
 
 
     url(r"^review/(?P<pk>\d+)/$", review_detail, name="review_detail"),
+    url(r"^search/$", review_search, name="review_search"),
 
     url(r"^(?P<pk>\d+)/delete/$", review_delete, name="review_delete"),
     url(r"^assignments/$", review_assignments, name="review_assignments"),
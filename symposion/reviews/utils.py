@@ -1,5 +1,15 @@
 from __future__ import unicode_literals
 
+from django.core.cache import cache
+from django.db.models import Q
+
+from django.contrib.auth.models import Permission, User
+
+from symposion.proposals.models import ProposalSection
+from symposion.reviews.conflicts import is_reviewer, speaking_for
+from symposion.teams.models import TEAM_PERMISSIONS_CACHE_VERSION, user_permissions_version
+from symposion.utils.cache import get_version, versioned_key
+
 
 def has_permission(user, proposal, speaker=False, reviewer=False):
     """
@@ -13,10 +23,94 @@ def has_permission(user, proposal, speaker=False, reviewer=False):
     if user.is_superuser:
         return True
     if speaker:
-        if user == proposal.speaker.user or \
-           proposal.additional_speakers.filter(user=user).exists():
+        if proposal.pk in speaking_for(user):
             return True
     if reviewer:
-        if user.groups.filter(name="reviewers").exists():
+        if is_reviewer(user):
             return True
     return False
+
+
+# bumped when a proposal section or its conference section changes
+PROPOSAL_SECTIONS_CACHE_VERSION = "proposal_sections"
+
+# bumped when permissions granted through auth groups or directly to users
+# change; team permissions have versions of their own
+REVIEW_SECTIONS_CACHE_VERSION = "review_sections"
+
+_proposal_sections = (None, [])
+
+
+def proposal_sections():
+    """
+    Returns every ``ProposalSection`` with its section, loaded once per
+    process and reloaded when the sections change.
+    """
+    global _proposal_sections
+    version = get_version(PROPOSAL_SECTIONS_CACHE_VERSION)
+    loaded, sections = _proposal_sections
+    if loaded != version:
+        sections = list(ProposalSection.objects.select_related("section"))
+        _proposal_sections = (version, sections)
+    return sections
+
+
+def review_sections(user):
+    """
+    Returns the proposal sections whose proposals ``user`` may review.
+
+    The ids of the sections are cached per user under a key that changes
+    whenever the sections or any of the user's permissions change.
+    """
+    if not user.is_authenticated() or not user.is_active:
+        return []
+    sections = proposal_sections()
+    key = versioned_key(
+        REVIEW_SECTIONS_CACHE_VERSION,
+        user.pk,
+        int(user.is_superuser),
+        get_version(PROPOSAL_SECTIONS_CACHE_VERSION),
+        get_version(user_permissions_version(user.pk)),
+        get_version(TEAM_PERMISSIONS_CACHE_VERSION),
+    )
+    ids = cache.get(key)
+    if ids is None:
+        ids = [
+            proposal_section.pk for proposal_section in sections
+            if user.has_perm("reviews.can_review_%s" % proposal_section.section.slug)
+        ]
+        cache.set(key, ids, None)
+    ids = set(ids)
+    return [proposal_section for proposal_section in sections if proposal_section.pk in ids]
+
+
+def reviewable_sections(user):
+    """
+    Returns the sections (``conference.Section``) whose proposals ``user``
+    may review.
+    """
+    return [proposal_section.section for proposal_section in review_sections(user)]
+
+
+def section_reviewers(section):
+    """
+    Returns the ids of the active users for whom
+    ``has_perm("reviews.can_review_<section slug>")`` is true: superusers
+    and users granted the permission directly, through a group or through a
+    team (as member or manager).
+    """
+    perms = Permission.objects.filter(
+        content_type__app_label="reviews",
+        codename="can_review_%s" % section.slug,
+    )
+    users = User.objects.filter(is_active=True)
+    ids = set()
+    for condition in [
+        Q(is_superuser=True),
+        Q(user_permissions__in=perms),
+        Q(groups__permissions__in=perms),
+        Q(memberships__state="member", memberships__team__permissions__in=perms),
+        Q(memberships__state="manager", memberships__team__manager_permissions__in=perms),
+    ]:
+        ids.update(users.filter(condition).values_list("pk", flat=True))
+    return ids
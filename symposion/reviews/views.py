@@ -1,13 +1,18 @@
 import csv
+import json
 import random
 import StringIO
 
 from django.core.mail import send_mass_mail
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.urlresolvers import reverse
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 from django.db.models import Q
 from django.http import HttpResponse
 from django.http import HttpResponseBadRequest, HttpResponseNotAllowed
 from django.shortcuts import render, redirect, get_object_or_404
 from django.template import Context, Template
+from django.utils.http import urlencode
 from django.views.decorators.http import require_POST
 
 from account.decorators import login_required
@@ -16,56 +21,88 @@ from account.decorators import login_required
 from symposion.teams.models import Team
 
 from symposion.conf import settings
-from symposion.proposals.models import ProposalBase, ProposalSection
+from symposion.proposals.models import ProposalBase
+from symposion.proposals.search import search
+from symposion.proposals.utils import get_proposal_section_or_404
 from symposion.utils.mail import send_email
 
 from symposion.reviews.forms import ReviewForm, SpeakerCommentForm
 from symposion.reviews.forms import BulkPresentationForm
 from symposion.reviews.models import (
     ReviewAssignment, Review, LatestVote, ProposalResult, NotificationTemplate,
-    ResultNotification, promote_proposal
+    ResultNotification, ReviewQueueEntry, promote_proposal
 )
+from symposion.reviews.duplicates import duplicate_candidates
+from symposion.reviews.promotion import set_status
+from symposion.reviews.conflicts import conflicts_for, has_conflict
+from symposion.reviews.utils import reviewable_sections
 
 
 def access_not_permitted(request):
     return render(request, "symposion/reviews/access_not_permitted.html")
 
 
-def proposals_generator(request, queryset, user_pk=None, check_speaker=True):
+# proposals annotated per batch by proposals_generator; keeps the IN lists
+# under SQLite's parameter limit
+PROPOSAL_BATCH_SIZE = 500
 
-    for obj in queryset:
-        # @@@ this sucks; we can do better
-        if check_speaker:
-            if request.user in [s.user for s in obj.speakers()]:
-                continue
-
-        try:
-            obj.result
-        except ProposalResult.DoesNotExist:
-            ProposalResult.objects.get_or_create(proposal=obj)
-
-        obj.comment_count = obj.result.comment_count
-        obj.score = obj.result.score
-        obj.total_votes = obj.result.vote_count
-        obj.plus_two = obj.result.plus_two
-        obj.plus_one = obj.result.plus_one
-        obj.minus_one = obj.result.minus_one
-        obj.minus_two = obj.result.minus_two
-        lookup_params = dict(proposal=obj)
 
+def proposals_generator(request, queryset, user_pk=None, check_speaker=True):
+    ''' Yields the proposals in ``queryset`` annotated with their result
+    counts and the vote of the request user (or of ``user_pk``). Results
+    and votes are loaded a batch of proposals at a time. '''
+
+    excluded = conflicts_for(request.user) if check_speaker else set()
+    proposals = [obj for obj in queryset if obj.pk not in excluded]
+
+    for start in range(0, len(proposals), PROPOSAL_BATCH_SIZE):
+        batch = proposals[start:start + PROPOSAL_BATCH_SIZE]
+        ids = [obj.pk for obj in batch]
+
+        missing = [obj.pk for obj in batch if obj.__dict__.get("_result_cache") is None]
+        results = {}
+        if missing:
+            results = dict(
+                (result.proposal_id, result)
+                for result in ProposalResult.objects.filter(proposal__in=missing)
+            )
+            created = [
+                ProposalResult(proposal_id=pk) for pk in missing if pk not in results
+            ]
+            if created:
+                ProposalResult.objects.bulk_create(created)
+                results.update(
+                    (result.proposal_id, result)
+                    for result in ProposalResult.objects.filter(
+                        proposal__in=[result.proposal_id for result in created])
+                )
+
+        votes = LatestVote.objects.filter(proposal__in=ids)
         if user_pk:
-            lookup_params["user__pk"] = user_pk
+            votes = votes.filter(user__pk=user_pk)
         else:
-            lookup_params["user"] = request.user
-
-        try:
-            obj.user_vote = LatestVote.objects.get(**lookup_params).vote
-            obj.user_vote_css = LatestVote.objects.get(**lookup_params).css_class()
-        except LatestVote.DoesNotExist:
-            obj.user_vote = None
-            obj.user_vote_css = "no-vote"
+            votes = votes.filter(user=request.user)
+        votes = dict(votes.values_list("proposal", "vote"))
+
+        for obj in batch:
+            if obj.pk in results:
+                obj.result = results[obj.pk]
+            obj.comment_count = obj.result.comment_count
+            obj.score = obj.result.score
+            obj.total_votes = obj.result.vote_count
+            obj.plus_two = obj.result.plus_two
+            obj.plus_one = obj.result.plus_one
+            obj.minus_one = obj.result.minus_one
+            obj.minus_two = obj.result.minus_two
+
+            if obj.pk in votes:
+                obj.user_vote = votes[obj.pk]
+                obj.user_vote_css = LatestVote(vote=obj.user_vote).css_class()
+            else:
+                obj.user_vote = None
+                obj.user_vote_css = "no-vote"
 
-        yield obj
+            yield obj
 
 
 VOTE_THRESHOLD = settings.SYMPOSION_VOTE_THRESHOLD
@@ -100,15 +137,10 @@ REVIEW_STATUS_FILTERS = {
 }
 
 
-# Returns a list of all proposals, proposals reviewed by the user, or the proposals the user has
-# yet to review depending on the link user clicks in dashboard
-@login_required
-def review_section(request, section_slug, assigned=False, reviewed="all"):
-
-    if not request.user.has_perm("reviews.can_review_%s" % section_slug):
-        return access_not_permitted(request)
+def review_section_queryset(request, section, assigned=False, reviewed="all"):
+    ''' Returns the proposals of ``section`` listed on the review pages, and
+    the template label for the list. '''
 
-    section = get_object_or_404(ProposalSection, section__slug=section_slug)
     queryset = ProposalBase.objects.filter(kind__section=section.section)
 
     if assigned:
@@ -125,23 +157,214 @@ def review_section(request, section_slug, assigned=False, reviewed="all"):
         queryset = queryset.filter(reviews__user=request.user)
         reviewed = "user_reviewed"
     else:
-        queryset = queryset.exclude(reviews__user=request.user).exclude(
-            speaker__user=request.user)
+        queryset = queryset.filter(pk__in=ReviewQueueEntry.objects.filter(
+            user=request.user, section=section.section).values("proposal"))
         reviewed = "user_not_reviewed"
 
+    return queryset, reviewed
+
+
+# Returns a list of all proposals, proposals reviewed by the user, or the proposals the user has
+# yet to review depending on the link user clicks in dashboard
+@login_required
+def review_section(request, section_slug, assigned=False, reviewed="all"):
+
+    if not request.user.has_perm("reviews.can_review_%s" % section_slug):
+        return access_not_permitted(request)
+
+    section = get_proposal_section_or_404(section_slug)
+    queryset, reviewed_label = review_section_queryset(request, section, assigned, reviewed)
+
     # lca2017 #21 -- chairs want to be able to see their own proposals in the list
     check_speaker = not request.user.has_perm("reviews.can_manage_%s" % section_slug)
     proposals = proposals_generator(request, queryset, check_speaker=check_speaker)
 
+    data_url = "%s?%s" % (
+        reverse("review_section_data", args=[section_slug]),
+        urlencode({"list": "assigned" if assigned else reviewed}),
+    )
+
     ctx = {
         "proposals": proposals,
         "section": section,
-        "reviewed": reviewed,
+        "reviewed": reviewed_label,
+        "data_url": data_url,
     }
 
     return render(request, "symposion/reviews/review_list.html", ctx)
 
 
+# Sortable columns of the review list, by DataTables column data name
+REVIEW_DATA_SORT_FIELDS = {
+    "number": "pk",
+    "title": "title",
+    "speaker": "speaker__name",
+    "kind": "kind__name",
+    "status": "result__status",
+    "score": "result__score",
+    "total_votes": "result__vote_count",
+    "comment_count": "result__comment_count",
+    "plus_two": "result__plus_two",
+    "plus_one": "result__plus_one",
+    "minus_one": "result__minus_one",
+    "minus_two": "result__minus_two",
+}
+
+# Column order assumed when the request does not name its columns
+REVIEW_DATA_COLUMNS = [
+    "number", "speaker", "title", "kind", "status", "score", "total_votes",
+    "comment_count", "plus_two", "plus_one", "minus_one", "minus_two",
+    "user_vote",
+]
+
+REVIEW_DATA_MAX_LENGTH = 500
+
+
+def _int_param(params, name, default):
+    try:
+        return int(params.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _datatables_request(params):
+    ''' Normalises the paging, search and ordering parameters of both the
+    DataTables 1.10 ajax protocol and the legacy (1.9) protocol used by the
+    bundled assets. '''
+
+    if "draw" in params:
+        ordering = []
+        i = 0
+        while "order[%d][column]" % i in params:
+            column = _int_param(params, "order[%d][column]" % i, 0)
+            name = params.get("columns[%d][data]" % column)
+            ordering.append((column, name, params.get("order[%d][dir]" % i)))
+            i += 1
+        return {
+            "legacy": False,
+            "echo": _int_param(params, "draw", 0),
+            "start": _int_param(params, "start", 0),
+            "length": _int_param(params, "length", 10),
+            "search": params.get("search[value]", ""),
+            "ordering": ordering,
+        }
+
+    ordering = []
+    for i in range(_int_param(params, "iSortingCols", 0)):
+        column = _int_param(params, "iSortCol_%d" % i, 0)
+        name = params.get("mDataProp_%d" % column)
+        ordering.append((column, name, params.get("sSortDir_%d" % i)))
+    return {
+        "legacy": True,
+        "echo": _int_param(params, "sEcho", 0),
+        "start": _int_param(params, "iDisplayStart", 0),
+        "length": _int_param(params, "iDisplayLength", 10),
+        "search": params.get("sSearch", ""),
+        "ordering": ordering,
+    }
+
+
+def _review_data_row(proposal):
+    return {
+        "id": proposal.pk,
+        "number": proposal.number,
+        "title": proposal.title,
+        "speaker": proposal.speaker.name,
+        "kind": proposal.kind.name,
+        "cancelled": proposal.cancelled,
+        "status": proposal.result.status,
+        "score": proposal.score,
+        "total_votes": proposal.total_votes,
+        "comment_count": proposal.comment_count,
+        "plus_two": proposal.plus_two,
+        "plus_one": proposal.plus_one,
+        "minus_one": proposal.minus_one,
+        "minus_two": proposal.minus_two,
+        "user_vote": proposal.user_vote,
+        "user_vote_css": proposal.user_vote_css,
+        "url": reverse("review_detail", args=[proposal.pk]),
+    }
+
+
+@login_required
+def review_section_data(request, section_slug):
+    ''' DataTables server-side processing endpoint for the review list.
+
+    Besides the DataTables parameters, accepts ``list`` (``all``,
+    ``reviewed``, ``not_reviewed`` or ``assigned``) and the filters
+    ``status``, ``kind`` (a kind slug) and ``vote`` (a vote value, or
+    ``none`` for proposals the user has not voted on). '''
+
+    if not request.user.has_perm("reviews.can_review_%s" % section_slug):
+        return access_not_permitted(request)
+
+    section = get_proposal_section_or_404(section_slug)
+    params = request.GET
+    listing = params.get("list", "all")
+    queryset, reviewed = review_section_queryset(
+        request, section,
+        assigned=listing == "assigned",
+        reviewed=listing if listing in ("reviewed", "not_reviewed") else "all",
+    )
+    if not request.user.has_perm("reviews.can_manage_%s" % section_slug):
+        queryset = queryset.exclude(pk__in=conflicts_for(request.user))
+    total = queryset.count()
+
+    status = params.get("status")
+    if status == "undecided":
+        queryset = queryset.filter(Q(result__status=status) | Q(result=None))
+    elif status:
+        queryset = queryset.filter(result__status=status)
+    if params.get("kind"):
+        queryset = queryset.filter(kind__slug=params["kind"])
+    vote = params.get("vote")
+    if vote == "none":
+        queryset = queryset.exclude(votes__user=request.user)
+    elif vote:
+        queryset = queryset.filter(votes__user=request.user, votes__vote=vote)
+
+    table = _datatables_request(params)
+    if table["search"]:
+        for term in table["search"].split():
+            queryset = queryset.filter(Q(title__icontains=term) | Q(speaker__name__icontains=term))
+    filtered = queryset.count()
+
+    order_by = []
+    for column, name, direction in table["ordering"]:
+        if name is None and column < len(REVIEW_DATA_COLUMNS):
+            name = REVIEW_DATA_COLUMNS[column]
+        field = REVIEW_DATA_SORT_FIELDS.get(name)
+        if field:
+            order_by.append("-" + field if direction == "desc" else field)
+    queryset = queryset.select_related("result", "speaker", "kind").order_by(*(order_by + ["pk"]))
+
+    start = max(table["start"], 0)
+    length = table["length"]
+    if length < 0 or length > REVIEW_DATA_MAX_LENGTH:
+        length = REVIEW_DATA_MAX_LENGTH
+    page = queryset[start:start + length]
+    rows = [
+        _review_data_row(proposal)
+        for proposal in proposals_generator(request, page, check_speaker=False)
+    ]
+
+    if table["legacy"]:
+        data = {
+            "sEcho": table["echo"],
+            "iTotalRecords": total,
+            "iTotalDisplayRecords": filtered,
+            "aaData": rows,
+        }
+    else:
+        data = {
+            "draw": table["echo"],
+            "recordsTotal": total,
+            "recordsFiltered": filtered,
+            "data": rows,
+        }
+    return HttpResponse(json.dumps(data, cls=DjangoJSONEncoder), content_type="application/json")
+
+
 @login_required
 def review_all_proposals_csv(request):
     ''' Returns a CSV representation of all of the proposals this user has
@@ -201,6 +424,39 @@ def review_all_proposals_csv(request):
     return response
 
 
+SEARCH_RESULTS_PER_PAGE = 25
+
+
+@login_required
+def review_search(request):
+    ''' Full-text search over the proposals in every section the user may
+    review. '''
+
+    sections = reviewable_sections(request.user)
+    if not sections:
+        return access_not_permitted(request)
+
+    query = request.GET.get("q", "").strip()
+    entries = search(query, sections).select_related(
+        "proposal__speaker", "proposal__kind__section", "proposal__result"
+    )
+    paginator = Paginator(entries, SEARCH_RESULTS_PER_PAGE)
+    try:
+        page = paginator.page(request.GET.get("page", 1))
+    except PageNotAnInteger:
+        page = paginator.page(1)
+    except EmptyPage:
+        page = paginator.page(paginator.num_pages)
+
+    ctx = {
+        "query": query,
+        "page": page,
+        "proposals": [entry.proposal for entry in page],
+        "sections": sections,
+    }
+    return render(request, "symposion/reviews/review_search.html", ctx)
+
+
 @login_required
 def review_random_proposal(request, section_slug):
     # lca2017 #16 view for random proposal
@@ -208,13 +464,11 @@ def review_random_proposal(request, section_slug):
     if not request.user.has_perm("reviews.can_review_%s" % section_slug):
         return access_not_permitted(request)
 
-    section = get_object_or_404(ProposalSection, section__slug=section_slug)
-    queryset = ProposalBase.objects.filter(kind__section=section.section)
-    # Remove ones already reviewed
-    queryset = queryset.exclude(reviews__user=request.user)
-    # Remove talks the reviewer can't vote on -- their own.
-    queryset = queryset.exclude(speaker__user=request.user)
-    queryset = queryset.exclude(additional_speakers__user=request.user)
+    section = get_proposal_section_or_404(section_slug)
+    # The reviewer's queue already leaves out proposals they have reviewed,
+    # cancelled ones and the ones they can't vote on -- their own.
+    queryset = ProposalBase.objects.filter(pk__in=ReviewQueueEntry.objects.filter(
+        user=request.user, section=section.section).values("proposal"))
 
     if len(queryset) == 0:
         return redirect("review_section", section_slug=section_slug, reviewed="all")
@@ -343,8 +597,9 @@ def review_detail(request, pk):
         return access_not_permitted(request)
 
     speakers = [s.user for s in proposal.speakers()]
+    conflicted = has_conflict(request.user, proposal)
 
-    if not request.user.is_superuser and request.user in speakers:
+    if not request.user.is_superuser and conflicted:
         return access_not_permitted(request)
 
     admin = request.user.has_perm("reviews.can_manage_%s" % proposal.kind.section.slug)
@@ -355,7 +610,7 @@ def review_detail(request, pk):
         latest_vote = None
 
     if request.method == "POST":
-        if request.user in speakers:
+        if conflicted:
             return access_not_permitted(request)
 
         if "vote_submit" in request.POST or "vote_submit_and_random" in request.POST:
@@ -402,7 +657,7 @@ def review_detail(request, pk):
                 initial = {}
                 if latest_vote:
                     initial["vote"] = latest_vote.vote
-                if request.user in speakers:
+                if conflicted:
                     review_form = None
                 else:
                     review_form = ReviewForm(initial=initial)
@@ -431,7 +686,7 @@ def review_detail(request, pk):
         initial = {}
         if latest_vote:
             initial["vote"] = latest_vote.vote
-        if request.user in speakers:
+        if conflicted:
             review_form = None
         else:
             review_form = ReviewForm(initial=initial)
@@ -447,6 +702,19 @@ def review_detail(request, pk):
     reviews = Review.objects.filter(proposal=proposal).order_by("-submitted_at")
     messages = proposal.messages.order_by("submitted_at")
 
+    # possible duplicates, limited to the sections this reviewer can see
+    similarity = dict(duplicate_candidates(proposal))
+    duplicates = []
+    if similarity:
+        candidates = ProposalBase.objects.filter(
+            pk__in=list(similarity),
+            kind__section__in=reviewable_sections(request.user),
+        ).select_related("kind")
+        for candidate in candidates:
+            candidate.similarity = similarity[candidate.pk]
+            duplicates.append(candidate)
+        duplicates.sort(key=lambda candidate: -candidate.similarity)
+
     return render(request, "symposion/reviews/review_detail.html", {
         "proposal": proposal,
         "latest_vote": latest_vote,
@@ -454,7 +722,8 @@ def review_detail(request, pk):
         "review_messages": messages,
         "review_form": review_form,
         "message_form": message_form,
-        "is_manager": admin
+        "is_manager": admin,
+        "duplicate_candidates": duplicates,
     })
 
 
@@ -541,11 +810,11 @@ def review_bulk_accept(request, section_slug):
     if request.method == "POST":
         form = BulkPresentationForm(request.POST)
         if form.is_valid():
-            talk_ids = form.cleaned_data["talk_ids"].split(",")
-            talks = ProposalBase.objects.filter(id__in=talk_ids).select_related("result")
-            for talk in talks:
-                talk.result.status = "accepted"
-                talk.result.save()
+            talk_ids = ProposalBase.objects.filter(
+                id__in=form.cleaned_data["talk_ids"],
+                kind__section__slug=section_slug,
+            ).values_list("pk", flat=True)
+            set_status(talk_ids, form.cleaned_data["status"])
             return redirect("review_section", section_slug=section_slug)
     else:
         form = BulkPresentationForm()
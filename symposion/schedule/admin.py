@@ -1,7 +1,7 @@
 from __future__ import unicode_literals
 from django.contrib import admin
 
-from symposion.schedule.models import Schedule, Day, Room, SlotKind, Slot, SlotRoom, Presentation, Session, SessionRole, Track
+from symposion.schedule.models import Schedule, Day, Room, SlotKind, Slot, SlotRoom, Presentation, PresentationFavourite, Session, SessionRole, Track
 
 
 class DayInline(admin.StackedInline):
@@ -56,3 +56,7 @@ admin.site.register(Session)
 admin.site.register(SessionRole)
 admin.site.register(Presentation, PresentationAdmin)
 admin.site.register(Track)
+admin.site.register(
+    PresentationFavourite,
+    list_display=["presentation", "user", "created"]
+)
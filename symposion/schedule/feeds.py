@@ -0,0 +1,188 @@
+"""
+The published schedule as a list of pre-rendered events.
+
+Every public representation of the schedule (the conference JSON and the
+personal JSON and iCalendar feeds) is a filter over the same event list.
+The list is built with a handful of queries and cached under the schedule
+version key, so serving a feed costs a cache lookup rather than a walk over
+every slot.
+"""
+from __future__ import unicode_literals
+
+import pytz
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+
+from django.contrib.sites.models import Site
+
+from icalendar import Calendar, Event
+
+from symposion.conf import settings as symposion_settings
+from symposion.proposals.models import ProposalBase
+from symposion.schedule.models import SCHEDULE_CACHE_VERSION, Day, Slot
+from symposion.schedule.timetable import slot_tracks, track_map
+from symposion.utils.cache import versioned_key
+
+
+PRODUCT_ID = "-//linux.conf.au/schedule//EN"
+
+# Part of the cache key; bump whenever the layout of an event changes so
+# that lists cached by older code are not picked up.
+EVENT_FORMAT = 2
+
+
+def schedule_events():
+    """
+    Return the cached list of events for all published, visible schedules,
+    building it if necessary.
+    """
+    key = versioned_key(SCHEDULE_CACHE_VERSION, "events", EVENT_FORMAT)
+    events = cache.get(key)
+    if events is None:
+        events = build_schedule_events()
+        cache.set(key, events, symposion_settings.SYMPOSION_SCHEDULE_CACHE_TIMEOUT)
+    return events
+
+
+def build_schedule_events():
+    """
+    Build the event list from the database.
+
+    Each event is a dict with the slot and presentation ids, the
+    presentation's ``unpublish`` flag, the slot kind label, the slot's
+    track names, the JSON payload for the slot (``data``), the path to the
+    presentation page and the slot's rendered ``VEVENT`` block.
+    """
+    days = Day.objects.filter(schedule__published=True, schedule__hidden=False)
+    slots = Slot.objects.filter(
+        day__in=days
+    ).select_related(
+        "day__schedule__section", "kind", "content_ptr__speaker__user"
+    ).prefetch_related(
+        "slotroom_set__room", "content_ptr__additional_speakers__user"
+    ).order_by("start")
+    slots = list(slots)
+
+    proposal_ids = [slot.content.proposal_base_id for slot in slots if slot.content]
+    proposals = dict(
+        (proposal.pk, proposal)
+        for proposal in ProposalBase.objects.filter(pk__in=proposal_ids).select_subclasses()
+    )
+
+    tracks = track_map(days)
+    domain = Site.objects.get_current().domain
+    tz = pytz.timezone(settings.TIME_ZONE)
+
+    events = []
+    for slot in slots:
+        rooms = [slot_room.room.name for slot_room in slot.slotroom_set.all()]
+        names = slot_tracks(slot, tracks)
+        presentation = slot.content
+        data = {
+            "room": ", ".join(rooms),
+            "rooms": rooms,
+            "track": ", ".join(names),
+            "tracks": names,
+            "start": slot.start_datetime.isoformat(),
+            "end": slot.end_datetime.isoformat(),
+            "duration": slot.length_in_minutes,
+            "kind": slot.kind.label,
+            "section": slot.day.schedule.section.slug,
+            "conf_key": slot.pk,
+            # TODO: models should be changed.
+            # these are model features from other conferences that have forked symposion
+            # these have been used almost everywhere and are good candidates for
+            # base proposals
+            "license": "CC BY",
+            "tags": "",
+            "released": False,
+            "contact": [],
+        }
+        event = {
+            "slot": slot.pk,
+            "presentation": None,
+            "unpublish": False,
+            "kind": slot.kind.label,
+            "tracks": names,
+            "path": None,
+            "data": data,
+        }
+        if presentation is not None:
+            speakers = list(presentation.speakers())
+            event.update({
+                "presentation": presentation.pk,
+                "unpublish": presentation.unpublish,
+                "path": reverse("schedule_presentation_detail", args=[presentation.pk]),
+            })
+            data.update({
+                "name": presentation.title,
+                "authors": [s.name for s in speakers],
+                "contact": [s.email for s in speakers],
+                "abstract": presentation.abstract,
+                "cancelled": presentation.cancelled,
+                "released": getattr(
+                    proposals[presentation.proposal_base_id], "recording_release", False),
+            })
+            if not presentation.speaker.twitter_username == "":
+                data["twitter_id"] = presentation.speaker.twitter_username
+            title = presentation.title
+            description = "Speaker: %s\n%s" % (presentation.speaker, presentation.abstract)
+            link = "http://%s%s" % (domain, event["path"])
+        else:
+            data["name"] = slot.content_override if slot.content_override else "Slot"
+            title = slot.kind if slot.kind else "Slot"
+            description = slot.content_override if slot.content_override else "No description"
+            link = "http://%s" % domain
+
+        vevent = Event()
+        vevent.add("uid", "%d@%s" % (slot.pk, domain))
+        vevent.add("summary", "%s" % title)
+        vevent.add("description", description)
+        vevent.add("dtstart", tz.localize(slot.start_datetime))
+        vevent.add("dtend", tz.localize(slot.end_datetime))
+        vevent.add("location", data["room"])
+        vevent.add("url", link)
+        event["vevent"] = vevent.to_ical().decode("utf-8")
+
+        events.append(event)
+    return events
+
+
+def filter_track(events, track):
+    """
+    Return the events in ``events`` that run in ``track``; all of them if
+    ``track`` is empty.
+    """
+    if not track:
+        return events
+    return [event for event in events if track in event["tracks"]]
+
+
+def event_json(event, protocol, domain, show_contact=False):
+    """
+    Return the JSON payload for ``event`` as seen by a particular request.
+    """
+    data = dict(event["data"])
+    if event["presentation"] is not None:
+        data["conf_url"] = "%s://%s%s" % (protocol, domain, event["path"])
+        if not show_contact:
+            data["contact"] = ["redacted"]
+    return data
+
+
+def render_calendar(events, name):
+    """
+    Return an iCalendar document containing the ``VEVENT`` blocks of
+    ``events``, skipping short breaks as the conference feed does.
+    """
+    calendar = Calendar()
+    calendar.add("prodid", PRODUCT_ID)
+    calendar.add("version", "2.0")
+    calendar.add("x-wr-calname", name)
+    calendar.add("x-wr-timezone", settings.TIME_ZONE)
+    footer = "END:VCALENDAR\r\n"
+    header = calendar.to_ical().decode("utf-8")[:-len(footer)]
+    blocks = [event["vevent"] for event in events if event["kind"] != "shortbreak"]
+    return header + "".join(blocks) + footer
@@ -5,12 +5,14 @@ manipulating the database in more natural ways.
 from __future__ import unicode_literals
 from django.db import transaction
 
+from symposion.conference.models import get_section
+
 from .models import Schedule, Day, Room, Slot, SlotKind, SlotRoom
 
 
 @transaction.commit_on_success
 def create_slot(section_slug, date, kind, start, end, rooms):
-    schedule = Schedule.objects.get(section__slug=section_slug)
+    schedule = Schedule.objects.get(section=get_section(section_slug))
     slot = Slot()
     slot.day = Day.objects.get(schedule=schedule, date=date)
     slot.kind = SlotKind.objects.get(schedule=schedule, label=kind)
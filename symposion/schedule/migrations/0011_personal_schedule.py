@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2017-09-02 04:18
+from __future__ import unicode_literals
+
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('symposion_schedule', '0010_presentation_video_url'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersonalScheduleToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=40, unique=True, verbose_name='Token')),
+                ('created', models.DateTimeField(default=datetime.datetime.now, editable=False, verbose_name='Created')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_token', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Personal schedule token',
+                'verbose_name_plural': 'Personal schedule tokens',
+            },
+        ),
+        migrations.CreateModel(
+            name='PresentationFavourite',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(default=datetime.datetime.now, editable=False, verbose_name='Created')),
+                ('presentation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favourites', to='symposion_schedule.Presentation', verbose_name='Presentation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favourite_presentations', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Favourite presentation',
+                'verbose_name_plural': 'Favourite presentations',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='presentationfavourite',
+            unique_together=set([('user', 'presentation')]),
+        ),
+    ]
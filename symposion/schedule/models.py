@@ -1,17 +1,24 @@
 from __future__ import unicode_literals
 
 import datetime
+import uuid
 
 from django.core.exceptions import ObjectDoesNotExist
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 
-from symposion.markdown_parser import parse
+from symposion.markdown_parser import MarkdownFieldsMixin
 from symposion.proposals.models import ProposalBase
 from symposion.conference.models import Section
 from symposion.speakers.models import Speaker
+from symposion.utils.cache import bump_version_on_commit
+
+
+# Version key for everything cached from the published schedule
+SCHEDULE_CACHE_VERSION = "schedule"
 
 
 @python_2_unicode_compatible
@@ -95,7 +102,9 @@ class SlotKind(models.Model):
 
 
 @python_2_unicode_compatible
-class Slot(models.Model):
+class Slot(MarkdownFieldsMixin, models.Model):
+
+    markdown_fields = ("content_override",)
 
     name = models.CharField(max_length=512, editable=False)
     day = models.ForeignKey(Day, verbose_name=_("Day"))
@@ -172,7 +181,6 @@ class Slot(models.Model):
                                             self.start.strftime("%H:%M"),
                                             self.end.strftime("%H:%M"),
                                             roomlist)
-        self.content_override_html = parse(self.content_override)
         super(Slot, self).save(*args, **kwargs)
 
     def __str__(self):
@@ -204,7 +212,9 @@ class SlotRoom(models.Model):
 
 
 @python_2_unicode_compatible
-class Presentation(models.Model):
+class Presentation(MarkdownFieldsMixin, models.Model):
+
+    markdown_fields = ("abstract",)
 
     slot = models.OneToOneField(Slot, null=True, blank=True, related_name="content_ptr", verbose_name=_("Slot"))
     title = models.CharField(max_length=100, verbose_name=_("Title"))
@@ -222,10 +232,6 @@ class Presentation(models.Model):
     section = models.ForeignKey(Section, related_name="presentations", verbose_name=_("Section"))
     video_url = models.CharField(max_length=255, null=False, blank=True)
 
-    def save(self, *args, **kwargs):
-        self.abstract_html = parse(self.abstract)
-        return super(Presentation, self).save(*args, **kwargs)
-
     @property
     def number(self):
         return self.proposal.number
@@ -251,6 +257,50 @@ class Presentation(models.Model):
         verbose_name_plural = _("presentations")
 
 
+@python_2_unicode_compatible
+class PresentationFavourite(models.Model):
+    """
+    A presentation an attendee has starred for their personal schedule.
+    """
+
+    user = models.ForeignKey(User, related_name="favourite_presentations", verbose_name=_("User"))
+    presentation = models.ForeignKey(Presentation, related_name="favourites", verbose_name=_("Presentation"))
+    created = models.DateTimeField(default=datetime.datetime.now, editable=False, verbose_name=_("Created"))
+
+    def __str__(self):
+        return "%s: %s" % (self.user, self.presentation)
+
+    class Meta:
+        unique_together = [("user", "presentation")]
+        verbose_name = _("Favourite presentation")
+        verbose_name_plural = _("Favourite presentations")
+
+
+@python_2_unicode_compatible
+class PersonalScheduleToken(models.Model):
+    """
+    Secret token identifying an attendee's personal schedule feeds, so that
+    calendar clients can subscribe to them without logging in.
+    """
+
+    user = models.OneToOneField(User, related_name="schedule_token", verbose_name=_("User"))
+    token = models.CharField(max_length=40, unique=True, verbose_name=_("Token"))
+    created = models.DateTimeField(default=datetime.datetime.now, editable=False, verbose_name=_("Created"))
+
+    @classmethod
+    def for_user(cls, user):
+        token, created = cls._default_manager.get_or_create(
+            user=user, defaults={"token": uuid.uuid4().hex})
+        return token
+
+    def __str__(self):
+        return "%s" % self.user
+
+    class Meta:
+        verbose_name = _("Personal schedule token")
+        verbose_name_plural = _("Personal schedule tokens")
+
+
 @python_2_unicode_compatible
 class Session(models.Model):
 
@@ -322,3 +372,30 @@ class SessionRole(models.Model):
     def __str__(self):
         return "%s %s: %s" % (self.user, self.session,
                               self.SESSION_ROLE_TYPES[self.role - 1][1])
+
+
+def _invalidate_schedule_cache(sender, **kwargs):
+    bump_version_on_commit(SCHEDULE_CACHE_VERSION)
+
+for _model in (Schedule, Day, Room, Track, SlotKind, Slot, SlotRoom, Presentation, Speaker):
+    post_save.connect(_invalidate_schedule_cache, sender=_model)
+    post_delete.connect(_invalidate_schedule_cache, sender=_model)
+m2m_changed.connect(_invalidate_schedule_cache, sender=Presentation.additional_speakers.through)
+
+
+def _proposal_changed(sender, instance=None, **kwargs):
+    # connected without a sender so that every ProposalBase subclass is
+    # seen; only proposals on the schedule appear in the event list
+    if isinstance(instance, ProposalBase) and \
+            Presentation.objects.filter(proposal_base=instance.pk).exists():
+        bump_version_on_commit(SCHEDULE_CACHE_VERSION)
+post_save.connect(_proposal_changed)
+
+
+def _user_changed(sender, instance=None, update_fields=None, **kwargs):
+    # logging in saves last_login, which the event list does not show
+    if update_fields is not None and set(update_fields) <= set(["last_login"]):
+        return
+    if Speaker.objects.filter(user=instance.pk).exists():
+        bump_version_on_commit(SCHEDULE_CACHE_VERSION)
+post_save.connect(_user_changed, sender=User)
@@ -5,8 +5,10 @@ import factory
 
 from factory import fuzzy
 
-from symposion.schedule.models import Schedule, Day, Slot, SlotKind
+from symposion.schedule.models import Schedule, Day, Slot, SlotKind, Presentation
 from symposion.conference.models import Section, Conference
+from symposion.proposals.models import ProposalBase, ProposalKind
+from symposion.speakers.models import Speaker
 
 
 class ConferenceFactory(factory.DjangoModelFactory):
@@ -63,3 +65,43 @@ class SlotFactory(factory.DjangoModelFactory):
 
     class Meta:
         model = Slot
+
+
+class SpeakerFactory(factory.DjangoModelFactory):
+    name = fuzzy.FuzzyText()
+
+    class Meta:
+        model = Speaker
+
+
+class ProposalKindFactory(factory.DjangoModelFactory):
+    section = factory.SubFactory(SectionFactory)
+    name = fuzzy.FuzzyText()
+    slug = fuzzy.FuzzyText()
+
+    class Meta:
+        model = ProposalKind
+
+
+class ProposalBaseFactory(factory.DjangoModelFactory):
+    kind = factory.SubFactory(ProposalKindFactory)
+    title = fuzzy.FuzzyText()
+    abstract = fuzzy.FuzzyText()
+    private_abstract = fuzzy.FuzzyText()
+    speaker = factory.SubFactory(SpeakerFactory)
+
+    class Meta:
+        model = ProposalBase
+
+
+class PresentationFactory(factory.DjangoModelFactory):
+    slot = factory.SubFactory(SlotFactory)
+    title = fuzzy.FuzzyText()
+    abstract = fuzzy.FuzzyText()
+    speaker = factory.SubFactory(SpeakerFactory)
+    proposal_base = factory.SubFactory(
+        ProposalBaseFactory, speaker=factory.SelfAttribute("..speaker"))
+    section = factory.SelfAttribute("slot.day.schedule.section")
+
+    class Meta:
+        model = Presentation
@@ -32,6 +32,7 @@ try:
 
         ],
         SITE_ID=1,
+        CONFERENCE_ID=1,
         NOSE_ARGS=['-s'],
     )
 
@@ -0,0 +1,25 @@
+from django.test import TestCase
+
+from symposion.schedule.models import Slot
+
+from . import factories
+
+
+class SlotMarkdownTests(TestCase):
+
+    def test_content_override_rendered_on_create(self):
+        slot = factories.SlotFactory(content_override="*Lunch*")
+        assert slot.content_override_html == "<p><em>Lunch</em></p>"
+
+    def test_unchanged_text_is_not_rerendered(self):
+        slot = factories.SlotFactory(content_override="*Lunch*")
+        Slot.objects.filter(pk=slot.pk).update(content_override_html="cached")
+
+        slot = Slot.objects.get(pk=slot.pk)
+        slot.exclusive = True
+        slot.save()
+        assert Slot.objects.get(pk=slot.pk).content_override_html == "cached"
+
+        slot.content_override = "*Dinner*"
+        slot.save()
+        assert Slot.objects.get(pk=slot.pk).content_override_html == "<p><em>Dinner</em></p>"
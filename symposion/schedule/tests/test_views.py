@@ -1,13 +1,22 @@
 import json
 
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test.client import Client
 from django.test import TestCase
 
+from symposion.schedule.models import PersonalScheduleToken, Room, SlotRoom, Track
+
 from . import factories
 
 
 class ScheduleViewTests(TestCase):
 
+    def setUp(self):
+        # cache versions are bumped on commit, which never happens in a
+        # TestCase, and cached entries outlive each test's rollback
+        cache.clear()
+
     def test_empty_json(self):
         c = Client()
         r = c.get('/conference.json')
@@ -28,3 +37,79 @@ class ScheduleViewTests(TestCase):
         conference = json.loads(r.content)
         assert 'schedule' in conference
         assert len(conference['schedule']) == 5
+
+    def test_conference_ics_track(self):
+
+        slot = factories.SlotFactory.create()
+        factories.SlotFactory.create_batch(size=2)
+        room = Room.objects.create(schedule=slot.day.schedule, name="Room 1", order=1)
+        SlotRoom.objects.create(slot=slot, room=room)
+        Track.objects.create(room=room, day=slot.day, name="Security")
+
+        c = Client()
+        r = c.get('/conference.ics')
+        assert r.status_code == 200
+        assert r.content.count(b'BEGIN:VEVENT') == 3
+
+        r = c.get('/conference.ics?track=Security')
+        assert r.content.count(b'BEGIN:VEVENT') == 1
+        assert ('UID:%d@' % slot.pk).encode('ascii') in r.content
+
+    def test_personal_feed_unknown_token(self):
+        c = Client()
+        r = c.get('/personal/unknown.json')
+        assert r.status_code == 404
+
+    def test_personal_feed_without_favourites(self):
+
+        factories.SlotFactory.create_batch(size=5)
+        user = User.objects.create_user("attendee", password="pass")
+        token = PersonalScheduleToken.for_user(user)
+
+        c = Client()
+        r = c.get('/personal/%s.json' % token.token)
+        assert r.status_code == 200
+        assert len(json.loads(r.content)['schedule']) == 0
+
+        r = c.get('/personal/%s.ics' % token.token)
+        assert r.status_code == 200
+        assert b'BEGIN:VCALENDAR' in r.content
+        assert b'BEGIN:VEVENT' not in r.content
+
+    def test_personal_feed_with_favourite(self):
+
+        presentation = factories.PresentationFactory.create()
+        factories.SlotFactory.create_batch(size=3)
+        user = User.objects.create_user("attendee", password="pass")
+        token = PersonalScheduleToken.for_user(user)
+
+        c = Client()
+        c.login(username="attendee", password="pass")
+        r = c.post('/presentation/%d/favourite/' % presentation.pk)
+        assert r.status_code == 302
+
+        r = c.get('/personal/%s.json' % token.token)
+        schedule = json.loads(r.content)['schedule']
+        assert [event['conf_key'] for event in schedule] == [presentation.slot.pk]
+        assert schedule[0]['name'] == presentation.title
+
+        r = c.get('/personal/%s.ics' % token.token)
+        assert r.content.count(b'BEGIN:VEVENT') == 1
+        assert ('UID:%d@' % presentation.slot.pk).encode('ascii') in r.content
+
+        # starring again removes the favourite
+        c.post('/presentation/%d/favourite/' % presentation.pk)
+        r = c.get('/personal/%s.json' % token.token)
+        assert len(json.loads(r.content)['schedule']) == 0
+
+    def test_favourite_hidden_schedule(self):
+
+        presentation = factories.PresentationFactory.create(
+            slot__day__schedule__hidden=True)
+        User.objects.create_user("attendee", password="pass")
+
+        c = Client()
+        c.login(username="attendee", password="pass")
+        r = c.post('/presentation/%d/favourite/' % presentation.pk)
+        assert r.status_code == 404
+        assert not presentation.favourites.exists()
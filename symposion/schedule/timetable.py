@@ -3,13 +3,51 @@ import itertools
 
 from django.db.models import Count, Min
 
-from symposion.schedule.models import Room, Slot, SlotRoom
+from symposion.schedule.models import Room, Slot, SlotRoom, Track
+
+
+def track_map(days):
+    """
+    Return a {(room_id, day_id): track name} map for the given days.
+    """
+    tracks = Track.objects.filter(day__in=days).values_list("room_id", "day_id", "name")
+    return dict(((room_id, day_id), name) for room_id, day_id, name in tracks)
+
+
+def slot_tracks(slot, tracks):
+    """
+    Return the names of the tracks ``slot`` runs in, in room order.
+
+    ``slot.slotroom_set`` should be prefetched.
+    """
+    names = []
+    for slot_room in slot.slotroom_set.all():
+        name = tracks.get((slot_room.room_id, slot.day_id))
+        if name and name not in names:
+            names.append(name)
+    return names
 
 
 class TimeTable(object):
 
-    def __init__(self, day):
+    def __init__(self, day, track=None, tracks=None):
         self.day = day
+        self.track = track
+        self._tracks = tracks
+
+    def tracks(self):
+        if self._tracks is None:
+            self._tracks = track_map([self.day])
+        return self._tracks
+
+    def track_rooms(self):
+        """
+        Return the ids of the rooms used by the selected track on this day.
+        """
+        return set(
+            room_id for (room_id, day_id), name in self.tracks().items()
+            if day_id == self.day.pk and name == self.track
+        )
 
     def slots_qs(self):
         qs = Slot.objects.all()
@@ -22,21 +60,43 @@ class TimeTable(object):
         qs = qs.filter(
             pk__in=SlotRoom.objects.filter(slot__in=self.slots_qs().values("pk")).values("room"))
         qs = qs.order_by("order")
-        return qs
+        tracks = self.tracks()
+        rooms = []
+        for room in qs:
+            room.track = tracks.get((room.pk, self.day.pk))
+            rooms.append(room)
+        if self.track:
+            track_rooms = self.track_rooms()
+            rooms = [room for room in rooms if room.pk in track_rooms]
+        return rooms
 
     def __iter__(self):
         times = sorted(set(itertools.chain(*self.slots_qs().values_list("start", "end"))))
         slots = Slot.objects.filter(pk__in=self.slots_qs().values("pk"))
         slots = slots.annotate(room_count=Count("slotroom"), order=Min("slotroom__room__order"))
+        slots = slots.prefetch_related("slotroom_set")
         slots = slots.order_by("start", "order")
+        tracks = self.tracks()
+        if self.track:
+            track_rooms = self.track_rooms()
         row = []
-        total_room_count = self.rooms().count()
+        total_room_count = len(self.rooms())
         for time, next_time in pairwise(times):
             row = {"time": time, "slots": []}
             for slot in slots:
                 if slot.start == time:
+                    slot.tracks = slot_tracks(slot, tracks)
+                    slot.track = ", ".join(slot.tracks)
+                    room_count = slot.room_count
+                    if self.track:
+                        if self.track not in slot.tracks and not slot.exclusive:
+                            continue
+                        room_count = len([
+                            slot_room for slot_room in slot.slotroom_set.all()
+                            if slot_room.room_id in track_rooms
+                        ])
                     slot.rowspan = TimeTable.rowspan(times, slot.start, slot.end)
-                    slot.colspan = slot.room_count if not slot.exclusive else total_room_count
+                    slot.colspan = room_count if not slot.exclusive else total_room_count
                     row["slots"].append(slot)
             if row["slots"] or next_time is None:
                 yield row
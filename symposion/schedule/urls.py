@@ -7,13 +7,17 @@ from .views import (
     schedule_list,
     schedule_list_csv,
     schedule_presentation_detail,
+    schedule_presentation_favourite,
+    schedule_personal,
+    schedule_personal_json,
+    schedule_personal_ics,
     schedule_detail,
     schedule_slot_edit,
     schedule_json,
     session_staff_email,
     session_list,
     session_detail,
-    EventFeed
+    schedule_ics,
 )
 
 urlpatterns = [
@@ -22,6 +26,10 @@ urlpatterns = [
     url(r"^list/$", schedule_list, name="schedule_list"),
     url(r"^presentations.csv$", schedule_list_csv, name="schedule_list_csv"),
     url(r"^presentation/(\d+)/$", schedule_presentation_detail, name="schedule_presentation_detail"),
+    url(r"^presentation/(\d+)/favourite/$", schedule_presentation_favourite, name="schedule_presentation_favourite"),
+    url(r"^personal/$", schedule_personal, name="schedule_personal"),
+    url(r"^personal/(\w+)\.json$", schedule_personal_json, name="schedule_personal_json"),
+    url(r"^personal/(\w+)\.ics$", schedule_personal_ics, name="schedule_personal_ics"),
     url(r"^sessions/staff.txt$", session_staff_email, name="schedule_session_staff_email"),
     url(r"^sessions/$", session_list, name="schedule_session_list"),
     url(r"^session/(\d+)/$", session_detail, name="schedule_session_detail"),
@@ -31,5 +39,5 @@ urlpatterns = [
     url(r"^([\w\-]+)/presentations.csv$", schedule_list_csv, name="schedule_list_csv"),
     url(r"^([\w\-]+)/edit/slot/(\d+)/", schedule_slot_edit, name="schedule_slot_edit"),
     url(r"^conference.json", schedule_json, name="schedule_json"),
-    url(r"^conference.ics", EventFeed(), name="ical_feed"),
+    url(r"^conference.ics", schedule_ics, name="ical_feed"),
 ]
@@ -1,25 +1,35 @@
 from __future__ import unicode_literals
 import json
-import pytz
 
-from django.core.urlresolvers import reverse
 from django.http import Http404, HttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.template import loader, Context
-from django.conf import settings
+from django.views.decorators.http import require_POST
 
 from django.contrib.auth.models import User
 from django.contrib import messages
 from django.contrib.sites.models import Site
 
-from django_ical.views import ICalFeed
-
 from account.decorators import login_required
 
 from symposion.schedule.forms import SlotEditForm, ScheduleSectionForm
-from symposion.schedule.models import Schedule, Day, Slot, Presentation, Session, SessionRole
-from symposion.schedule.timetable import TimeTable
-from symposion.conference.models import Conference
+from symposion.schedule.feeds import (
+    event_json, filter_track, render_calendar, schedule_events
+)
+from symposion.schedule.models import (
+    Schedule, Day, Slot, Presentation, PresentationFavourite, PersonalScheduleToken,
+    Session, SessionRole
+)
+from symposion.schedule.timetable import TimeTable, track_map
+from symposion.conference.models import Conference, Section, current_conference, get_section
+
+def fetch_section(slug):
+    # sections are read from the conference cache
+    try:
+        return get_section(slug)
+    except Section.DoesNotExist:
+        raise Http404()
+
 
 def fetch_schedule(slug):
     qs = Schedule.objects.all()
@@ -31,7 +41,7 @@ def fetch_schedule(slug):
         if schedule is None:
             raise Http404()
     else:
-        schedule = get_object_or_404(qs, section__slug=slug)
+        schedule = get_object_or_404(qs, section=fetch_section(slug))
 
     return schedule
 
@@ -43,10 +53,12 @@ def schedule_conference(request):
     else:
         schedules = Schedule.objects.filter(published=True, hidden=False)
 
+    track = request.GET.get("track")
+    tracks = track_map(Day.objects.filter(schedule__in=schedules))
     sections = []
     for schedule in schedules:
         days_qs = Day.objects.filter(schedule=schedule)
-        days = [TimeTable(day) for day in days_qs]
+        days = [TimeTable(day, track=track, tracks=tracks) for day in days_qs]
         sections.append({
             "schedule": schedule,
             "days": days,
@@ -55,7 +67,8 @@ def schedule_conference(request):
     day_switch = request.GET.get('day', None)
     ctx = {
         "sections": sections,
-        "day_switch": day_switch
+        "day_switch": day_switch,
+        "track": track,
     }
     return render(request, "symposion/schedule/schedule_conference.html", ctx)
 
@@ -66,12 +79,15 @@ def schedule_detail(request, slug=None):
     if not schedule.published and not request.user.is_staff:
         raise Http404()
 
+    track = request.GET.get("track")
     days_qs = Day.objects.filter(schedule=schedule)
-    days = [TimeTable(day) for day in days_qs]
+    tracks = track_map(days_qs)
+    days = [TimeTable(day, track=track, tracks=tracks) for day in days_qs]
 
     ctx = {
         "schedule": schedule,
         "days": days,
+        "track": track,
     }
     return render(request, "symposion/schedule/schedule_detail.html", ctx)
 
@@ -140,7 +156,8 @@ def schedule_edit(request, slug=None):
     else:
         form = ScheduleSectionForm(schedule=schedule)
     days_qs = Day.objects.filter(schedule=schedule)
-    days = [TimeTable(day) for day in days_qs]
+    tracks = track_map(days_qs)
+    days = [TimeTable(day, tracks=tracks) for day in days_qs]
     ctx = {
         "schedule": schedule,
         "days": days,
@@ -155,7 +172,7 @@ def schedule_slot_edit(request, slug, slot_pk):
     if not request.user.is_staff:
         raise Http404()
 
-    slot = get_object_or_404(Slot, day__schedule__section__slug=slug, pk=slot_pk)
+    slot = get_object_or_404(Slot, day__schedule__section=fetch_section(slug), pk=slot_pk)
 
     if request.method == "POST":
         form = SlotEditForm(request.POST, slot=slot)
@@ -199,123 +216,121 @@ def schedule_presentation_detail(request, pk):
         if presentation.unpublish or not (schedule and schedule.published):
             raise Http404()
 
+    if request.user.is_authenticated():
+        is_favourite = presentation.favourites.filter(user=request.user).exists()
+    else:
+        is_favourite = False
+
     ctx = {
         "presentation": presentation,
         "schedule": schedule,
+        "is_favourite": is_favourite,
     }
     return render(request, "symposion/schedule/presentation_detail.html", ctx)
 
 
-def schedule_json(request):
-    slots = Slot.objects.filter(
-        day__schedule__published=True,
-        day__schedule__hidden=False
-    ).order_by("start")
+@login_required
+@require_POST
+def schedule_presentation_favourite(request, pk):
+    presentation = get_object_or_404(Presentation, pk=pk)
+    favourites = PresentationFavourite.objects.filter(user=request.user, presentation=presentation)
+    if favourites.exists():
+        favourites.delete()
+    else:
+        # only presentations on a public schedule can be starred
+        schedule = presentation.slot.day.schedule if presentation.slot else None
+        if presentation.unpublish or schedule is None or \
+                not schedule.published or schedule.hidden:
+            raise Http404()
+        PresentationFavourite.objects.create(user=request.user, presentation=presentation)
+    return redirect("schedule_presentation_detail", presentation.pk)
+
+
+@login_required
+def schedule_personal(request):
+    presentations = Presentation.objects.filter(favourites__user=request.user)
+    presentations = presentations.select_related("slot__day", "speaker")
+    presentations = presentations.order_by("slot__day__date", "slot__start")
 
+    ctx = {
+        "presentations": presentations,
+        "token": PersonalScheduleToken.for_user(request.user),
+    }
+    return render(request, "symposion/schedule/schedule_personal.html", ctx)
+
+
+def personal_schedule_events(token, track=None):
+    """
+    Return the published events starred by the owner of ``token``,
+    optionally limited to ``track``.
+    """
+    schedule_token = get_object_or_404(PersonalScheduleToken, token=token)
+    favourites = set(PresentationFavourite.objects.filter(
+        user=schedule_token.user_id
+    ).values_list("presentation", flat=True))
+    return [
+        event for event in filter_track(schedule_events(), track)
+        if event["presentation"] in favourites and not event["unpublish"]
+    ]
+
+
+def schedule_personal_json(request, token):
+    # Personal feeds are reachable by anyone holding the token, so they
+    # never expose speaker contact details.
     protocol = request.META.get('HTTP_X_FORWARDED_PROTO', 'http')
-    data = []
-    for slot in slots:
-        slot_data = {
-            "room": ", ".join(room["name"] for room in slot.rooms.values()),
-            "rooms": [room["name"] for room in slot.rooms.values()],
-            "start": slot.start_datetime.isoformat(),
-            "end": slot.end_datetime.isoformat(),
-            "duration": slot.length_in_minutes,
-            "kind": slot.kind.label,
-            "section": slot.day.schedule.section.slug,
-            "conf_key": slot.pk,
-            # TODO: models should be changed.
-            # these are model features from other conferences that have forked symposion
-            # these have been used almost everywhere and are good candidates for
-            # base proposals
-            "license": "CC BY",
-            "tags": "",
-            "released": False,
-            "contact": [],
-        }
-        if hasattr(slot.content, "proposal"):
-            if slot.content.unpublish and not request.user.is_staff:
-                continue
-
-            slot_data.update({
-                "name": slot.content.title,
-                "authors": [s.name for s in slot.content.speakers()],
-                "contact": [
-                    s.email for s in slot.content.speakers()
-                ] if request.user.has_perm('symposion_speakers.can_view_contact_details') or request.user.is_staff else ["redacted"],
-                "abstract": slot.content.abstract,
-                "conf_url": "%s://%s%s" % (
-                    protocol,
-                    Site.objects.get_current().domain,
-                    reverse("schedule_presentation_detail", args=[slot.content.pk])
-                ),
-                "cancelled": slot.content.cancelled,
-                "released": slot.content.proposal.recording_release
-            })
-            if not slot.content.speaker.twitter_username == '':
-                slot_data["twitter_id"] = slot.content.speaker.twitter_username
-        else:
-            slot_data.update({
-                "name": slot.content_override if slot.content_override else "Slot",
-            })
-        data.append(slot_data)
+    domain = Site.objects.get_current().domain
+    data = [
+        event_json(event, protocol, domain)
+        for event in personal_schedule_events(token, request.GET.get("track"))
+    ]
 
     return HttpResponse(
         json.dumps({"schedule": data}, indent=2),
         content_type="application/json"
     )
 
-class EventFeed(ICalFeed):
-
-    product_id = '-//linux.conf.au/schedule//EN'
-    timezone = settings.TIME_ZONE
-    filename = 'conference.ics'
-    def description(self):
-        return Conference.objects.all().first().title
-
-    def items(self):
-        return Slot.objects.filter(
-            day__schedule__published=True,
-            day__schedule__hidden=False
-        ).exclude(
-            kind__label='shortbreak'
-        ).order_by("start")
-
-    def item_title(self, item):
-        if hasattr(item.content, 'proposal'):
-            title =  item.content.title
-        else:
-            title = item.kind if item.kind else "Slot"
-        return title
-
-    def item_description(self, item):
-        if hasattr(item.content, 'proposal'):
-            description = "Speaker: %s\n%s" % (
-                item.content.speaker, item.content.abstract)
-        else:
-            description = item.content_override if item.content_override else "No description"
-        return description
-
-    def item_start_datetime(self, item):
-        return pytz.timezone(settings.TIME_ZONE).localize(item.start_datetime)
-
-    def item_end_datetime(self, item):
-        return pytz.timezone(settings.TIME_ZONE).localize(item.end_datetime)
-
-    def item_location(self, item):
-        return ", ".join(room["name"] for room in item.rooms.values())
-
-    def item_link(self, item):
-        if hasattr(item.content, 'proposal'):
-            return 'http://%s%s' % (
-                                    Site.objects.get_current().domain,
-                                    reverse('schedule_presentation_detail', args=[item.content.pk])
-                                    )
-        else:
-            return 'http://%s' % Site.objects.get_current().domain
-    
-    def item_guid(self, item):
-        return '%d@%s' % (item.pk, Site.objects.get_current().domain)
+
+def calendar_response(events, filename):
+    try:
+        title = current_conference().title
+    except Conference.DoesNotExist:
+        title = ""
+    response = HttpResponse(
+        render_calendar(events, title),
+        content_type="text/calendar; charset=utf-8"
+    )
+    response["Content-Disposition"] = 'filename="%s"' % filename
+    return response
+
+
+def schedule_personal_ics(request, token):
+    events = personal_schedule_events(token, request.GET.get("track"))
+    return calendar_response(events, "personal.ics")
+
+
+def schedule_json(request):
+    protocol = request.META.get('HTTP_X_FORWARDED_PROTO', 'http')
+    domain = Site.objects.get_current().domain
+    show_contact = request.user.has_perm('symposion_speakers.can_view_contact_details') or request.user.is_staff
+    data = [
+        event_json(event, protocol, domain, show_contact)
+        for event in filter_track(schedule_events(), request.GET.get("track"))
+        if request.user.is_staff or not event["unpublish"]
+    ]
+
+    return HttpResponse(
+        json.dumps({"schedule": data}, indent=2),
+        content_type="application/json"
+    )
+
+def schedule_ics(request):
+    # the feed can be limited to a single track with ?track=<name>
+    events = [
+        event for event in filter_track(schedule_events(), request.GET.get("track"))
+        if request.user.is_staff or not event["unpublish"]
+    ]
+    return calendar_response(events, "conference.ics")
+
 
 def session_list(request):
     sessions = Session.objects.all().order_by('pk')
@@ -1,9 +1,11 @@
 from __future__ import unicode_literals
 from django.contrib import admin
 
-from symposion.speakers.models import Speaker
+from symposion.speakers.models import Communique, Speaker
 
 
 admin.site.register(Speaker,
                     list_display=["name", "email", "created", "twitter_username"],
                     search_fields=["name"])
+admin.site.register(Communique,
+                    list_display=["subject", "sender", "created", "recipient_count", "chunk_count"])
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('symposion_speakers', '0002_auto_20161230_1900'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Communique',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255, verbose_name='Subject')),
+                ('body', models.TextField(verbose_name='Body')),
+                ('created', models.DateTimeField(default=datetime.datetime.now, editable=False, verbose_name='Created')),
+                ('recipient_count', models.PositiveIntegerField(default=0, verbose_name='Recipients')),
+                ('chunk_count', models.PositiveIntegerField(default=0, verbose_name='Chunks')),
+                ('sender', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Sender')),
+            ],
+            options={
+                'ordering': ['-created'],
+                'verbose_name': 'communique',
+                'verbose_name_plural': 'communiques',
+            },
+        ),
+    ]
@@ -1,7 +1,9 @@
 from __future__ import unicode_literals
 
 import datetime
+from email.utils import formataddr
 
+from django.core.mail import EmailMessage
 from django.core.urlresolvers import reverse
 from django.db import models
 from django.utils.encoding import python_2_unicode_compatible
@@ -9,11 +11,15 @@ from django.utils.translation import ugettext_lazy as _
 
 from django.contrib.auth.models import User
 
-from symposion.markdown_parser import parse
+from symposion.conf import settings
+from symposion.markdown_parser import MarkdownFieldsMixin
+from symposion.utils.mailqueue import DatabaseQueue, get_queue
 
 
 @python_2_unicode_compatible
-class Speaker(models.Model):
+class Speaker(MarkdownFieldsMixin, models.Model):
+
+    markdown_fields = ("biography", "experience", "accessibility")
 
     SESSION_COUNT_CHOICES = [
         (1, "One"),
@@ -117,12 +123,6 @@ class Speaker(models.Model):
         verbose_name_plural = _("Speakers")
         permissions = (('can_view_contact_details', 'Can View Contact Details'),)
 
-    def save(self, *args, **kwargs):
-        self.biography_html = parse(self.biography)
-        self.experience_html = parse(self.experience)
-        self.accessibility_html = parse(self.accessibility)
-        return super(Speaker, self).save(*args, **kwargs)
-
     def __str__(self):
         if self.user:
             return self.name
@@ -148,3 +148,75 @@ class Speaker(models.Model):
             for p in self.copresentations.all():
                 presentations.append(p)
         return presentations
+
+
+@python_2_unicode_compatible
+class Communique(models.Model):
+    """
+    A message from staff to every speaker, queued in chunks of
+    ``SYMPOSION_COMMUNIQUE_CHUNK_SIZE`` BCC recipients for the
+    ``send_queued_email`` worker.
+
+    Communiques are queued even when ``SYMPOSION_EMAIL_QUEUE`` is unset, in
+    the database, so the worker must be running for them to be delivered.
+    """
+
+    subject = models.CharField(max_length=255, verbose_name=_("Subject"))
+    body = models.TextField(verbose_name=_("Body"))
+    sender = models.ForeignKey(User, null=True, on_delete=models.SET_NULL, verbose_name=_("Sender"))
+    created = models.DateTimeField(default=datetime.datetime.now, editable=False, verbose_name=_("Created"))
+    recipient_count = models.PositiveIntegerField(default=0, verbose_name=_("Recipients"))
+    chunk_count = models.PositiveIntegerField(default=0, verbose_name=_("Chunks"))
+
+    class Meta:
+        ordering = ["-created"]
+        verbose_name = _("communique")
+        verbose_name_plural = _("communiques")
+
+    def __str__(self):
+        return self.subject
+
+    @property
+    def batch(self):
+        """
+        The label of this communique's messages in the email queue.
+        """
+        return "communique:%s" % self.pk
+
+    @staticmethod
+    def recipients(staff_only=False):
+        """
+        Returns the formatted addresses of every speaker with an account,
+        or only of staff speakers if ``staff_only``.
+        """
+        speakers = Speaker.objects.filter(user__isnull=False).exclude(user__email="")
+        if staff_only:
+            speakers = speakers.filter(user__is_staff=True)
+        return [
+            formataddr((name, email))
+            for name, email in speakers.values_list("name", "user__email").order_by("pk")
+        ]
+
+    def queue(self, staff_only=False):
+        """
+        Queue the communique for delivery, one message per chunk of
+        recipients.
+        """
+        recipients = self.recipients(staff_only=staff_only)
+        size = settings.SYMPOSION_COMMUNIQUE_CHUNK_SIZE
+        chunks = [recipients[i:i + size] for i in range(0, len(recipients), size)]
+        # too many messages to send during the request, whatever the setting
+        queue = get_queue() or DatabaseQueue()
+        queue.enqueue([
+            EmailMessage(
+                subject=self.subject,
+                body=self.body,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[settings.DEFAULT_FROM_EMAIL],
+                bcc=chunk,
+            )
+            for chunk in chunks
+        ], batch=self.batch)
+        self.recipient_count = len(recipients)
+        self.chunk_count = len(chunks)
+        self.save(update_fields=["recipient_count", "chunk_count"])
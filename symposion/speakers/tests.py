@@ -0,0 +1,76 @@
+from __future__ import unicode_literals
+
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from symposion.models import QueuedEmail
+from symposion.speakers.models import Communique, Speaker
+from symposion.utils.mailqueue import MemoryQueue
+
+
+@override_settings(SYMPOSION_EMAIL_QUEUE=None, SYMPOSION_COMMUNIQUE_CHUNK_SIZE=2)
+class TestCommunique(TestCase):
+
+    def setUp(self):
+        MemoryQueue.clear()
+        for i in range(5):
+            user = User.objects.create_user("speaker%d" % i, "speaker%d@example.com" % i, "pass")
+            Speaker.objects.create(user=user, name="Speaker %d" % i)
+        # invited speakers without an account are not mailed
+        Speaker.objects.create(name="Invited", invite_email="invited@example.com")
+        self.staff = User.objects.create_user("staff", "staff@example.com", "pass", is_staff=True)
+
+    def test_queue(self):
+        communique = Communique.objects.create(subject="Hello", body="Body")
+        communique.queue()
+        self.assertEqual(communique.recipient_count, 5)
+        self.assertEqual(communique.chunk_count, 3)
+
+        # queued in the database even though no queue is configured
+        rows = QueuedEmail.objects.filter(batch=communique.batch)
+        self.assertEqual(rows.count(), 3)
+        bcc = [address for row in rows for address in row.bcc.split("\n")]
+        self.assertEqual(sorted(bcc), ["Speaker %d <speaker%d@example.com>" % (i, i) for i in range(5)])
+
+    @override_settings(SYMPOSION_EMAIL_QUEUE="symposion.utils.mailqueue.MemoryQueue")
+    def test_configured_queue(self):
+        communique = Communique.objects.create(subject="Hello", body="Body")
+        communique.queue()
+        self.assertEqual(len(MemoryQueue.messages), 3)
+        self.assertEqual(set(item.batch for item in MemoryQueue.messages), set([communique.batch]))
+        self.assertFalse(QueuedEmail.objects.exists())
+
+    def test_send_view(self):
+        self.client.force_login(self.staff)
+        response = self.client.post(reverse("speaker_communique"), {
+            "msg_title": "Hello", "msg_body": "Body"})
+        self.assertRedirects(response, reverse("speaker_communique_status"),
+                             fetch_redirect_response=False)
+        communique = Communique.objects.get()
+        self.assertEqual(communique.sender, self.staff)
+        self.assertEqual(QueuedEmail.objects.filter(batch=communique.batch).count(), 3)
+
+    def test_status_view(self):
+        communique = Communique.objects.create(subject="Hello", body="Body")
+        communique.queue()
+        rows = list(QueuedEmail.objects.filter(batch=communique.batch))
+        QueuedEmail.objects.filter(pk=rows[0].pk).update(status=QueuedEmail.STATUS_SENT)
+        QueuedEmail.objects.filter(pk=rows[1].pk).update(status=QueuedEmail.STATUS_FAILED)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("speaker_communique_status"))
+        self.assertEqual(response.status_code, 200)
+        status = response.context["communiques"][0]
+        self.assertEqual(status, communique)
+        self.assertEqual(
+            (status.sent_count, status.failed_count, status.queued_count), (1, 1, 1))
+
+    def test_staff_only(self):
+        self.client.force_login(User.objects.get(username="speaker0"))
+        self.assertEqual(self.client.get(reverse("speaker_communique_status")).status_code, 404)
+        response = self.client.post(reverse("speaker_communique"), {
+            "msg_title": "Hello", "msg_body": "Body"})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Communique.objects.exists())
@@ -7,7 +7,8 @@ from .views import (
     speaker_edit,
     speaker_profile,
     speaker_create_staff,
-    speaker_communique
+    speaker_communique,
+    speaker_communique_status,
 )
 
 urlpatterns = [
@@ -16,5 +17,6 @@ urlpatterns = [
     url(r"^edit/(?:(?P<pk>\d+)/)?$", speaker_edit, name="speaker_edit"),
     url(r"^profile/(?P<pk>\d+)/$", speaker_profile, name="speaker_profile"),
     url(r"^staff/create/(\d+)/$", speaker_create_staff, name="speaker_create_staff"),
-    url(r"^communique/$", speaker_communique, name="speaker_communique")
+    url(r"^communique/$", speaker_communique, name="speaker_communique"),
+    url(r"^communique/status/$", speaker_communique_status, name="speaker_communique_status"),
 ]
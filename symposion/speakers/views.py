@@ -1,5 +1,7 @@
 from __future__ import unicode_literals
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Count
 from django.http import Http404
 from django.shortcuts import render, redirect, get_object_or_404
 
@@ -11,10 +13,11 @@ from account.decorators import login_required
 
 from symposion.proposals.models import ProposalBase
 from symposion.speakers.forms import SpeakerForm
-from symposion.speakers.models import Speaker
+from symposion.models import QueuedEmail
+from symposion.speakers.models import Communique, Speaker
 
 from symposion.reviews.models import NotificationTemplate
-from django.core.mail import send_mail, EmailMessage
+from django.core.mail import send_mail
 from django.conf import settings
 
 @login_required
@@ -154,25 +157,45 @@ def speaker_communique(request, pk=None):
 
     # Sending a message already composed?
     if request.method == "POST":
+        with transaction.atomic():
+            communique = Communique.objects.create(
+                subject=request.POST['msg_title'],
+                body=request.POST['msg_body'],
+                sender=request.user,
+            )
+            # while debugging only staff are mailed
+            communique.queue(staff_only=settings.DEBUG)
+        messages.success(request, _("Communique queued for %d speakers.") % communique.recipient_count)
+        return redirect("speaker_communique_status")
 
-        if settings.DEBUG:
-            recipients = [ '"%s" <%s>"' % (sp.name, sp.user.email) for sp in Speaker.objects.filter(user__is_staff=True).all()]
-        else:
-            recipients = [ '"%s" <%s>"' % (sp.name, sp.user.email) for sp in Speaker.objects.all()]
+    ctx = dict()
+    return render(request, "symposion/speakers/communique.html", ctx)
 
-        recipients = filter(lambda x: x is not None and x.user is not None, recipients)
-        if recipients:
-            em = EmailMessage(from_email=settings.DEFAULT_FROM_EMAIL,
-                          to=[settings.DEFAULT_FROM_EMAIL],
-                          bcc=recipients,
-                          subject=request.POST['msg_title'],
-                          body=request.POST['msg_body'])
 
-            em.send()
-        return redirect("dashboard")
+@login_required
+def speaker_communique_status(request):
+    """
+    Shows staff how far delivery of recent communiques has got.
+    """
+    if not request.user.is_staff:
+        raise Http404
 
-    ctx = dict()
-    return render(request, "symposion/speakers/communique.html", ctx)
+    communiques = list(Communique.objects.select_related("sender")[:20])
+    progress = {}
+    counts = QueuedEmail.objects.filter(
+        batch__in=[communique.batch for communique in communiques]
+    ).values_list("batch", "status").annotate(count=Count("pk")).order_by()
+    for batch, status, count in counts:
+        progress.setdefault(batch, {})[status] = count
+    for communique in communiques:
+        communique.progress = progress.get(communique.batch, {})
+        communique.sent_count = communique.progress.get(QueuedEmail.STATUS_SENT, 0)
+        communique.failed_count = communique.progress.get(QueuedEmail.STATUS_FAILED, 0)
+        communique.queued_count = communique.progress.get(QueuedEmail.STATUS_QUEUED, 0)
+
+    return render(request, "symposion/speakers/communique_status.html", {
+        "communiques": communiques,
+    })
 
 
 
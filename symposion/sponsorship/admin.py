@@ -12,6 +12,7 @@ from symposion.sponsorship.models import (
     BenefitLevel,
     Sponsor,
     SponsorBenefit,
+    SponsorBenefitDerivative,
     SponsorLevel,
 )
 
@@ -114,8 +115,17 @@ class SponsorLevelAdmin(admin.ModelAdmin):
     inlines = [BenefitLevelInline]
 
 
+class SponsorBenefitDerivativeInline(admin.TabularInline):
+    model = SponsorBenefitDerivative
+    extra = 0
+    fields = ["alias", "format", "image", "width", "height"]
+    readonly_fields = fields
+    can_delete = False
+
+
 class SponsorBenefitAdmin(admin.ModelAdmin):
     list_display = ('benefit', 'sponsor', 'active', '_is_complete', 'show_text')
+    inlines = [SponsorBenefitDerivativeInline]
 
     def show_text(self, sponsor_benefit):
         if sponsor_benefit.text:
@@ -0,0 +1,232 @@
+"""
+Web-sized derivatives of sponsor uploads.
+
+Sponsors upload logos at print resolution.  For each image upload of a
+``weblogo`` or ``file`` benefit, a copy is made per size in
+``SYMPOSION_SPONSOR_DERIVATIVE_SIZES`` and per format in
+``SYMPOSION_SPONSOR_DERIVATIVE_FORMATS`` that Pillow can write, using
+easy-thumbnails, and stored as a ``SponsorBenefitDerivative`` under a
+content-hashed name.  Copies for sizes or formats no longer wanted are
+removed.
+
+Derivatives are made once the upload has been committed, in the saving
+process or, if ``SYMPOSION_SPONSOR_DERIVATIVE_PROCESSES`` is set, in a pool
+of that many worker processes.  The upload each benefit's derivatives were
+made from is recorded, so saves that keep the upload do nothing and uploads
+that are not images are only looked at once.
+"""
+from __future__ import unicode_literals
+
+import atexit
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+
+import django
+from django.core.files.base import ContentFile
+from django.db import connections
+
+from easy_thumbnails.files import get_thumbnailer
+from PIL import Image
+
+from symposion.conf import settings
+from symposion.sponsorship.models import SponsorBenefit, SponsorBenefitDerivative, \
+    UPLOAD_BENEFIT_TYPES
+
+
+log = logging.getLogger(__name__)
+
+# Pillow format names and the file extensions used for them
+FORMATS = {
+    "png": "PNG",
+    "webp": "WEBP",
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _digest(upload):
+    sha1 = hashlib.sha1()
+    upload.open("rb")
+    try:
+        for chunk in upload.chunks():
+            sha1.update(chunk)
+    finally:
+        upload.close()
+    return sha1.hexdigest()
+
+
+def _render(image, fmt):
+    if image.mode not in ("RGB", "RGBA"):
+        transparent = "transparency" in image.info or image.mode in ("LA", "PA")
+        image = image.convert("RGBA" if transparent else "RGB")
+    buf = io.BytesIO()
+    image.save(buf, format=FORMATS[fmt], optimize=True)
+    return buf.getvalue()
+
+
+def formats():
+    """
+    Return the formats of ``SYMPOSION_SPONSOR_DERIVATIVE_FORMATS`` that
+    this Pillow can write (WebP support is optional).
+    """
+    Image.init()
+    return [
+        fmt for fmt in settings.SYMPOSION_SPONSOR_DERIVATIVE_FORMATS
+        if FORMATS.get(fmt) in Image.SAVE
+    ]
+
+
+def _delete(derivatives):
+    for derivative in derivatives:
+        derivative.delete()
+        derivative.image.storage.delete(derivative.image.name)
+
+
+def generate(sponsor_benefit_id, force=False):
+    """
+    Create, refresh or remove the derivatives of one sponsor benefit's
+    upload.
+
+    Nothing is done if the derivatives were made from the same upload for
+    the current sizes and formats, unless ``force`` is set.  Returns the
+    number of derivatives written.
+    """
+    try:
+        sponsor_benefit = SponsorBenefit.objects.select_related("benefit").get(
+            pk=sponsor_benefit_id)
+    except SponsorBenefit.DoesNotExist:
+        return 0
+    upload = sponsor_benefit.upload
+    if sponsor_benefit.benefit.type not in UPLOAD_BENEFIT_TYPES:
+        return 0
+
+    existing = dict(
+        ((derivative.alias, derivative.format), derivative)
+        for derivative in sponsor_benefit.derivatives.all()
+    )
+    wanted = set(
+        (alias, fmt)
+        for alias in settings.SYMPOSION_SPONSOR_DERIVATIVE_SIZES
+        for fmt in formats()
+    ) if upload else set()
+    if not force and sponsor_benefit.derivatives_source == upload.name and \
+            (not existing or set(existing) == wanted):
+        # no derivatives at all means the upload is not an image
+        return 0
+
+    _delete(derivative for key, derivative in existing.items() if key not in wanted)
+    existing = dict((key, derivative) for key, derivative in existing.items() if key in wanted)
+    written = 0
+    if wanted:
+        written = _write(sponsor_benefit, existing, wanted, force)
+        if written is None:
+            # try again on the next save
+            return 0
+    SponsorBenefit.objects.filter(pk=sponsor_benefit.pk).update(derivatives_source=upload.name)
+    return written
+
+
+def _write(sponsor_benefit, existing, wanted, force):
+    """
+    Write the ``wanted`` derivatives that are missing or out of date and
+    return how many were written, or None if the upload can't be read.
+    """
+    upload = sponsor_benefit.upload
+    try:
+        digest = _digest(upload)
+    except (IOError, OSError) as e:
+        log.warning("Can't read sponsor upload %s: %s", upload.name, e)
+        return None
+    thumbnailer = get_thumbnailer(upload)
+    base = os.path.splitext(os.path.basename(upload.name))[0]
+    written = 0
+    for alias, size in settings.SYMPOSION_SPONSOR_DERIVATIVE_SIZES.items():
+        keys = [(alias, fmt) for fmt in formats() if (alias, fmt) in wanted]
+        if not force and all(
+            key in existing and existing[key].source_digest == digest for key in keys
+        ):
+            continue
+        try:
+            thumbnail = thumbnailer.generate_thumbnail({"size": size, "upscale": False})
+        except Exception as e:
+            # not an image (e.g. a PDF print file); drop copies of any
+            # image it replaced
+            log.debug("No derivatives for sponsor upload %s: %s", upload.name, e)
+            _delete(existing.values())
+            return 0
+        for key in keys:
+            fmt = key[1]
+            data = _render(thumbnail.image, fmt)
+            name = "%s-%s.%s.%s" % (base, alias, hashlib.sha1(data).hexdigest()[:12], fmt)
+            derivative = existing.get(key)
+            if derivative is None:
+                derivative = SponsorBenefitDerivative(
+                    sponsor_benefit=sponsor_benefit, alias=alias, format=fmt)
+                old_name = None
+            else:
+                old_name = derivative.image.name
+            if old_name is None or os.path.basename(old_name) != name:
+                derivative.image.save(name, ContentFile(data), save=False)
+            derivative.width, derivative.height = thumbnail.image.size
+            derivative.source_digest = digest
+            derivative.save()
+            if old_name and old_name != derivative.image.name:
+                derivative.image.storage.delete(old_name)
+            written += 1
+    return written
+
+
+def _generate_logged(sponsor_benefit_id, force=False):
+    # exceptions in pool workers would otherwise be lost
+    try:
+        return generate(sponsor_benefit_id, force=force)
+    except Exception:
+        log.exception("Generating derivatives of sponsor benefit %s failed", sponsor_benefit_id)
+        return 0
+
+
+def init_worker():
+    # Forked workers inherit the parent's database connections; drop them
+    # without closing so that the parent's sockets stay usable.
+    for connection in connections.all():
+        connection.connection = None
+    django.setup()
+
+
+def _close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool.join()
+            _pool = None
+
+
+def get_pool():
+    """
+    Return the process pool derivatives are made in, starting it on first
+    use.  It is shut down when the process exits.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = multiprocessing.Pool(
+                settings.SYMPOSION_SPONSOR_DERIVATIVE_PROCESSES, initializer=init_worker)
+            atexit.register(_close_pool)
+    return _pool
+
+
+def schedule(sponsor_benefit_id):
+    """
+    Make the derivatives of a sponsor benefit, in the worker pool if one is
+    configured.
+    """
+    if settings.SYMPOSION_SPONSOR_DERIVATIVE_PROCESSES:
+        get_pool().apply_async(_generate_logged, (sponsor_benefit_id,))
+    else:
+        _generate_logged(sponsor_benefit_id)
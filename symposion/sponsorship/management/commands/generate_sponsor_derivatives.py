@@ -0,0 +1,53 @@
+from __future__ import unicode_literals
+
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from symposion.sponsorship.derivatives import generate, init_worker
+from symposion.sponsorship.models import SponsorBenefit, UPLOAD_BENEFIT_TYPES
+
+
+def _generate(args):
+    pk, force = args
+    try:
+        return pk, generate(pk, force=force), None
+    except Exception as e:
+        return pk, 0, "%s" % e
+
+
+class Command(BaseCommand):
+    help = "Make the web-sized derivatives of existing sponsor logo and file uploads."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes", type=int, default=multiprocessing.cpu_count(),
+            help="Worker processes used for resizing.")
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Remake derivatives even if the upload has not changed.")
+
+    def handle(self, *args, **options):
+        pks = list(SponsorBenefit.objects.filter(
+            benefit__type__in=UPLOAD_BENEFIT_TYPES,
+        ).exclude(upload="").values_list("pk", flat=True))
+        jobs = [(pk, options["force"]) for pk in pks]
+
+        # the workers open their own connections
+        connections.close_all()
+        pool = multiprocessing.Pool(options["processes"], initializer=init_worker)
+        written = failed = 0
+        try:
+            for done, (pk, count, error) in enumerate(pool.imap_unordered(_generate, jobs), 1):
+                written += count
+                if error:
+                    failed += 1
+                    self.stderr.write("Sponsor benefit %s: %s" % (pk, error))
+                if options["verbosity"] > 1:
+                    self.stdout.write("%d/%d uploads" % (done, len(jobs)))
+        finally:
+            pool.close()
+            pool.join()
+        self.stdout.write("Wrote %d derivatives for %d uploads, %d failed" % (
+            written, len(jobs), failed))
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('symposion_sponsorship', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SponsorBenefitDerivative',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=20, verbose_name='Alias')),
+                ('format', models.CharField(max_length=10, verbose_name='Format')),
+                ('image', models.FileField(max_length=255, upload_to='sponsor_files/derivatives', verbose_name='Image')),
+                ('width', models.PositiveIntegerField(verbose_name='Width')),
+                ('height', models.PositiveIntegerField(verbose_name='Height')),
+                ('source_digest', models.CharField(max_length=40, verbose_name='Source digest')),
+                ('sponsor_benefit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='derivatives', to='symposion_sponsorship.SponsorBenefit', verbose_name='Sponsor benefit')),
+            ],
+            options={
+                'verbose_name': 'Sponsor benefit derivative',
+                'verbose_name_plural': 'Sponsor benefit derivatives',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='sponsorbenefitderivative',
+            unique_together=set([('sponsor_benefit', 'alias', 'format')]),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def backfill_sponsor_logo(apps, schema_editor):
+    # Sponsor.website_logo no longer looks for a web logo when sponsor_logo
+    # is unset, so point it at the first uploaded one where it is missing.
+    Sponsor = apps.get_model("symposion_sponsorship", "Sponsor")
+    SponsorBenefit = apps.get_model("symposion_sponsorship", "SponsorBenefit")
+    logos = SponsorBenefit.objects.filter(
+        sponsor__sponsor_logo=None,
+        benefit__type="weblogo",
+    ).exclude(upload="").order_by("-pk").values_list("sponsor", "pk")
+    for sponsor_id, pk in dict(logos).items():
+        Sponsor.objects.filter(pk=sponsor_id).update(sponsor_logo=pk)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('symposion_sponsorship', '0002_sponsorbenefitderivative'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_sponsor_logo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('symposion_sponsorship', '0003_backfill_sponsor_logo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sponsorbenefit',
+            name='derivatives_source',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Derivatives source'),
+        ),
+    ]
@@ -5,8 +5,9 @@ import datetime
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.urlresolvers import reverse
-from django.db import models
-from django.db.models.signals import post_init, post_save
+from django.db import models, transaction
+from django.db.models import Case, Max, Value, When
+from django.db.models.signals import post_delete, post_init, post_save
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 
@@ -14,6 +15,11 @@ from django.contrib.auth.models import User
 
 from symposion.conference.models import Conference
 from symposion.sponsorship.managers import SponsorManager
+from symposion.utils.cache import bump_version_on_commit
+
+
+# bumped whenever anything shown in the cached sponsor listing changes
+SPONSORSHIP_CACHE_VERSION = "sponsorship"
 
 
 # The benefits we track as individual fields on sponsors
@@ -43,6 +49,7 @@ BENEFITS = [
         'column_title': _(u"Print Desc"),
     }
 ]
+BENEFIT_NAMES = set(benefit['name'] for benefit in BENEFITS)
 
 
 @python_2_unicode_compatible
@@ -105,11 +112,9 @@ class Sponsor(models.Model):
 
     def save(self, *args, **kwargs):
         # Set fields related to benefits being complete
-        for benefit in BENEFITS:
-            field_name = benefit['field_name']
-            benefit_name = benefit['name']
-            setattr(self, field_name, self.benefit_is_complete(benefit_name))
-            super(Sponsor, self).save(*args, **kwargs)
+        for field_name, value in self.benefit_flags().items():
+            setattr(self, field_name, value)
+        super(Sponsor, self).save(*args, **kwargs)
 
     def get_absolute_url(self):
         if self.active:
@@ -124,15 +129,21 @@ class Sponsor(models.Model):
 
     @property
     def website_logo(self):
+        # sponsor_logo is kept up to date whenever a web logo is saved
         if self.sponsor_logo is None:
-            benefits = self.sponsor_benefits.filter(
-                benefit__type="weblogo", upload__isnull=False)[:1]
-            if benefits.count():
-                if benefits[0].upload:
-                    self.sponsor_logo = benefits[0]
-                    self.save()
+            return None
         return self.sponsor_logo.upload
 
+    @property
+    def website_logo_derivatives(self):
+        """
+        ``{format: url}`` of the web-sized copies of the sponsor's logo,
+        empty until they have been generated.
+        """
+        if self.sponsor_logo is None:
+            return {}
+        return self.sponsor_logo.derivative_urls("web")
+
     @property
     def listing_text(self):
         if not hasattr(self, "_listing_text"):
@@ -148,40 +159,9 @@ class Sponsor(models.Model):
         Reset all benefits for this sponsor to the defaults for their
         sponsorship level.
         """
-        level = None
-
-        try:
-            level = self.level
-        except SponsorLevel.DoesNotExist:
-            pass
-
-        allowed_benefits = []
-        if level:
-            for benefit_level in level.benefit_levels.all():
-                # Create all needed benefits if they don't exist already
-                sponsor_benefit, created = SponsorBenefit.objects.get_or_create(
-                    sponsor=self, benefit=benefit_level.benefit)
-
-                # and set to default limits for this level.
-                sponsor_benefit.max_words = benefit_level.max_words
-                sponsor_benefit.other_limits = benefit_level.other_limits
-
-                # and set to active
-                sponsor_benefit.active = True
-
-                # @@@ We don't call sponsor_benefit.clean here. This means
-                # that if the sponsorship level for a sponsor is adjusted
-                # downwards, an existing too-long text entry can remain,
-                # and won't raise a validation error until it's next
-                # edited.
-                sponsor_benefit.save()
-
-                allowed_benefits.append(sponsor_benefit.pk)
-
-        # Any remaining sponsor benefits that don't normally belong to
-        # this level are set to inactive
-        self.sponsor_benefits.exclude(pk__in=allowed_benefits)\
-            .update(active=False, max_words=None, other_limits="")
+        result = sync_sponsor_benefits(Sponsor.objects.filter(pk=self.pk))
+        for field_name, value in result["flags"].get(self.pk, {}).items():
+            setattr(self, field_name, value)
 
     def send_coordinator_emails(self):
         pass  # @@@ should this just be done centrally?
@@ -189,15 +169,47 @@ class Sponsor(models.Model):
     def benefit_is_complete(self, name):
         """Return True - benefit is complete, False - benefit is not complete,
          or None - benefit not applicable for this sponsor's level """
-        if BenefitLevel.objects.filter(level=self.level, benefit__name=name).exists():
-            try:
-                benefit = self.sponsor_benefits.get(benefit__name=name)
-            except SponsorBenefit.DoesNotExist:
-                return False
-            else:
-                return benefit.is_complete
+        return self.benefit_flags([name])[name]
+
+    def benefit_flags(self, names=None):
+        """
+        Return the completeness of the tracked ``BENEFITS`` (or of the
+        benefits named in ``names``, keyed by name) as ``benefit_is_complete``
+        would, from a single query.
+        """
+        if names is None:
+            keys = dict((benefit['name'], benefit['field_name']) for benefit in BENEFITS)
         else:
-            return None   # Not an applicable benefit for this sponsor's level
+            keys = dict((name, name) for name in names)
+        flags = dict((key, None) for key in keys.values())
+        if self.level_id is None or self.pk is None:
+            # a new sponsor's flags are set once its benefits are created
+            return flags
+
+        # Per benefit offered at the sponsor's level, the state of the
+        # sponsor's benefit: 2 complete, 1 incomplete, 0 unknown, -1 missing
+        own = dict(sponsor_benefits__sponsor=self.pk)
+        states = Benefit.objects.filter(
+            name__in=list(keys), benefit_levels__level=self.level_id,
+        ).values_list("name").annotate(state=Max(Case(
+            When(sponsor_benefits__is_complete=True, then=Value(2), **own),
+            When(sponsor_benefits__is_complete=False, then=Value(1), **own),
+            When(then=Value(0), **own),
+            default=Value(-1),
+            output_field=models.IntegerField(),
+        )))
+        for name, state in states:
+            flags[keys[name]] = {2: True, 1: False, 0: None, -1: False}[state]
+        return flags
+
+    def update_benefit_flags(self):
+        """
+        Recompute the benefit completeness fields and write just them.
+        """
+        flags = self.benefit_flags()
+        for field_name, value in flags.items():
+            setattr(self, field_name, value)
+        Sponsor.objects.filter(pk=self.pk).update(**flags)
 
 
 def _store_initial_level(sender, instance, **kwargs):
@@ -206,9 +218,11 @@ def _store_initial_level(sender, instance, **kwargs):
 post_init.connect(_store_initial_level, sender=Sponsor)
 
 
-def _check_level_change(sender, instance, created, **kwargs):
-    if instance and (created or instance.level_id != instance._initial_level_id):
+def _check_level_change(sender, instance, created, raw=False, **kwargs):
+    if instance and not raw and (created or instance.level_id != instance._initial_level_id):
         instance.reset_benefits()
+    if instance:
+        instance._initial_level_id = instance.level_id
 post_save.connect(_check_level_change, sender=Sponsor)
 
 
@@ -281,6 +295,11 @@ class SponsorBenefit(models.Model):
     # (e.g. a logo file for a Web logo benefit).
     is_complete = models.NullBooleanField(_("Complete?"), help_text=_(u"True - benefit complete; False - benefit incomplete; Null - n/a"))
 
+    # Name of the upload the derivatives were last made from, also set when
+    # the upload is not an image, so that other saves do not redo the work
+    derivatives_source = models.CharField(_("Derivatives source"), max_length=255, blank=True,
+                                          editable=False)
+
     class Meta:
         ordering = ["-active"]
         verbose_name = _("Sponsor benefit")
@@ -315,19 +334,194 @@ class SponsorBenefit(models.Model):
         return []
 
     def _is_text_benefit(self):
-        return self.benefit.type in ["text", "richtext", "simple"] and bool(self.text)
+        return self.benefit.type in TEXT_BENEFIT_TYPES and bool(self.text)
 
     def _is_upload_benefit(self):
-        return self.benefit.type in ["file", "weblogo"] and bool(self.upload)
+        return self.benefit.type in UPLOAD_BENEFIT_TYPES and bool(self.upload)
 
     def _is_complete(self):
         return self.active and (self._is_text_benefit() or self._is_upload_benefit())
 
+    def derivative_urls(self, alias):
+        """
+        Return ``{format: url}`` for the derivatives of the upload made for
+        ``alias`` (see ``SYMPOSION_SPONSOR_DERIVATIVE_SIZES``), using
+        prefetched derivatives where available.
+        """
+        return dict(
+            (derivative.format, derivative.image.url)
+            for derivative in self.derivatives.all()
+            if derivative.alias == alias
+        )
+
 
-def _denorm_weblogo(sender, instance, created, **kwargs):
-    if instance:
+@python_2_unicode_compatible
+class SponsorBenefitDerivative(models.Model):
+    """
+    A resized copy of a sponsor benefit's upload, stored under a name that
+    includes a hash of its content so that it can be cached indefinitely.
+    """
+
+    sponsor_benefit = models.ForeignKey(SponsorBenefit, related_name="derivatives",
+                                        verbose_name=_("Sponsor benefit"))
+    alias = models.CharField(_("Alias"), max_length=20)
+    format = models.CharField(_("Format"), max_length=10)
+    image = models.FileField(_("Image"), max_length=255, upload_to="sponsor_files/derivatives")
+    width = models.PositiveIntegerField(_("Width"))
+    height = models.PositiveIntegerField(_("Height"))
+    # sha1 of the upload the derivative was made from
+    source_digest = models.CharField(_("Source digest"), max_length=40)
+
+    class Meta:
+        unique_together = [("sponsor_benefit", "alias", "format")]
+        verbose_name = _("Sponsor benefit derivative")
+        verbose_name_plural = _("Sponsor benefit derivatives")
+
+    def __str__(self):
+        return "%s (%s, %s)" % (self.sponsor_benefit, self.alias, self.format)
+
+
+TEXT_BENEFIT_TYPES = ["text", "richtext", "simple"]
+UPLOAD_BENEFIT_TYPES = ["file", "weblogo"]
+
+
+def _chunks(items, size=500):
+    # keeps "IN" lists within SQLite's limit on query parameters
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def sync_sponsor_benefits(sponsors=None):
+    """
+    Make the benefits of ``sponsors`` (a queryset, all sponsors by default)
+    match their levels: create missing benefits, set the level's limits on
+    existing ones, and deactivate benefits their level does not offer.
+
+    Works from a handful of queries whatever the number of sponsors:
+    creates are bulk inserts and changes are queryset updates grouped by
+    the values written, so ``SponsorBenefit.save`` and its signals are not
+    run.  The benefit completeness fields of the sponsors are refreshed
+    the same way.
+
+    Returns a dict with the ``created``, ``updated`` and ``deactivated``
+    counts and the new completeness ``flags`` by sponsor id.
+    """
+    if sponsors is None:
+        sponsors = Sponsor.objects.all()
+    sponsor_levels = dict(sponsors.values_list("pk", "level_id"))
+
+    # target limits by level: {level id: {benefit id: (max words, other limits)}}
+    targets = {}
+    for level_id, benefit_id, max_words, other_limits in BenefitLevel.objects.filter(
+        level__in=set(sponsor_levels.values())
+    ).values_list("level_id", "benefit_id", "max_words", "other_limits"):
+        targets.setdefault(level_id, {})[benefit_id] = (max_words, other_limits)
+    benefits = dict(
+        (pk, (name, type))
+        for pk, name, type in Benefit.objects.values_list("pk", "name", "type")
+    )
+
+    existing = {}
+    updates = {}
+    deactivate = []
+    for sponsor_benefit in SponsorBenefit.objects.filter(
+        sponsor__in=list(sponsor_levels)
+    ).only("pk", "sponsor", "benefit", "active", "max_words", "other_limits",
+           "is_complete", "text", "upload"):
+        sponsor_id, benefit_id = sponsor_benefit.sponsor_id, sponsor_benefit.benefit_id
+        target = targets.get(sponsor_levels[sponsor_id], {}).get(benefit_id)
+        if target is None:
+            existing.setdefault(sponsor_id, {})[benefit_id] = False
+            if sponsor_benefit.active or sponsor_benefit.max_words is not None or \
+                    sponsor_benefit.other_limits or sponsor_benefit.is_complete:
+                deactivate.append(sponsor_benefit.pk)
+            continue
+        benefit_type = benefits[benefit_id][1]
+        is_complete = (
+            (benefit_type in TEXT_BENEFIT_TYPES and bool(sponsor_benefit.text)) or
+            (benefit_type in UPLOAD_BENEFIT_TYPES and bool(sponsor_benefit.upload))
+        )
+        existing.setdefault(sponsor_id, {})[benefit_id] = is_complete
+        values = (True, target[0], target[1], is_complete)
+        current = (sponsor_benefit.active, sponsor_benefit.max_words,
+                   sponsor_benefit.other_limits, sponsor_benefit.is_complete)
+        if values != current:
+            updates.setdefault(values, []).append(sponsor_benefit.pk)
+
+    new = []
+    for sponsor_id, level_id in sponsor_levels.items():
+        for benefit_id, (max_words, other_limits) in targets.get(level_id, {}).items():
+            if benefit_id not in existing.get(sponsor_id, {}):
+                new.append(SponsorBenefit(
+                    sponsor_id=sponsor_id, benefit_id=benefit_id, active=True,
+                    max_words=max_words, other_limits=other_limits, is_complete=False,
+                ))
+                existing.setdefault(sponsor_id, {})[benefit_id] = False
+
+    with transaction.atomic():
+        SponsorBenefit.objects.bulk_create(new)
+        for (active, max_words, other_limits, is_complete), pks in updates.items():
+            for chunk in _chunks(pks):
+                SponsorBenefit.objects.filter(pk__in=chunk).update(
+                    active=active, max_words=max_words, other_limits=other_limits,
+                    is_complete=is_complete)
+        for chunk in _chunks(deactivate):
+            SponsorBenefit.objects.filter(pk__in=chunk).update(
+                active=False, max_words=None, other_limits="", is_complete=False)
+
+        # completeness flags, as Sponsor.benefit_flags works them out
+        flags = {}
+        groups = {}
+        for sponsor_id, level_id in sponsor_levels.items():
+            offered = targets.get(level_id, {})
+            sponsor_flags = dict((benefit['field_name'], None) for benefit in BENEFITS)
+            for benefit in BENEFITS:
+                states = [
+                    existing[sponsor_id][benefit_id] for benefit_id in offered
+                    if benefits[benefit_id][0] == benefit['name']
+                ]
+                if states:
+                    sponsor_flags[benefit['field_name']] = any(states)
+            flags[sponsor_id] = sponsor_flags
+            groups.setdefault(tuple(sorted(sponsor_flags.items())), []).append(sponsor_id)
+        for values, pks in groups.items():
+            for chunk in _chunks(pks):
+                Sponsor.objects.filter(pk__in=chunk).update(**dict(values))
+
+    bump_version_on_commit(SPONSORSHIP_CACHE_VERSION)
+    return {
+        "created": len(new),
+        "updated": sum(len(pks) for pks in updates.values()),
+        "deactivated": len(deactivate),
+        "flags": flags,
+    }
+
+
+def _schedule_derivatives(sender, instance, raw=False, **kwargs):
+    # also runs when the upload is cleared, to remove the derivatives
+    if raw or instance.upload.name == instance.derivatives_source:
+        return
+    if instance.benefit.type not in UPLOAD_BENEFIT_TYPES:
+        return
+    # imported here as the derivatives module needs the models above
+    from symposion.sponsorship.derivatives import schedule
+    pk = instance.pk
+    transaction.on_commit(lambda: schedule(pk))
+post_save.connect(_schedule_derivatives, sender=SponsorBenefit)
+
+
+def _denorm_weblogo(sender, instance, created, raw=False, **kwargs):
+    if instance and not raw:
         if instance.benefit.type == "weblogo" and instance.upload:
-            sponsor = instance.sponsor
-            sponsor.sponsor_logo = instance
-            sponsor.save()
+            Sponsor.objects.filter(pk=instance.sponsor_id).update(sponsor_logo=instance)
+        if instance.benefit.name in BENEFIT_NAMES:
+            instance.sponsor.update_benefit_flags()
 post_save.connect(_denorm_weblogo, sender=SponsorBenefit)
+
+
+def _invalidate_sponsorship_cache(sender, **kwargs):
+    bump_version_on_commit(SPONSORSHIP_CACHE_VERSION)
+for _model in [SponsorLevel, Sponsor, Benefit, SponsorBenefit, SponsorBenefitDerivative]:
+    post_save.connect(_invalidate_sponsorship_cache, sender=_model)
+    post_delete.connect(_invalidate_sponsorship_cache, sender=_model)
@@ -2,7 +2,7 @@ from django import template
 from django.template.defaultfilters import linebreaks, urlize
 
 from symposion.conference.models import current_conference
-from symposion.sponsorship.models import Sponsor, SponsorLevel
+from symposion.sponsorship.utils import sponsor_listing
 
 
 register = template.Library()
@@ -28,16 +28,16 @@ class SponsorsNode(template.Node):
         self.context_var = context_var
 
     def render(self, context):
-        conference = current_conference()
+        levels = sponsor_listing(current_conference())
         if self.level:
-            level = self.level.resolve(context)
-            queryset = Sponsor.objects.filter(
-                level__conference=conference, level__name__iexact=level, active=True)\
-                .order_by("added")
+            name = self.level.resolve(context).lower()
+            sponsors = sorted(
+                [sponsor for level in levels if level.name.lower() == name
+                 for sponsor in level.active_sponsors],
+                key=lambda sponsor: sponsor.added)
         else:
-            queryset = Sponsor.objects.filter(level__conference=conference, active=True)\
-                .order_by("level__order", "added")
-        context[self.context_var] = queryset
+            sponsors = [sponsor for level in levels for sponsor in level.active_sponsors]
+        context[self.context_var] = sponsors
         return u""
 
 
@@ -55,8 +55,7 @@ class SponsorLevelNode(template.Node):
         self.context_var = context_var
 
     def render(self, context):
-        conference = current_conference()
-        context[self.context_var] = SponsorLevel.objects.filter(conference=conference)
+        context[self.context_var] = sponsor_listing(current_conference())
         return u""
 
 
@@ -100,9 +99,15 @@ class LocalizedTextNode(template.Node):
         try:
             sponsor = self.sponsor_var.resolve(context)
             content_type = '%s_%s' % (self.content_type, context['request'].LANGUAGE_CODE)
-            texts = sponsor.sponsor_benefits.filter(benefit__content_type=content_type)
-            if texts.count() > 0:
-                s = linebreaks(urlize(texts[0].text, autoescape=True))
+            if hasattr(sponsor, "listing_texts"):
+                # prefetched by sponsor_listing
+                texts = [text for text in sponsor.listing_texts
+                         if text.benefit.content_type == content_type]
+            else:
+                texts = sponsor.sponsor_benefits.filter(benefit__content_type=content_type)[:1]
+            for text in texts:
+                s = linebreaks(urlize(text.text, autoescape=True))
+                break
             if self.content_var:
                 context[self.content_var] = s
                 s = ''
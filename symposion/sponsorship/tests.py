@@ -1,4 +1,6 @@
 from cStringIO import StringIO
+import io
+import json
 import os
 import shutil
 import tempfile
@@ -7,13 +9,19 @@ from zipfile import ZipFile
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.core.urlresolvers import reverse
-from django.test import TestCase
+from django.template import Context, Template
+from django.test import TestCase, TransactionTestCase
 from django.test.utils import override_settings
 
-from pycon.sponsorship.models import Benefit, Sponsor, SponsorBenefit,\
-    SponsorLevel
-from symposion.conference.models import current_conference
+from PIL import Image
+
+from symposion.sponsorship.models import Benefit, BenefitLevel, Sponsor, SponsorBenefit,\
+    SponsorBenefitDerivative, SponsorLevel, sync_sponsor_benefits
+from symposion.conference.models import Conference, current_conference
+from symposion.sponsorship.derivatives import formats, schedule
 
 
 class TestSponsorZipDownload(TestCase):
@@ -54,7 +62,7 @@ class TestSponsorZipDownload(TestCase):
         self.assertEqual(
             'attachment; filename="pycon_%s_sponsorlogos.zip"' % prefix,
             rsp['Content-Disposition'])
-        zipfile = ZipFile(StringIO(rsp.content), "r")
+        zipfile = ZipFile(StringIO(b"".join(rsp.streaming_content)), "r")
         # Check out the zip - testzip() returns None if no errors found
         self.assertIsNone(zipfile.testzip())
         # Compare contents to what is expected
@@ -305,3 +313,309 @@ class TestBenefitValidation(TestCase):
 
     def test_simple_has_both(self):
         self.validate(False, self.simple_type, upload="filename", text="Text")
+
+
+class TestSponsorExport(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='joe',
+                                             email='joe@example.com',
+                                             password='joe')
+        self.user.is_staff = True
+        self.user.save()
+        self.url = reverse("sponsor_export_data")
+        self.assertTrue(self.client.login(username='joe@example.com',
+                                          password='joe'))
+
+        conference = current_conference()
+        self.sponsor_level = SponsorLevel.objects.create(
+            conference=conference, name="Lead", cost=1)
+        self.sponsor = Sponsor.objects.create(
+            name="Big Daddy",
+            level=self.sponsor_level,
+            active=True,
+        )
+        Sponsor.objects.create(
+            name="Big Mama",
+            level=self.sponsor_level,
+            active=True,
+        )
+        description = Benefit.objects.create(name="Company Description", type="text")
+        SponsorBenefit.objects.create(
+            sponsor=self.sponsor,
+            benefit=description,
+            text="We make things.",
+        )
+
+    def test_text(self):
+        rsp = self.client.get(self.url)
+        self.assertEqual(
+            "--------\n| Lead |\n--------\n\n"
+            "Big Daddy\n\nWe make things."
+            "\n\n%s\n\n"
+            "Big Mama\n\n-- NO DESCRIPTION FOR THIS SPONSOR --\n\n" % ("-" * 80),
+            b"".join(rsp.streaming_content).decode("utf-8"))
+
+    def test_json(self):
+        rsp = self.client.get(self.url, {"format": "json"})
+        self.assertEqual("application/json", rsp['Content-type'])
+        data = json.loads(b"".join(rsp.streaming_content).decode("utf-8"))
+        self.assertEqual(["Big Daddy", "Big Mama"], [row["name"] for row in data])
+        self.assertEqual("We make things.", data[0]["description"])
+
+    def test_unknown_format(self):
+        rsp = self.client.get(self.url, {"format": "xls"})
+        self.assertEqual(404, rsp.status_code)
+
+
+class TestBenefitFlags(TestCase):
+    def setUp(self):
+        conference = current_conference()
+        self.sponsor_level = SponsorLevel.objects.create(
+            conference=conference, name="Lead", cost=1)
+        self.weblogo_benefit = Benefit.objects.create(name="Web logo", type="weblogo")
+        self.description_benefit = Benefit.objects.create(name="Company Description", type="text")
+        Benefit.objects.create(name="Print logo", type="file")
+        for benefit in [self.weblogo_benefit, self.description_benefit]:
+            BenefitLevel.objects.create(benefit=benefit, level=self.sponsor_level)
+        self.sponsor = Sponsor.objects.create(
+            name="Big Daddy",
+            level=self.sponsor_level,
+            active=True,
+        )
+
+    def test_flags_follow_benefits(self):
+        sponsor = Sponsor.objects.get(pk=self.sponsor.pk)
+        self.assertIs(False, sponsor.web_logo_benefit)
+        self.assertIs(False, sponsor.company_description_benefit)
+        # not offered at this level
+        self.assertIsNone(sponsor.print_logo_benefit)
+
+        sponsor_benefit = SponsorBenefit.objects.get(
+            sponsor=sponsor, benefit=self.description_benefit)
+        sponsor_benefit.text = "We make things."
+        sponsor_benefit.save()
+
+        sponsor = Sponsor.objects.get(pk=self.sponsor.pk)
+        self.assertIs(True, sponsor.company_description_benefit)
+        self.assertIs(False, sponsor.web_logo_benefit)
+
+
+# TransactionTestCase so that the on_commit cache invalidation runs
+class TestSponsorListing(TransactionTestCase):
+    serialized_rollback = True
+    template = Template(
+        "{% load sponsorship_tags %}{% sponsor_levels as levels %}"
+        "{% for level in levels %}{{ level.name }}:"
+        "{% for sponsor in level.active_sponsors %} {{ sponsor.name }}"
+        "{% if sponsor.website_logo %} {{ sponsor.website_logo.url }}{% endif %}"
+        "{% endfor %};{% endfor %}"
+    )
+
+    def setUp(self):
+        conference, created = Conference.objects.get_or_create(
+            pk=settings.CONFERENCE_ID, defaults={"title": "Conference"})
+        self.sponsor_level = SponsorLevel.objects.create(
+            conference=conference, name="Lead", cost=1)
+        self.weblogo_benefit = Benefit.objects.create(name="Web logo", type="weblogo")
+        self.sponsor = Sponsor.objects.create(
+            name="Big Daddy",
+            level=self.sponsor_level,
+            active=True,
+        )
+        SponsorBenefit.objects.create(
+            sponsor=self.sponsor,
+            benefit=self.weblogo_benefit,
+            upload="logo.png",
+        )
+        # no logo uploaded yet
+        Sponsor.objects.create(
+            name="Big Mama",
+            level=self.sponsor_level,
+            active=True,
+        )
+
+    def render(self):
+        return self.template.render(Context())
+
+    def test_cached_render(self):
+        html = self.render()
+        self.assertIn("Big Daddy %slogo.png" % settings.MEDIA_URL, html)
+        self.assertIn("Big Mama;", html)
+        with self.assertNumQueries(0):
+            self.assertEqual(html, self.render())
+
+    def test_sponsors_tag(self):
+        template = Template(
+            '{% load sponsorship_tags %}{% sponsors "lead" as lead %}'
+            '{% for sponsor in lead %}{{ sponsor.name }},{% endfor %}')
+        self.assertEqual("Big Daddy,Big Mama,", template.render(Context()))
+
+    def test_changes_invalidate(self):
+        self.render()
+        self.sponsor.name = "Bigger Daddy"
+        self.sponsor.save()
+        self.assertIn("Bigger Daddy", self.render())
+
+        Sponsor.objects.filter(pk=self.sponsor.pk).update(active=False)
+        # queryset updates bypass the signals; saves do not
+        self.sponsor_level.save()
+        self.assertNotIn("Bigger Daddy", self.render())
+
+
+class TestSyncSponsorBenefits(TestCase):
+    def setUp(self):
+        conference = current_conference()
+        self.gold = SponsorLevel.objects.create(conference=conference, name="Gold", cost=2)
+        self.bronze = SponsorLevel.objects.create(conference=conference, name="Bronze", cost=1)
+        self.weblogo_benefit = Benefit.objects.create(name="Web logo", type="weblogo")
+        self.description_benefit = Benefit.objects.create(name="Company Description", type="text")
+        BenefitLevel.objects.create(benefit=self.weblogo_benefit, level=self.gold)
+        BenefitLevel.objects.create(
+            benefit=self.description_benefit, level=self.gold, max_words=100, other_limits="bold")
+        BenefitLevel.objects.create(
+            benefit=self.description_benefit, level=self.bronze, max_words=20)
+
+    def benefits(self, sponsor):
+        return dict(
+            (row[0], row[1:]) for row in SponsorBenefit.objects.filter(sponsor=sponsor).values_list(
+                "benefit__name", "active", "max_words", "other_limits", "is_complete")
+        )
+
+    def test_upgrade(self):
+        sponsor = Sponsor.objects.create(name="Big Daddy", level=self.bronze, active=True)
+        self.assertEqual(
+            {"Company Description": (True, 20, "", False)}, self.benefits(sponsor))
+
+        sponsor.level = self.gold
+        sponsor.save()
+        self.assertEqual({
+            "Company Description": (True, 100, "bold", False),
+            "Web logo": (True, None, "", False),
+        }, self.benefits(sponsor))
+        sponsor = Sponsor.objects.get(pk=sponsor.pk)
+        self.assertIs(False, sponsor.web_logo_benefit)
+        self.assertIs(False, sponsor.company_description_benefit)
+
+    def test_downgrade(self):
+        sponsor = Sponsor.objects.create(name="Big Daddy", level=self.gold, active=True)
+        logo = SponsorBenefit.objects.get(sponsor=sponsor, benefit=self.weblogo_benefit)
+        logo.upload = "logo.png"
+        logo.save()
+        self.assertIs(True, Sponsor.objects.get(pk=sponsor.pk).web_logo_benefit)
+
+        sponsor = Sponsor.objects.get(pk=sponsor.pk)
+        sponsor.level = self.bronze
+        sponsor.save()
+        self.assertEqual({
+            "Company Description": (True, 20, "", False),
+            "Web logo": (False, None, "", False),
+        }, self.benefits(sponsor))
+        sponsor = Sponsor.objects.get(pk=sponsor.pk)
+        # no longer offered at this level
+        self.assertIsNone(sponsor.web_logo_benefit)
+        self.assertIs(False, sponsor.company_description_benefit)
+
+    def test_flags(self):
+        sponsor = Sponsor.objects.create(name="Big Daddy", level=self.gold, active=True)
+        SponsorBenefit.objects.filter(
+            sponsor=sponsor, benefit=self.description_benefit
+        ).update(text="We make things.", is_complete=False)
+
+        result = sync_sponsor_benefits(Sponsor.objects.filter(pk=sponsor.pk))
+        self.assertIs(True, result["flags"][sponsor.pk]["company_description_benefit"])
+        self.assertIs(False, result["flags"][sponsor.pk]["web_logo_benefit"])
+        self.assertEqual(1, result["updated"])
+        sponsor = Sponsor.objects.get(pk=sponsor.pk)
+        self.assertIs(True, sponsor.company_description_benefit)
+        self.assertEqual((True, 100, "bold", True), self.benefits(sponsor)["Company Description"])
+
+    def test_command(self):
+        gold = Sponsor.objects.create(name="Big Daddy", level=self.gold, active=True)
+        bronze = Sponsor.objects.create(name="Big Mama", level=self.bronze, active=True)
+        SponsorBenefit.objects.filter(sponsor=gold, benefit=self.weblogo_benefit).delete()
+        SponsorBenefit.objects.filter(sponsor=gold, benefit=self.description_benefit).update(
+            max_words=5)
+        SponsorBenefit.objects.create(
+            sponsor=bronze, benefit=self.weblogo_benefit, active=True)
+
+        out = StringIO()
+        call_command("reset_sponsor_benefits", stdout=out)
+        self.assertEqual(
+            "Sponsor benefits created: 1, updated: 1, deactivated: 1\n", out.getvalue())
+
+        out = StringIO()
+        call_command("reset_sponsor_benefits", stdout=out)
+        self.assertEqual(
+            "Sponsor benefits created: 0, updated: 0, deactivated: 0\n", out.getvalue())
+
+
+@override_settings(SYMPOSION_SPONSOR_DERIVATIVE_PROCESSES=0,
+                   SYMPOSION_SPONSOR_DERIVATIVE_SIZES={"web": (400, 400)})
+class TestSponsorDerivatives(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.media = override_settings(MEDIA_ROOT=self.temp_dir)
+        self.media.enable()
+        conference = current_conference()
+        sponsor_level = SponsorLevel.objects.create(
+            conference=conference, name="Lead", cost=1)
+        weblogo_benefit = Benefit.objects.create(name="Web logo", type="weblogo")
+        sponsor = Sponsor.objects.create(
+            name="Big Daddy",
+            level=sponsor_level,
+            active=True,
+        )
+        self.sponsor_benefit = SponsorBenefit.objects.create(
+            sponsor=sponsor,
+            benefit=weblogo_benefit,
+        )
+
+    def tearDown(self):
+        self.media.disable()
+        shutil.rmtree(self.temp_dir)
+
+    def upload(self, name, content):
+        self.sponsor_benefit.upload = SimpleUploadedFile(name, content)
+        self.sponsor_benefit.save()
+        # TestCase never commits, so run what the save schedules on commit
+        schedule(self.sponsor_benefit.pk)
+
+    def png(self, size):
+        buf = io.BytesIO()
+        Image.new("RGBA", size, (255, 0, 0, 128)).save(buf, format="PNG")
+        return buf.getvalue()
+
+    def test_png_upload(self):
+        self.upload("logo.png", self.png((1600, 800)))
+
+        derivatives = SponsorBenefitDerivative.objects.filter(
+            sponsor_benefit=self.sponsor_benefit)
+        self.assertEqual(
+            sorted(formats()), sorted(derivative.format for derivative in derivatives))
+        for derivative in derivatives:
+            self.assertEqual("web", derivative.alias)
+            self.assertEqual((400, 200), (derivative.width, derivative.height))
+            self.assertRegexpMatches(
+                derivative.image.name,
+                r"^sponsor_files/derivatives/logo-web\.[0-9a-f]{12}\.%s$" % derivative.format)
+            self.assertTrue(os.path.exists(derivative.image.path))
+            self.assertEqual((400, 200), Image.open(derivative.image.path).size)
+
+        sponsor = Sponsor.objects.get(pk=self.sponsor_benefit.sponsor_id)
+        self.assertEqual(
+            set(formats()), set(sponsor.website_logo_derivatives))
+
+    def test_removed_sizes_are_pruned(self):
+        self.upload("logo.png", self.png((1600, 800)))
+        with override_settings(SYMPOSION_SPONSOR_DERIVATIVE_SIZES={"small": (100, 100)}):
+            schedule(self.sponsor_benefit.pk)
+        self.assertEqual(
+            ["small"],
+            list(self.sponsor_benefit.derivatives.values_list("alias", flat=True).distinct()))
+
+    def test_not_an_image(self):
+        self.upload("print.pdf", b"%PDF-1.4 not really")
+        self.assertFalse(self.sponsor_benefit.derivatives.exists())
+        sponsor_benefit = SponsorBenefit.objects.get(pk=self.sponsor_benefit.pk)
+        # recorded, so later saves do not look at the file again
+        self.assertEqual(sponsor_benefit.upload.name, sponsor_benefit.derivatives_source)
@@ -5,6 +5,7 @@ from .views import (
     sponsor_apply,
     sponsor_add,
     sponsor_zip_logo_files,
+    sponsor_export_data,
     sponsor_detail
 )
 
@@ -13,5 +14,6 @@ urlpatterns = [
     url(r"^apply/$", sponsor_apply, name="sponsor_apply"),
     url(r"^add/$", sponsor_add, name="sponsor_add"),
     url(r"^ziplogos/$", sponsor_zip_logo_files, name="sponsor_zip_logos"),
+    url(r"^export/$", sponsor_export_data, name="sponsor_export_data"),
     url(r"^(?P<pk>\d+)/$", sponsor_detail, name="sponsor_detail"),
 ]
@@ -0,0 +1,40 @@
+from __future__ import unicode_literals
+
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from symposion.sponsorship.models import SPONSORSHIP_CACHE_VERSION, Sponsor, SponsorBenefit, \
+    SponsorLevel
+from symposion.utils.cache import versioned_key
+
+
+def sponsor_listing(conference):
+    """
+    Returns the sponsor levels of ``conference`` in order, each with its
+    active sponsors in ``active_sponsors`` (ordered by when they were
+    added), their web logos and logo derivatives loaded and their listing
+    texts in ``listing_texts``.
+
+    The listing is cached until a level, sponsor or benefit changes.
+    """
+    key = versioned_key(SPONSORSHIP_CACHE_VERSION, "listing", conference.pk)
+    levels = cache.get(key)
+    if levels is None:
+        texts = SponsorBenefit.objects.filter(
+            benefit__content_type__startswith="listing_text_"
+        ).select_related("benefit")
+        sponsors = Sponsor.objects.filter(active=True).select_related(
+            "sponsor_logo"
+        ).prefetch_related(
+            Prefetch("sponsor_benefits", queryset=texts, to_attr="listing_texts"),
+            "sponsor_logo__derivatives",
+        ).order_by("added")
+        levels = list(SponsorLevel.objects.filter(conference=conference).prefetch_related(
+            Prefetch("sponsor_set", queryset=sponsors, to_attr="active_sponsors")
+        ))
+        for level in levels:
+            for sponsor in level.active_sponsors:
+                # saves a query when templates reach back to the level
+                sponsor.level = level
+        cache.set(key, levels, None)
+    return levels
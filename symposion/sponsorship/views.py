@@ -1,29 +1,29 @@
 from __future__ import unicode_literals
-try:
-    from io import StringIO
-except:
-    # Python 2
-    from cStringIO import StringIO
+import csv
 import itertools
+import json
 import logging
 import os
 import time
-from zipfile import ZipFile, ZipInfo
 
 from django.conf import settings
+from django.db.models import Prefetch
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
-from django.http import Http404, HttpResponse
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import render_to_response, redirect, get_object_or_404
 from django.template import RequestContext
+from django.utils import six
 from django.utils.translation import ugettext_lazy as _
 
 from account.decorators import login_required
 
+from symposion.conf import settings as symposion_settings
+
 from symposion.sponsorship.forms import SponsorApplicationForm, \
     SponsorDetailsForm, SponsorBenefitsFormSet
-from symposion.sponsorship.models import Benefit, Sponsor, SponsorBenefit, \
-    SponsorLevel
+from symposion.sponsorship.models import Sponsor, SponsorBenefit
+from symposion.utils.zipstream import stream_zip
 
 
 log = logging.getLogger(__name__)
@@ -108,93 +108,133 @@ def sponsor_detail(request, pk):
     }, context_instance=RequestContext(request))
 
 
-@staff_member_required
-def sponsor_export_data(request):
-    sponsors = []
-    data = ""
-
-    for sponsor in Sponsor.objects.order_by("added"):
-        d = {
+def _export_rows():
+    """
+    Yield a dict per sponsor for the export, grouped by level and then in
+    the order the sponsors were added.
+    """
+    sponsors = Sponsor.objects.select_related("level").prefetch_related(
+        Prefetch(
+            "sponsor_benefits",
+            queryset=SponsorBenefit.objects.filter(
+                benefit__name=symposion_settings.SYMPOSION_SPONSOR_DESCRIPTION_BENEFIT),
+            to_attr="description_benefits",
+        )
+    ).order_by("level__order", "level__name", "added")
+    for sponsor in sponsors:
+        description = ""
+        for sponsor_benefit in sponsor.description_benefits:
+            description = sponsor_benefit.text
+        yield {
             "name": sponsor.name,
             "url": sponsor.external_url,
-            "level": (sponsor.level.order, sponsor.level.name),
-            "description": "",
+            "level": sponsor.level.name,
+            "level_order": sponsor.level.order,
+            "description": description.strip(),
         }
-        for sponsor_benefit in sponsor.sponsor_benefits.all():
-            if sponsor_benefit.benefit_id == 2:
-                d["description"] = sponsor_benefit.text
-        sponsors.append(d)
-
-    def izip_longest(*args):
-        fv = None
-
-        def sentinel(counter=([fv] * (len(args) - 1)).pop):
-            yield counter()
-        iters = [itertools.chain(it, sentinel(), itertools.repeat(fv)) for it in args]
-        try:
-            for tup in itertools.izip(*iters):
-                yield tup
-        except IndexError:
-            pass
-
-    def pairwise(iterable):
-        a, b = itertools.tee(iterable)
-        b.next()
-        return izip_longest(a, b)
-
-    def level_key(s):
-        return s["level"]
-
-    for level, level_sponsors in itertools.groupby(sorted(sponsors, key=level_key), level_key):
-        data += "%s\n" % ("-" * (len(level[1]) + 4))
-        data += "| %s |\n" % level[1]
-        data += "%s\n\n" % ("-" * (len(level[1]) + 4))
-        for sponsor, next in pairwise(level_sponsors):
-            description = sponsor["description"].strip()
-            description = description if description else "-- NO DESCRIPTION FOR THIS SPONSOR --"
-            data += "%s\n\n%s" % (sponsor["name"], description)
-            if next is not None:
-                data += "\n\n%s\n\n" % ("-" * 80)
-            else:
-                data += "\n\n"
 
-    return HttpResponse(data, content_type="text/plain;charset=utf-8")
+
+def _export_text(rows):
+    def level_key(row):
+        return row["level_order"], row["level"]
+
+    for (order, level), level_rows in itertools.groupby(rows, level_key):
+        yield "%s\n| %s |\n%s\n\n" % ("-" * (len(level) + 4), level, "-" * (len(level) + 4))
+        for i, row in enumerate(level_rows):
+            if i:
+                yield "\n\n%s\n\n" % ("-" * 80)
+            description = row["description"] or "-- NO DESCRIPTION FOR THIS SPONSOR --"
+            yield "%s\n\n%s" % (row["name"], description)
+        yield "\n\n"
+
+
+class _Echo(object):
+    # a file-like object for csv.writer that hands back what is written
+    def write(self, value):
+        return value
+
+
+def _export_csv(rows):
+    columns = ["level", "name", "url", "description"]
+    writer = csv.writer(_Echo())
+
+    def encode(values):
+        if six.PY2:
+            return [("%s" % value).encode("utf-8") for value in values]
+        return values
+
+    yield writer.writerow(encode(columns))
+    for row in rows:
+        yield writer.writerow(encode([row[column] for column in columns]))
+
+
+def _export_json(rows):
+    yield "["
+    for i, row in enumerate(rows):
+        yield (", " if i else "") + json.dumps(row)
+    yield "]"
+
+
+EXPORT_FORMATS = {
+    "text": (_export_text, "text/plain;charset=utf-8"),
+    "csv": (_export_csv, "text/csv;charset=utf-8"),
+    "json": (_export_json, "application/json"),
+}
+
+
+@staff_member_required
+def sponsor_export_data(request):
+    """
+    Export every sponsor's level, name, URL and description as plain text
+    (the default), CSV or JSON, chosen with the ``format`` parameter.
+    """
+    try:
+        export, content_type = EXPORT_FORMATS[request.GET.get("format", "text")]
+    except KeyError:
+        raise Http404
+    return StreamingHttpResponse(export(_export_rows()), content_type=content_type)
+
+
+def _zip_dir_name(name):
+    return name.lower().replace(" ", "_").replace('/', '_')
+
+
+def _logo_members(sponsor_benefits):
+    for sponsor_benefit in sponsor_benefits:
+        path = sponsor_benefit.upload.path
+        if not os.path.exists(path):
+            log.debug("No such sponsor file: %s" % path)
+            continue
+        full_dir = "/".join([
+            _zip_dir_name(sponsor_benefit.benefit.name),
+            _zip_dir_name(sponsor_benefit.sponsor.level.name),
+            _zip_dir_name(sponsor_benefit.sponsor.name),
+        ])
+        fname = os.path.split(sponsor_benefit.upload.name)[-1]
+        modtime = time.gmtime(os.stat(path).st_mtime)
+        yield full_dir + "/" + fname, path, modtime
 
 
 @staff_member_required
 def sponsor_zip_logo_files(request):
     """Return a zip file of sponsor web and print logos"""
 
-    zip_stringio = StringIO()
-    zipfile = ZipFile(zip_stringio, "w")
-    try:
-        benefits = Benefit.objects.all()
-        for benefit in benefits:
-            dir_name = benefit.name.lower().replace(" ", "_").replace('/', '_')
-            for level in SponsorLevel.objects.all():
-                level_name = level.name.lower().replace(" ", "_").replace('/', '_')
-                for sponsor in Sponsor.objects.filter(level=level, active=True):
-                    sponsor_name = sponsor.name.lower().replace(" ", "_").replace('/', '_')
-                    full_dir = "/".join([dir_name, level_name, sponsor_name])
-                    for sponsor_benefit in SponsorBenefit.objects.filter(
-                        benefit=benefit,
-                        sponsor=sponsor,
-                        active=True,
-                    ).exclude(upload=''):
-                        if os.path.exists(sponsor_benefit.upload.path):
-                            modtime = time.gmtime(os.stat(sponsor_benefit.upload.path).st_mtime)
-                            with open(sponsor_benefit.upload.path, "rb") as f:
-                                fname = os.path.split(sponsor_benefit.upload.name)[-1]
-                                zipinfo = ZipInfo(filename=full_dir + "/" + fname,
-                                                  date_time=modtime)
-                                zipfile.writestr(zipinfo, f.read())
-                        else:
-                            log.debug("No such sponsor file: %s" % sponsor_benefit.upload.path)
-    finally:
-        zipfile.close()
-
-    response = HttpResponse(zip_stringio.getvalue(),
-                            content_type="application/zip")
+    # grouped by benefit, then level, then sponsor
+    sponsor_benefits = SponsorBenefit.objects.filter(
+        sponsor__active=True,
+        active=True,
+    ).exclude(
+        upload=''
+    ).select_related(
+        "benefit", "sponsor__level"
+    ).order_by(
+        "benefit__pk", "sponsor__level__conference", "sponsor__level__order",
+        "sponsor__level__pk", "sponsor__name", "sponsor__pk", "pk",
+    )
+
+    response = StreamingHttpResponse(
+        stream_zip(_logo_members(sponsor_benefits.iterator())),
+        content_type="application/zip")
     prefix = settings.CONFERENCE_URL_PREFIXES[settings.CONFERENCE_ID]
     response['Content-Disposition'] = \
         'attachment; filename="%s_sponsorlogos.zip"' % prefix
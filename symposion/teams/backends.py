@@ -1,6 +1,11 @@
+from django.core.cache import cache
 from django.db.models import Q
 
-from .models import Team
+from django.contrib.auth.models import Permission
+
+from symposion.utils.cache import get_version, versioned_key
+
+from .models import TEAM_PERMISSIONS_CACHE_VERSION, user_permissions_version
 
 
 class TeamPermissionsBackend(object):
@@ -12,33 +17,37 @@ class TeamPermissionsBackend(object):
         """
         Returns a set of permission strings that this user has through his/her
         team memberships.
+
+        The set is kept in the cache under a key that changes whenever the
+        user's memberships or the permissions of any team change.
         """
         if user_obj.is_anonymous() or obj is not None:
             return set()
         if not hasattr(user_obj, "_team_perm_cache"):
-            # Member permissions        
-            memberships = Team.objects.filter(
-                Q(memberships__user=user_obj),                                   
-                Q(memberships__state="member"),
+            key = versioned_key(
+                user_permissions_version(user_obj.pk),
+                get_version(TEAM_PERMISSIONS_CACHE_VERSION),
             )
-            perms = memberships.values_list(
-                "permissions__content_type__app_label",
-                "permissions__codename"
-            ).order_by()
-            permissions = ["%s.%s" % (ct, name) for ct, name in perms] 
-            # Manager permissions
-            memberships = Team.objects.filter(
-                Q(memberships__user=user_obj),
-                Q(memberships__state="manager"),
-            )
-            perms = memberships.values_list(
-                "manager_permissions__content_type__app_label",
-                "manager_permissions__codename"
-            ).order_by()
-            permissions += ["%s.%s" % (ct, name) for ct, name in perms]  
-            user_obj._team_perm_cache = set(permissions)
+            permissions = cache.get(key)
+            if permissions is None:
+                permissions = self._load_team_permissions(user_obj)
+                cache.set(key, permissions, None)
+            user_obj._team_perm_cache = permissions
         return user_obj._team_perm_cache
 
+    def _load_team_permissions(self, user_obj):
+        # member permissions of teams the user is a member of and manager
+        # permissions of teams they manage, in one query
+        perms = Permission.objects.filter(
+            Q(member_teams__memberships__user=user_obj,
+              member_teams__memberships__state="member") |
+            Q(manager_teams__memberships__user=user_obj,
+              manager_teams__memberships__state="manager")
+        ).values_list(
+            "content_type__app_label", "codename"
+        ).order_by().distinct()
+        return set("%s.%s" % (ct, name) for ct, name in perms)
+
     def has_perm(self, user_obj, perm, obj=None):
         if not user_obj.is_active:
             return False
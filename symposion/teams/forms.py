@@ -54,5 +54,8 @@ class TeamInvitationForm(forms.Form):
             Membership.objects.create(team=self.team, user=self.user, state="invited")
         elif self.state == "applied":
             # if they applied we shortcut invitation process
-            membership = Membership.objects.filter(team=self.team, user=self.user)
-            membership.update(state="member")
+            # saved rather than updated so that cached permissions and
+            # review queues are refreshed
+            membership = Membership.objects.get(team=self.team, user=self.user)
+            membership.state = "member"
+            membership.save()
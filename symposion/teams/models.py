@@ -3,6 +3,7 @@ from __future__ import unicode_literals
 import datetime
 
 from django.db import models
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 
@@ -10,6 +11,21 @@ from django.contrib.auth.models import Permission, User
 
 from reversion import revisions as reversion
 
+from symposion.utils.cache import bump_version_on_commit
+
+
+# version of every user's cached team permissions, bumped when the
+# permissions granted by a team change
+TEAM_PERMISSIONS_CACHE_VERSION = "team_permissions"
+
+
+def user_permissions_version(user_id):
+    """
+    Return the name of the version of ``user_id``'s cached team
+    permissions, bumped when their memberships change.
+    """
+    return "%s:user:%s" % (TEAM_PERMISSIONS_CACHE_VERSION, user_id)
+
 
 TEAM_ACCESS_CHOICES = [
     ("open", _("open")),
@@ -48,10 +64,7 @@ class Team(models.Model):
         return self.name
 
     def get_state_for_user(self, user):
-        try:
-            return self.memberships.get(user=user).state
-        except Membership.DoesNotExist:
-            return None
+        return team_states_for_user(user).get(self.pk)
 
     def applicants(self):
         return self.memberships.filter(state="applied")
@@ -94,3 +107,30 @@ class Membership(models.Model):
         verbose_name_plural = _("Memberships")
 
 reversion.register(Membership)
+
+
+def team_states_for_user(user):
+    """
+    Returns a ``{team id: membership state}`` map of the teams ``user``
+    has a membership of, loaded in one query and kept on the user object
+    for the rest of the request.
+    """
+    if not user.is_authenticated():
+        return {}
+    if not hasattr(user, "_team_states"):
+        user._team_states = dict(
+            Membership.objects.filter(user=user).values_list("team_id", "state")
+        )
+    return user._team_states
+
+
+def membership_changed(sender, instance=None, **kwargs):
+    bump_version_on_commit(user_permissions_version(instance.user_id))
+
+
+def team_permissions_changed(sender, **kwargs):
+    bump_version_on_commit(TEAM_PERMISSIONS_CACHE_VERSION)
+post_save.connect(membership_changed, sender=Membership)
+post_delete.connect(membership_changed, sender=Membership)
+m2m_changed.connect(team_permissions_changed, sender=Team.permissions.through)
+m2m_changed.connect(team_permissions_changed, sender=Team.manager_permissions.through)
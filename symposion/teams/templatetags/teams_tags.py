@@ -1,6 +1,6 @@
 from django import template
 
-from symposion.teams.models import Team
+from symposion.teams.models import Team, team_states_for_user
 
 register = template.Library()
 
@@ -20,9 +20,10 @@ class AvailableTeamsNode(template.Node):
 
     def render(self, context):
         request = context["request"]
+        states = team_states_for_user(request.user)
         teams = []
         for team in Team.objects.all():
-            state = team.get_state_for_user(request.user)
+            state = states.get(team.pk)
             if team.access == "open" and state is None:
                 teams.append(team)
             elif request.user.is_staff and state is None:
@@ -0,0 +1,245 @@
+from __future__ import unicode_literals
+
+import datetime
+import json
+import os
+import shutil
+import smtplib
+import tempfile
+import time
+
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from django.utils.six import StringIO
+
+from symposion.markdown_parser import cache_clear, cache_info, parse, render
+from symposion.models import QueuedEmail
+from symposion.speakers.models import Speaker
+from symposion.utils.mailqueue import MemoryQueue, retry_delay, send_queued
+
+
+class FailingBackend(BaseEmailBackend):
+
+    def send_messages(self, messages):
+        raise smtplib.SMTPException("Mail server unavailable")
+
+
+class LeasedQueue(MemoryQueue):
+    """MemoryQueue with a short lease, recording the size of each claim."""
+
+    lease = datetime.timedelta(seconds=0.1)
+
+    def __init__(self):
+        self.claims = []
+
+    def claim(self, limit):
+        self.claims.append(limit)
+        return super(LeasedQueue, self).claim(limit)
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+                   SYMPOSION_EMAIL_QUEUE_RETRY_DELAY=60,
+                   SYMPOSION_EMAIL_QUEUE_MAX_ATTEMPTS=3)
+class TestSendQueued(TestCase):
+
+    def setUp(self):
+        MemoryQueue.clear()
+        self.queue = MemoryQueue()
+
+    def enqueue(self, count=1):
+        self.queue.enqueue([
+            EmailMultiAlternatives("Subject %d" % i, "Body", "from@example.com", ["to@example.com"])
+            for i in range(count)
+        ])
+
+    def fail(self):
+        with override_settings(EMAIL_BACKEND="symposion.tests.FailingBackend"):
+            return send_queued(self.queue)
+
+    def make_due(self):
+        for item in self.queue.messages:
+            item.next_attempt = timezone.now()
+
+    def test_send(self):
+        self.enqueue(3)
+        self.assertEqual(send_queued(self.queue), (3, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(
+            set(item.status for item in self.queue.messages), set([QueuedEmail.STATUS_SENT]))
+        self.assertEqual(send_queued(self.queue), (0, 0))
+
+    def test_retry(self):
+        self.enqueue()
+        self.assertEqual(self.fail(), (0, 1))
+        item = self.queue.messages[0]
+        self.assertEqual(item.status, QueuedEmail.STATUS_QUEUED)
+        self.assertEqual(item.attempts, 1)
+        self.assertIn("Mail server unavailable", item.last_error)
+
+        # not due again until the retry delay has passed
+        self.assertEqual(send_queued(self.queue), (0, 0))
+        self.make_due()
+        self.assertEqual(send_queued(self.queue), (1, 0))
+        self.assertEqual(item.status, QueuedEmail.STATUS_SENT)
+        self.assertEqual(item.attempts, 2)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_backoff(self):
+        self.assertEqual(retry_delay(1), datetime.timedelta(seconds=60))
+        self.assertEqual(retry_delay(2), datetime.timedelta(seconds=120))
+        self.assertEqual(retry_delay(3), datetime.timedelta(seconds=240))
+
+        self.enqueue()
+        item = self.queue.messages[0]
+        self.fail()
+        self.make_due()
+        before = timezone.now()
+        self.fail()
+        self.assertEqual(item.attempts, 2)
+        self.assertGreaterEqual(item.next_attempt, before + retry_delay(2))
+        self.assertLess(item.next_attempt, timezone.now() + retry_delay(2))
+
+    def test_dead_letter(self):
+        self.enqueue()
+        item = self.queue.messages[0]
+        for attempt in range(3):
+            self.make_due()
+            self.assertEqual(self.fail(), (0, 1))
+        self.assertEqual(item.status, QueuedEmail.STATUS_FAILED)
+        self.assertEqual(item.attempts, 3)
+
+        # failed messages are kept but not retried
+        self.make_due()
+        self.assertEqual(send_queued(self.queue), (0, 0))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_limit(self):
+        self.enqueue(5)
+        self.assertEqual(send_queued(self.queue, limit=2), (2, 0))
+        self.assertEqual(send_queued(self.queue), (3, 0))
+
+    def test_rate(self):
+        queue = LeasedQueue()
+        self.enqueue(12)
+        start = time.time()
+        self.assertEqual(send_queued(queue, rate=100), (12, 0))
+        # 12 messages at 100 a second take at least 11 intervals
+        self.assertGreaterEqual(time.time() - start, 0.11)
+        # no more is claimed at a time than is sent in half the lease
+        self.assertEqual(max(queue.claims), 5)
+        self.assertEqual(len(mail.outbox), 12)
+
+
+@override_settings(SYMPOSION_MARKDOWN_CACHE=None, SYMPOSION_MARKDOWN_CACHE_SIZE=2)
+class TestMarkdownCache(TestCase):
+
+    def setUp(self):
+        cache_clear()
+        self.addCleanup(cache_clear)
+
+    def test_lru(self):
+        self.assertEqual(parse("*one*"), render("*one*"))
+        parse("*two*")
+        # a hit makes "one" the most recently used
+        self.assertEqual(parse("*one*"), render("*one*"))
+        parse("*three*")
+        self.assertEqual(cache_info(), (1, 0, 3, 2, 2))
+
+        # "two" was evicted, "one" was not
+        parse("*one*")
+        parse("*two*")
+        self.assertEqual(cache_info(), (2, 0, 4, 2, 2))
+
+        cache_clear()
+        self.assertEqual(cache_info(), (0, 0, 0, 2, 0))
+
+    @override_settings(SYMPOSION_MARKDOWN_CACHE_SIZE=0)
+    def test_disabled(self):
+        parse("*one*")
+        parse("*one*")
+        self.assertEqual(cache_info(), (0, 0, 2, 0, 0))
+
+    def test_allowed_tags_in_key(self):
+        parse("*one*")
+        with override_settings(BLEACH_ALLOWED_TAGS=["p"]):
+            self.assertNotIn("<em>", parse("*one*"))
+        self.assertEqual(cache_info().misses, 2)
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "markdown": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                         "LOCATION": "markdown"},
+        },
+        SYMPOSION_MARKDOWN_CACHE="markdown")
+    def test_shared_cache(self):
+        parse("*shared*")
+        # as seen by another process, with its own in-process cache
+        cache_clear()
+        self.assertEqual(parse("*shared*"), render("*shared*"))
+        self.assertEqual(cache_info(), (0, 1, 0, 2, 1))
+        parse("*shared*")
+        self.assertEqual(cache_info(), (1, 1, 0, 2, 1))
+
+
+class TestRerenderMarkdown(TestCase):
+
+    label = "symposion_speakers.speaker"
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.state_file = os.path.join(self.temp_dir, "state.json")
+        self.speakers = [
+            Speaker.objects.create(name="Speaker %d" % i, biography="*Speaker* %d" % i)
+            for i in range(3)
+        ]
+
+    def make_stale(self, *speakers):
+        Speaker.objects.filter(pk__in=[speaker.pk for speaker in speakers]).update(
+            biography_html="<p>stale</p>")
+
+    def html(self, speaker):
+        return Speaker.objects.get(pk=speaker.pk).biography_html
+
+    def rerender(self, *args, **options):
+        out = StringIO()
+        call_command("rerender_markdown", self.label, *args, processes=1, chunk_size=2,
+                     state_file=self.state_file, stdout=out, **options)
+        return out.getvalue()
+
+    def test_changed_rows(self):
+        self.make_stale(self.speakers[1])
+        output = self.rerender()
+        self.assertIn("%s: 2/3 rows, 1 updated" % self.label, output)
+        self.assertIn("%s: done, 1 of 3 rows updated" % self.label, output)
+        for speaker in self.speakers:
+            self.assertEqual(self.html(speaker), render(speaker.biography))
+        # finished runs leave no progress behind
+        self.assertFalse(os.path.exists(self.state_file))
+
+        self.assertIn("done, 0 of 3 rows updated", self.rerender())
+
+    def test_resume(self):
+        self.make_stale(*self.speakers)
+        with open(self.state_file, "w") as f:
+            json.dump({self.label: self.speakers[1].pk}, f)
+        output = self.rerender()
+        self.assertIn("%s: 3/3 rows, 1 updated" % self.label, output)
+        self.assertEqual(self.html(self.speakers[0]), "<p>stale</p>")
+        self.assertEqual(self.html(self.speakers[2]), render(self.speakers[2].biography))
+
+        with open(self.state_file, "w") as f:
+            json.dump({self.label: self.speakers[1].pk}, f)
+        self.assertIn("done, 2 of 3 rows updated", self.rerender(restart=True))
+        self.assertEqual(self.html(self.speakers[0]), render(self.speakers[0].biography))
+
+    def test_unknown_model(self):
+        with self.assertRaises(CommandError):
+            call_command("rerender_markdown", "auth.user", processes=1,
+                         state_file=self.state_file, stdout=StringIO())
@@ -0,0 +1,68 @@
+"""
+Helpers for version-keyed caching.
+
+Rather than tracking and deleting every cache entry derived from a set of
+models, derived data is stored under a key that embeds a version number for
+that data set.  Bumping the version (usually from a model signal) makes every
+existing entry unreachable at once; stale entries simply age out of the cache.
+"""
+from __future__ import unicode_literals
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _version_key(name):
+    return "symposion:version:%s" % name
+
+
+def _initial_version():
+    # Start new generations from the clock so that a version key evicted
+    # from the cache can never be recreated with a value that is still in
+    # use by older entries.
+    return int(time.time() * 1000)
+
+
+def get_version(name):
+    """Return the current version number for the data set ``name``."""
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        version = _initial_version()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(name):
+    """Invalidate everything cached for the data set ``name``."""
+    key = _version_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _initial_version()
+        cache.set(key, version, None)
+        return version
+
+
+def bump_version_on_commit(name):
+    """
+    Invalidate everything cached for ``name`` once the current transaction
+    commits, or straight away outside a transaction.
+
+    Bumping before the commit would let another request cache the old data
+    under the new version, where it would outlive the change.
+    """
+    transaction.on_commit(lambda: bump_version(name))
+
+
+def versioned_key(name, *parts):
+    """
+    Return a cache key for ``parts`` within the data set ``name`` that
+    changes whenever ``bump_version(name)`` is called.
+    """
+    bits = [name, str(get_version(name))]
+    bits.extend(str(part) for part in parts)
+    return "symposion:%s" % ":".join(bits)
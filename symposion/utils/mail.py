@@ -7,6 +7,8 @@ from django.utils.html import strip_tags
 
 from django.contrib.sites.models import Site
 
+from symposion.utils.mailqueue import get_queue
+
 
 class Sender(object):
     ''' Class for sending e-mails under a templete prefix. '''
@@ -24,6 +26,9 @@ class Sender(object):
 
         context: a context for rendering the e-mail.
 
+        batch: a label for the message if it is queued (see
+            symposion.utils.mailqueue) rather than sent straight away.
+
         '''
 
         return __send_email__(self.template_prefix, to, kind, **kwargs)
@@ -65,4 +70,9 @@ def __send_email__(template_prefix, to, kind, **kwargs):
 
     email = EmailMultiAlternatives(subject, message_plaintext, from_email, to)
     email.attach_alternative(message_html, "text/html")
-    email.send()
+
+    queue = get_queue()
+    if queue is None:
+        email.send()
+    else:
+        queue.enqueue([email], batch=kwargs.get("batch", ""))
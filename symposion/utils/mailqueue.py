@@ -0,0 +1,217 @@
+"""
+Outbound email queue.
+
+When ``SYMPOSION_EMAIL_QUEUE`` names a queue class, ``send_email`` renders
+each message and hands it to the queue instead of sending it during the
+request.  The ``send_queued_email`` command then sends queued messages over
+one reused connection, at a limited rate, retrying failures with an
+exponential backoff and giving up on a message (leaving it ``failed`` for
+inspection) after ``SYMPOSION_EMAIL_QUEUE_MAX_ATTEMPTS`` attempts.
+
+Two queues are provided: ``DatabaseQueue``, which stores messages as
+``QueuedEmail`` rows, and ``MemoryQueue``, which keeps them in a list in
+process memory for tests.
+"""
+from __future__ import unicode_literals
+
+import datetime
+import logging
+import time
+
+from django.core.mail import get_connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from symposion.conf import settings
+from symposion.models import QueuedEmail
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_queue():
+    """
+    Return an instance of the configured queue, or None if email is sent
+    straight away.
+    """
+    path = settings.SYMPOSION_EMAIL_QUEUE
+    if not path:
+        return None
+    return import_string(path)()
+
+
+def retry_delay(attempts):
+    """
+    Return how long to wait before retrying a message that has failed
+    ``attempts`` times.
+    """
+    seconds = settings.SYMPOSION_EMAIL_QUEUE_RETRY_DELAY * 2 ** (attempts - 1)
+    return datetime.timedelta(seconds=seconds)
+
+
+class DatabaseQueue(object):
+    """
+    Queue storing messages as ``QueuedEmail`` rows, shared by every process.
+    """
+
+    # how long a claimed message is hidden from other workers
+    lease = datetime.timedelta(minutes=10)
+
+    def enqueue(self, messages, batch=""):
+        QueuedEmail.objects.bulk_create([
+            QueuedEmail.for_message(message, batch=batch) for message in messages
+        ])
+
+    def claim(self, limit):
+        """
+        Return up to ``limit`` due messages, locked against other workers.
+        """
+        now = timezone.now()
+        due = QueuedEmail.objects.filter(
+            status=QueuedEmail.STATUS_QUEUED,
+            next_attempt__lte=now,
+        ).exclude(locked_until__gt=now)
+        claimed = []
+        for pk in due.values_list("pk", flat=True)[:limit]:
+            # another worker may have claimed it since it was read
+            if due.filter(pk=pk).update(locked_until=now + self.lease):
+                claimed.append(pk)
+        return list(QueuedEmail.objects.filter(pk__in=claimed))
+
+    def sent(self, item):
+        item.status = QueuedEmail.STATUS_SENT
+        item.attempts += 1
+        item.sent = timezone.now()
+        item.locked_until = None
+        item.save(update_fields=["status", "attempts", "sent", "locked_until"])
+
+    def failed(self, item, error):
+        _record_failure(item, error)
+        item.save(update_fields=["status", "attempts", "next_attempt", "locked_until", "last_error"])
+
+    def release(self, items):
+        """Make claimed messages that were not attempted due again."""
+        if items:
+            QueuedEmail.objects.filter(
+                pk__in=[item.pk for item in items]
+            ).update(locked_until=None)
+
+
+class MemoryQueue(object):
+    """
+    Queue keeping unsaved ``QueuedEmail`` instances in ``MemoryQueue.messages``,
+    shared by the instances in a process.  Meant for tests.
+    """
+
+    messages = []
+
+    @classmethod
+    def clear(cls):
+        del cls.messages[:]
+
+    def enqueue(self, messages, batch=""):
+        self.messages.extend(
+            QueuedEmail.for_message(message, batch=batch) for message in messages
+        )
+
+    def claim(self, limit):
+        now = timezone.now()
+        return [
+            item for item in self.messages
+            if item.status == QueuedEmail.STATUS_QUEUED and item.next_attempt <= now
+        ][:limit]
+
+    def sent(self, item):
+        item.status = QueuedEmail.STATUS_SENT
+        item.attempts += 1
+        item.sent = timezone.now()
+
+    def failed(self, item, error):
+        _record_failure(item, error)
+
+    def release(self, items):
+        pass
+
+
+def _record_failure(item, error):
+    item.attempts += 1
+    item.last_error = "%s" % error
+    item.locked_until = None
+    if item.attempts >= settings.SYMPOSION_EMAIL_QUEUE_MAX_ATTEMPTS:
+        item.status = QueuedEmail.STATUS_FAILED
+    else:
+        item.next_attempt = timezone.now() + retry_delay(item.attempts)
+
+
+def _throttle(last, interval):
+    """
+    Sleep until ``interval`` seconds after the time ``last`` and return the
+    time after sleeping.
+    """
+    wait = last + interval - time.time()
+    if wait > 0:
+        time.sleep(wait)
+    return time.time()
+
+
+def send_queued(queue, limit=None, rate=None, batch_size=100):
+    """
+    Send due messages from ``queue`` over one connection, at most ``rate``
+    messages a second and at most ``limit`` messages in all.
+
+    Returns a ``(sent, failed)`` pair of counts; messages that failed are
+    retried later or, after too many attempts, left ``failed``.  If no
+    connection can be opened, the message it was opened for counts as
+    failed, the rest of the batch is released and the pass ends early.
+
+    With a ``rate``, no more messages are claimed at a time than can be sent
+    in half of the queue's ``lease``, so that a slow pass does not outlive
+    its claim and have other workers send the same messages.
+    """
+    interval = 1.0 / rate if rate else 0
+    lease = getattr(queue, "lease", None)
+    sent = failed = 0
+    connection = None
+    last = 0
+    try:
+        while limit is None or sent + failed < limit:
+            size = batch_size if limit is None else min(batch_size, limit - sent - failed)
+            if rate and lease:
+                size = min(size, max(1, int(lease.total_seconds() * rate / 2)))
+            # wait before claiming so that the lease only runs while sending
+            last = _throttle(last, interval)
+            items = queue.claim(size)
+            if not items:
+                break
+            for index, item in enumerate(items):
+                if connection is None:
+                    try:
+                        connection = get_connection()
+                        connection.open()
+                    except Exception as e:
+                        logger.warning("Connecting to send queued email failed: %s", e)
+                        connection = None
+                        queue.failed(item, e)
+                        queue.release(items[index + 1:])
+                        return sent, failed + 1
+                if index:
+                    last = _throttle(last, interval)
+                try:
+                    connection.send_messages([item.message(connection=connection)])
+                except Exception as e:
+                    logger.warning("Sending queued email %s failed: %s", item.pk, e)
+                    queue.failed(item, e)
+                    failed += 1
+                    # start again with a fresh connection
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+                    connection = None
+                else:
+                    queue.sent(item)
+                    sent += 1
+    finally:
+        if connection is not None:
+            connection.close()
+    return sent, failed
@@ -0,0 +1,112 @@
+"""
+Streaming ZIP archive writer.
+
+``zipfile.ZipFile`` needs a seekable file to write to, which means building
+the whole archive in memory before a response can be sent.  ``stream_zip``
+instead yields the archive a chunk at a time while reading each member file
+a chunk at a time, so memory use does not depend on the size of the files.
+Each member's CRC and sizes follow its data in a data descriptor and are
+repeated in the central directory, as the format allows.
+
+ZIP64 is not supported, so members and the archive must stay under 4GB.
+"""
+from __future__ import unicode_literals
+
+import struct
+import time
+import zlib
+from zipfile import ZIP_DEFLATED, ZIP_STORED
+
+
+CHUNK_SIZE = 64 * 1024
+
+_LOCAL_HEADER = struct.Struct(str("<4s2B4HL2L2H"))
+_DATA_DESCRIPTOR = struct.Struct(str("<4sLLL"))
+_CENTRAL_HEADER = struct.Struct(str("<4s4B4HL2L5H2L"))
+_END_OF_CENTRAL_DIRECTORY = struct.Struct(str("<4s4H2LH"))
+
+# general purpose flags: sizes and CRC follow the data; names are UTF-8
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+
+_VERSION = 20
+_UNIX = 3
+_FILE_ATTRIBUTES = 0o100644 << 16
+
+
+def _dos_date_time(date_time):
+    year, month, day, hour, minute, second = date_time[:6]
+    year = max(year, 1980)
+    return (
+        (year - 1980) << 9 | month << 5 | day,
+        hour << 11 | minute << 5 | second // 2,
+    )
+
+
+def stream_zip(members, compression=ZIP_STORED, chunk_size=CHUNK_SIZE):
+    """
+    Yield the bytes of a ZIP archive holding ``members``, an iterable of
+    ``(archive name, file path, date_time)`` triples where ``date_time``
+    is a ``time.struct_time`` or ``(year, month, day, hour, minute,
+    second)`` tuple, or None for the current time.
+
+    Files are opened only when the archive reaches them.
+    """
+    offset = 0
+    directory = []
+    for name, path, date_time in members:
+        if date_time is None:
+            date_time = time.localtime()
+        dos_date, dos_time = _dos_date_time(date_time)
+        encoded = name.encode("utf-8")
+        flags = _FLAG_DATA_DESCRIPTOR
+        try:
+            name.encode("ascii")
+        except UnicodeError:
+            flags |= _FLAG_UTF8
+
+        header = _LOCAL_HEADER.pack(
+            b"PK\x03\x04", _VERSION, 0, flags, compression, dos_time, dos_date,
+            0, 0, 0, len(encoded), 0,
+        ) + encoded
+        yield header
+
+        crc = size = compressed_size = 0
+        compressor = None
+        if compression == ZIP_DEFLATED:
+            compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(chunk_size)
+                if not data:
+                    break
+                crc = zlib.crc32(data, crc)
+                size += len(data)
+                if compressor is not None:
+                    data = compressor.compress(data)
+                if data:
+                    compressed_size += len(data)
+                    yield data
+        if compressor is not None:
+            data = compressor.flush()
+            compressed_size += len(data)
+            yield data
+        crc &= 0xffffffff
+
+        yield _DATA_DESCRIPTOR.pack(b"PK\x07\x08", crc, compressed_size, size)
+
+        directory.append(_CENTRAL_HEADER.pack(
+            b"PK\x01\x02", _VERSION, _UNIX, _VERSION, 0, flags, compression,
+            dos_time, dos_date, crc, compressed_size, size,
+            len(encoded), 0, 0, 0, 0, _FILE_ATTRIBUTES, offset,
+        ) + encoded)
+        offset += len(header) + compressed_size + _DATA_DESCRIPTOR.size
+
+    directory_size = 0
+    for entry in directory:
+        directory_size += len(entry)
+        yield entry
+    yield _END_OF_CENTRAL_DIRECTORY.pack(
+        b"PK\x05\x06", 0, 0, len(directory), len(directory),
+        directory_size, offset, 0,
+    )